@@ -8,6 +8,7 @@ import FormRow from "../../components/FormRow";
 import StatRow from "@/components/StatRow";
 import IoTAlert from "@/components/IoTAlert";
 import { LOOP_DURATION } from "@/lib/three/variables";
+import { HOME_DATA_QUERY, statsAt } from "@/lib/roomSeries";
 
 
 export default function Dashboard() {
@@ -31,7 +32,7 @@ export default function Dashboard() {
 
   // --- Initial Data Fetch ---
   useEffect(() => {
-    fetch("/api/facility_home_data")
+    fetch(`/api/facility_home_data?${HOME_DATA_QUERY}`)
       .then((res) => res.json())
       .then((data) => {
         const sortedRooms = (data.rooms || []).sort((a: any, b: any) => 
@@ -47,7 +48,7 @@ export default function Dashboard() {
   }, []);
 
   useEffect(() => {
-      fetch("/api/security_home_data")
+      fetch(`/api/security_home_data?${HOME_DATA_QUERY}`)
         .then((res) => res.json())
         .then((data) => {
           setSecurityStaffList(data.staff_list || []);
@@ -77,9 +78,7 @@ export default function Dashboard() {
       roomsData.forEach(room => {
         let row = null;
         if (room.timeseries?.length > 0) {
-          row = room.timeseries.find((e: any) => e.time === currentFrame) 
-            || [...room.timeseries].reverse().find((e: any) => e.time <= currentFrame) 
-            || room.timeseries[0];
+          row = statsAt(room.timeseries, currentFrame);
         }
 
         if (!row || row.occupancy === "--") {
@@ -7,6 +7,7 @@ import StaffList from "../../components/StaffList";
 import FormRow from "../../components/FormRow";
 import StatRow from "@/components/StatRow";
 import { LOOP_DURATION } from "@/lib/three/variables";
+import { HOME_DATA_QUERY, statsAt } from "@/lib/roomSeries";
 
 export default function FacilityHome() {
   // --- States ---
@@ -23,7 +24,7 @@ export default function FacilityHome() {
 
   // --- Initial Data Fetch ---
   useEffect(() => {
-    fetch("/api/facility_home_data")
+    fetch(`/api/facility_home_data?${HOME_DATA_QUERY}`)
       .then((res) => res.json())
       .then((data) => {
         setRoomsData(data.rooms || []);
@@ -49,9 +50,7 @@ export default function FacilityHome() {
       const newStats: any = {};
       roomsData.forEach(room => {
         if (room.timeseries?.length > 0) {
-          newStats[room.room_id] = room.timeseries.find((e: any) => e.time === currentFrame) 
-            || [...room.timeseries].reverse().find((e: any) => e.time <= currentFrame) 
-            || room.timeseries[0];
+          newStats[room.room_id] = statsAt(room.timeseries, currentFrame);
         } else {
           newStats[room.room_id] = { occupancy: "--", temperature: "--", ac: null, lights: null };
         }
@@ -18,6 +18,9 @@ declare global {
   }
 }
 
+// Lab room whose live tracking feed this page subscribes to
+const LIVE_ROOM_ID = "C-007";
+
 export default function LiveModel() {
   const containerRef = useRef<HTMLDivElement>(null);
   const [department, setDepartment] = useState("Loading...");
@@ -100,6 +103,8 @@ export default function LiveModel() {
 
     socket.on('connect', () => {
       console.log('✅ Connected to Flask WebSocket Server!');
+      // Tracking updates are only sent to clients subscribed to the room
+      socket.emit('subscribe', { room_id: LIVE_ROOM_ID });
     });
 
     socket.on('iot_update', (data) => {
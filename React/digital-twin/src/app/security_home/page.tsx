@@ -6,6 +6,7 @@ import StatRow from "@/components/StatRow";
 import Navbar from "../../components/Navbar";
 import StaffList from "../../components/StaffList";
 import { LOOP_DURATION } from "@/lib/three/variables";
+import { HOME_DATA_QUERY, statsAt } from "@/lib/roomSeries";
 import IntButton from "@/components/IntButton";
 
 export default function SecurityHome() {
@@ -21,7 +22,7 @@ export default function SecurityHome() {
 
   // --- Initial Data Fetch ---
   useEffect(() => {
-    fetch("/api/security_home_data")
+    fetch(`/api/security_home_data?${HOME_DATA_QUERY}`)
       .then((res) => res.json())
       .then((data) => {
         setStaffList(data.staff_list || []);
@@ -47,9 +48,7 @@ export default function SecurityHome() {
       const newStats: any = {};
       roomsData.forEach(room => {
         if (room.timeseries?.length > 0) {
-          newStats[room.room_id] = room.timeseries.find((e: any) => e.time === currentFrame) 
-            || [...room.timeseries].reverse().find((e: any) => e.time <= currentFrame) 
-            || room.timeseries[0];
+          newStats[room.room_id] = statsAt(room.timeseries, currentFrame);
         } else {
           newStats[room.room_id] = { occupancy: "--", temperature: "--" };
         }
@@ -0,0 +1,22 @@
+// The home endpoints send minute rollups by default ({time, occupancy,
+// max_occupancy, temperature, ac_on_fraction, lights_on_fraction, samples});
+// ?raw=1 still returns the raw {time, occupancy, temperature, ac, lights} rows.
+export const HOME_DATA_QUERY = "resolution=60";
+
+// Row shown at `frame`: the one starting there, else the last one before it,
+// else the first. Rollup rows are turned into the raw row shape the pages
+// read, with AC/lights counted as on when they were on most of the bucket.
+export function statsAt(timeseries, frame) {
+    const row = timeseries.find((e) => e.time === frame)
+        || [...timeseries].reverse().find((e) => e.time <= frame)
+        || timeseries[0];
+    if (!row || row.ac_on_fraction === undefined) return row;
+    return {
+        time: row.time,
+        occupancy: Math.round(row.occupancy),
+        max_occupancy: row.max_occupancy,
+        temperature: row.temperature,
+        ac: row.ac_on_fraction >= 0.5,
+        lights: row.lights_on_fraction >= 0.5
+    };
+}
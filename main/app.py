@@ -4,19 +4,29 @@ monkey.patch_all()
 import gevent
 import os
 import json
+import struct
+import time
 import redis
 from threading import Thread
+from bson import ObjectId
 from dotenv import load_dotenv
 
 from flask import Flask, request, session, jsonify, send_from_directory
 from flask_cors import CORS  # <--- ADD THIS
-from flask_socketio import SocketIO, emit, disconnect
+from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Import your DB and Models
 from models import db, Role, User, Rooms, SecurityEmails, RoomData 
 from smtp_facilities import send_facilities_alert
 from smtp_security import send_emergency_alert
+from timeseries import DEFAULT_RESOLUTION, bound_window, parse_window, room_timeseries
+from rollups import room_summaries
+from ingest import SensorIngest
+from live_state import DeviceStateStore
+from wire_format import decode as decode_tracking
+from fanout import TrackingFanout
+from tracking_bus import TrackingBus
 
 load_dotenv()
 
@@ -39,15 +49,46 @@ app.config['MONGODB_SETTINGS'] = {
 db.init_app(app)
 
 # Redis setup
-redis_client = redis.Redis(host='13.204.143.167', port=6379, decode_responses=True)
+REDIS_HOST = os.getenv("REDIS_HOST", '13.204.143.167')
+redis_client = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
+# Tracker messages may be packed binary (wire_format.py), so the listener reads raw bytes
+redis_listener_client = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=False)
 # live_tracking_data = {}
 redis_thread = None
 
+# PUBLISH by default; TRACKING_BUS=stream switches to Redis Streams with a consumer group per
+# worker (TRACKING_GROUP/TRACKING_CONSUMER, default the host name), so every worker gets every
+# frame and resumes from its last ID after a restart
+tracking_bus = TrackingBus.from_env(redis_listener_client)
+
 # socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# global iot data object
-latest_iot_data = {
+# Latest reading per ESP32 device. IOT_DEVICE_ROOMS maps device ids to room ids,
+# e.g. {"lab_station_1": "C-007"}; IOT_STATE_REDIS=1 shares the table between workers
+device_state = DeviceStateStore(
+    device_rooms=json.loads(os.getenv("IOT_DEVICE_ROOMS", "{}")),
+    redis_client=redis_client if os.getenv("IOT_STATE_REDIS") == "1" else None
+)
+
+# ESP32 readings are queued here and flushed to Redis/MongoDB in batches
+ingest = SensorIngest(
+    redis_client,
+    device_state,
+    bus=tracking_bus,
+    flush_interval=float(os.getenv("INGEST_FLUSH_SECONDS", "1.0")),
+    batch_size=int(os.getenv("INGEST_BATCH_SIZE", "500"))
+)
+ingest_thread = None
+
+# Room whose occupancy the live tracker's room_count describes
+TRACKING_ROOM = os.getenv("TRACKING_ROOM", "C-007")
+
+# Tracker messages are coalesced per lab room and emitted FANOUT_TICK_HZ times a second
+fanout = TrackingFanout(socketio, TRACKING_ROOM, tick_hz=float(os.getenv("FANOUT_TICK_HZ", "12")))
+fanout_thread = None
+
+EMPTY_IOT_READING = {
     "device_id": None,
     "temperature": None,
     "humidity": None,
@@ -65,30 +106,32 @@ def serve_active_files(filename):
 
 def redis_listener():
     """Background thread that listens to Redis and broadcasts to connected clients"""
-    pubsub = redis_client.pubsub()
-    
-    # 🌟 Subscribe to BOTH channels!
-    pubsub.subscribe('live_detections', 'iot_stream')
-    
-    print("🎧 Redis listener started... Waiting for YOLO and IoT data...")
+    print(f"🎧 Redis listener started ({tracking_bus.mode})... Waiting for YOLO and IoT data...")
     
-    for message in pubsub.listen():
-        if message['type'] == 'message':
-            channel = message['channel']
-            raw_data = message['data']
+    # 🌟 Listen on BOTH channels!
+    for channel, raw_data in tracking_bus.listen(['live_detections', 'iot_stream']):
+        try:
+            # Packed binary or JSON, whichever the publisher sent; always a dict (ValueError otherwise)
+            parsed_data = decode_tracking(raw_data)
             
-            try:
-                parsed_data = json.loads(raw_data)
-                
-                # Route the data to the correct frontend event
-                if channel == 'live_detections':
-                    socketio.emit('live_tracking_update', parsed_data)
+            # Route the data to the correct frontend event
+            if channel == 'live_detections':
+                detections = parsed_data.get('detections', [])
+                if not isinstance(detections, list) or not all(isinstance(d, dict) for d in detections):
+                    raise ValueError("'detections' is not a list of objects")
+                if 'room_count' in parsed_data:
+                    ingest.set_room_occupancy(parsed_data.get('room_id') or TRACKING_ROOM,
+                                              parsed_data['room_count'])
+                fanout.offer(parsed_data)
+            
+            elif channel == 'iot_stream':
+                socketio.emit('iot_update', parsed_data)
                 
-                elif channel == 'iot_stream':
-                    socketio.emit('iot_update', parsed_data)
-                    
-            except json.JSONDecodeError as e:
-                print(f"❌ Error decoding message from {channel}: {e}")
+        except (TypeError, ValueError, struct.error) as e:
+            print(f"❌ Error decoding message from {channel}: {e}")
+        except Exception as e:
+            # This greenlet is the only listener: log anything else and keep going
+            print(f"❌ Error handling message from {channel}: {e!r}")
 
 def start_redis_listener():
     """Start Redis listener in background thread"""
@@ -98,6 +141,20 @@ def start_redis_listener():
         redis_thread = gevent.spawn(redis_listener)
         print("✅ Redis listener greenlet started")
 
+def start_ingest():
+    """Start the batched IoT flusher in the background"""
+    global ingest_thread
+    if ingest_thread is None:
+        ingest_thread = gevent.spawn(ingest.run_forever)
+        print("✅ IoT ingest flusher greenlet started")
+
+def start_fanout():
+    """Start the coalescing Socket.IO fan-out in the background"""
+    global fanout_thread
+    if fanout_thread is None:
+        fanout_thread = gevent.spawn(fanout.run_forever)
+        print("✅ Tracking fan-out greenlet started")
+
 @socketio.on('connect')
 def handle_connect():
     print(f"👤 Frontend Client connected: {request.sid}")
@@ -106,6 +163,18 @@ def handle_connect():
 def handle_disconnect():
     print(f"👤 Frontend Client disconnected: {request.sid}")
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Clients join the room they are viewing to receive its tracking updates"""
+    room_id = (data or {}).get('room_id') or TRACKING_ROOM
+    join_room(room_id)
+    emit('subscribed', {'room_id': room_id})
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    room_id = (data or {}).get('room_id') or TRACKING_ROOM
+    leave_room(room_id)
+
 # ---------------------------------------------------------
 # AUTHENTICATION APIs
 # ---------------------------------------------------------
@@ -328,23 +397,22 @@ def get_security_info():
 
 @app.route('/api/room_data', methods=['GET'])
 def get_room_data():
-    """Returns all RoomData entries for a given room"""
+    """Returns RoomData entries for a given room.
+
+    Optional start/end restrict the time window; resolution (seconds)
+    returns bucketed aggregates instead of raw points.
+    """
     room_id = request.args.get('room_id')
+    try:
+        window = parse_window(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         room = Rooms.objects(room_id=room_id).first()
         if not room:
             return jsonify({'error': 'Room not found'}), 404
         
-        data_entries = RoomData.objects(room=room)
-        data_list = []
-        for d in data_entries:
-            data_list.append({
-                'time': d.time,
-                'occupancy': d.occupancy,
-                'temperature': d.temperature,
-                'ac': d.ac,
-                'lights': d.lights
-            })
+        data_list = room_timeseries([room.id], window)[room.id]
         
         return jsonify({'room_data': data_list})
     except Exception as e:
@@ -383,56 +451,73 @@ def get_user_assignments(user_db_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _staff_for_department(department):
+    """Returns the staff list for one department in two queries"""
+    role_names = {
+        r['_id']: r['name']
+        for r in Role.objects(department=department).only('name').as_pymongo()
+    }
+    staff_list = []
+    for u in User.objects(role__in=list(role_names)).only('user_id', 'name', 'email', 'role').as_pymongo():
+        staff_list.append({
+            'id': str(u['_id']),
+            'user_id': u.get('user_id'),
+            'name': u.get('name'),
+            'email': u.get('email'),
+            'role': role_names.get(u.get('role'))
+        })
+    return staff_list
+
+
 @app.route('/api/security_home_data', methods=['GET'])
 def api_security_home_data():
+    """Staff, assignments and per-room timeseries for the security dashboards.
+
+    Timeseries are minute rollups over the last day of stored data unless
+    start/end/resolution say otherwise; raw=1 returns the raw points.
+    """
     try:
-        staff_list = []
-        for u in User.objects():
-            if u.role and u.role.department == 'Security':
-                staff_list.append({
-                    'id': str(u.id),
-                    'user_id': u.user_id,
-                    'name': u.name,
-                    'email': u.email,
-                    'role': u.role.name
-                })
-        
-        staff_rooms = {}
-        for staff in staff_list:
-            user_obj = User.objects(id=staff['id']).first()
-            rooms_for_staff = []
-            for se in SecurityEmails.objects(user=user_obj):
-                if se.room:
-                    rooms_for_staff.append(se.room.room_name)
-            staff_rooms[staff['user_id']] = rooms_for_staff
+        window = parse_window(request.args, default_resolution=DEFAULT_RESOLUTION)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        # Fixed number of round trips: roles, users, assignments, rooms, room data, rollups
+        staff_list = _staff_for_department('Security')
+
+        all_rooms = list(Rooms.objects().order_by('room_id')
+                         .only('room_id', 'room_name', 'max_occupancy').as_pymongo())
+        room_names = {r['_id']: r.get('room_name') for r in all_rooms}
+
+        staff_rooms = {staff['user_id']: [] for staff in staff_list}
+        user_keys = {ObjectId(staff['id']): staff['user_id'] for staff in staff_list}
+        assignments = SecurityEmails.objects(user__in=list(user_keys)).only('user', 'room').as_pymongo()
+        for se in assignments:
+            room_name = room_names.get(se.get('room'))
+            if room_name:
+                staff_rooms[user_keys[se['user']]].append(room_name)
+
+        rooms = [r for r in all_rooms if r.get('room_id') != "C-067"]
+        room_ids = [r['_id'] for r in rooms]
+        window = bound_window(room_ids, window)
+        timeseries = room_timeseries(room_ids, window)
+        summaries = room_summaries(room_ids)
 
         rooms_data = []
-        for r in Rooms.objects().order_by('room_id'):
-            if r.room_id == "C-067":
-                continue
-            rd_entries = RoomData.objects(room=r).order_by('time')
-            timeseries = []
-            for rd in rd_entries:
-                timeseries.append({
-                    'time': rd.time,
-                    'occupancy': rd.occupancy,
-                    'temperature': rd.temperature,
-                    'ac': rd.ac,
-                    'lights': rd.lights
-                })
-
+        for r in rooms:
             rooms_data.append({
-                'id': str(r.id),
-                'room_id': r.room_id,
-                'name': r.room_name,
-                'max_occupancy': r.max_occupancy,
-                'timeseries': timeseries
+                'id': str(r['_id']),
+                'room_id': r.get('room_id'),
+                'name': r.get('room_name'),
+                'max_occupancy': r.get('max_occupancy'),
+                'timeseries': timeseries[r['_id']],
+                'summary': summaries[r['_id']]
             })
 
         return jsonify({
             'staff_list': staff_list,
             'staff_rooms': staff_rooms,
             'rooms': rooms_data,
+            'window': window,
             'current_role': session.get('role') ,
             'name': session.get('name')
         }), 200
@@ -451,43 +536,36 @@ def get_facility_info():
 
 @app.route('/api/facility_home_data', methods=['GET'])
 def api_facility_home_data():
+    """Staff and per-room timeseries for the facilities dashboards, windowed like security_home_data"""
     try:
-        staff_list = []
-        for u in User.objects():
-            if u.role and u.role.department == 'Facilities':
-                staff_list.append({
-                    'id': str(u.id),
-                    'user_id': u.user_id,
-                    'name': u.name,
-                    'email': u.email,
-                    'role': u.role.name
-                })
+        window = parse_window(request.args, default_resolution=DEFAULT_RESOLUTION)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        staff_list = _staff_for_department('Facilities')
 
-        rooms_data = []
-        for r in Rooms.objects().order_by('room_id'):
-            if r.room_id == "C-067":
-                continue
-            rd_entries = RoomData.objects(room=r).order_by('time')
-            timeseries = []
-            for rd in rd_entries:
-                timeseries.append({
-                    'time': rd.time,
-                    'occupancy': rd.occupancy,
-                    'temperature': rd.temperature,
-                    'ac': rd.ac,
-                    'lights': rd.lights
-                })
+        rooms = [r for r in Rooms.objects().order_by('room_id')
+                 .only('room_id', 'room_name').as_pymongo()
+                 if r.get('room_id') != "C-067"]
+        room_ids = [r['_id'] for r in rooms]
+        window = bound_window(room_ids, window)
+        timeseries = room_timeseries(room_ids, window)
+        summaries = room_summaries(room_ids)
 
+        rooms_data = []
+        for r in rooms:
             rooms_data.append({
-                'id': str(r.id),
-                'room_id': r.room_id,
-                'name': r.room_name,
-                'timeseries': timeseries
+                'id': str(r['_id']),
+                'room_id': r.get('room_id'),
+                'name': r.get('room_name'),
+                'timeseries': timeseries[r['_id']],
+                'summary': summaries[r['_id']]
             })
 
         return jsonify({
             'staff_list': staff_list,  
             'rooms': rooms_data,
+            'window': window,
             'current_role': session.get('role'),
             'name': session.get('name')
         }), 200
@@ -495,44 +573,101 @@ def api_facility_home_data():
         return jsonify({'error': str(e)}), 500
 
 
-# ESP32 data route
+# ESP32 data route (dht_lidar_esp32.ino posts to /data without a device_id)
 @app.route('/sensor-data', methods=['POST'])
+@app.route('/data', methods=['POST'])
 def receive_data():
     # Grab the JSON data sent by the ESP32
-    global latest_iot_data
-    data = request.get_json(force=True)
+    data = request.get_json(force=True, silent=True)
     
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"error": "No JSON payload received"}), 400
     
-    latest_iot_data = data
+    # Boards without a device_id are told apart by address instead of overwriting each other
+    if not data.get('device_id'):
+        data['device_id'] = f"esp32@{request.remote_addr}"
 
-    try:
-        # Publish this JSON to the 'iot_stream' channel on AWS
-        redis_client.publish('iot_stream', json.dumps(data))
-        print("☁️ Successfully published IoT data to AWS Redis!")
-    except redis.ConnectionError:
-        print("⚠️ Warning: Could not connect to AWS Redis to publish IoT data.")
-    
-    # debug printing
-    print("\n--- New IoT Data Received ---")
-    print(f"Device ID:    {data.get('device_id')}")
-    print(f"Temperature:  {data.get('temperature')} °C")
-    print(f"Humidity:     {data.get('humidity')} %")
-    print(f"Lights:    {data.get('lights_state')}")
-    print(f"AC: {data.get('ac_state')}")
-    print("-----------------------------\n")
+    # Queued only; Redis publish and MongoDB writes happen in the flusher
+    ingest.submit(data)
 
     # Send a success response back to the ESP32
-    return jsonify({"status": "success", "message": "Data received and logged"}), 200
+    return jsonify({"status": "success", "message": "Data received and queued"}), 200
 
 @app.route('/api/live_sensor_data', methods=['GET'])
 def get_live_sensor_data():
-    return jsonify(latest_iot_data), 200
+    """Latest IoT state, optionally filtered by ?room_id= / ?device_id=.
+
+    The newest matching reading stays at the top level (the shape the
+    dashboards already read) and every matching device is listed under
+    'devices'. Supports If-None-Match so pollers get 304s.
+    """
+    devices = device_state.snapshot(
+        room_id=request.args.get('room_id'),
+        device_id=request.args.get('device_id')
+    )
+    body = dict(devices[0]['reading'] if devices else EMPTY_IOT_READING)
+    body['devices'] = devices
+
+    response = jsonify(body)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/ingest_stats', methods=['GET'])
+def get_ingest_stats():
+    return jsonify(dict(ingest.stats, devices=len(device_state.devices))), 200
+
+@app.route('/api/fanout_stats', methods=['GET'])
+def get_fanout_stats():
+    return jsonify(fanout.stats), 200
+
+@app.route('/api/live_history', methods=['GET'])
+def get_live_history():
+    """Recent tracker frames read straight from the Redis stream (TRACKING_BUS=stream).
+
+    ?since= is the last stream id the client saw (exclusive) or a unix time
+    in seconds, defaulting to the last 60 seconds. Pass the returned
+    'last_id' back as ?since= to poll for newer frames.
+    """
+    if tracking_bus.mode != 'stream':
+        return jsonify({'error': 'Live history needs TRACKING_BUS=stream'}), 404
+
+    channel = request.args.get('channel', 'live_detections')
+    if channel not in ('live_detections', 'tracking_stream', 'iot_stream'):
+        return jsonify({'error': f'Unknown channel {channel}'}), 400
+    since = request.args.get('since') or time.time() - 60
+    limit = max(1, min(request.args.get('limit', 500, type=int), 5000))
+
+    try:
+        entries = tracking_bus.history(channel, since=since, count=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except redis.RedisError as e:
+        return jsonify({'error': str(e)}), 503
+
+    frames = []
+    for entry_id, raw_data in entries:
+        try:
+            data = decode_tracking(raw_data)
+        except (TypeError, ValueError, struct.error):
+            continue
+        frames.append({'id': entry_id, 'time': int(entry_id.split('-')[0]) / 1000, 'data': data})
+
+    return jsonify({
+        'channel': channel,
+        'frames': frames,
+        'last_id': entries[-1][0] if entries else request.args.get('since')
+    }), 200
+
+@app.route('/api/bus_stats', methods=['GET'])
+def get_bus_stats():
+    return jsonify(dict(tracking_bus.stats, mode=tracking_bus.mode, last_ids=tracking_bus.last_ids)), 200
 
 if __name__ == '__main__':
     print("🚀 Booting up server and starting background tasks...")
     start_redis_listener()
+    start_ingest()
+    start_fanout()
 
     socketio.run(app, 
                 host='0.0.0.0',  
@@ -0,0 +1,94 @@
+# bench_ingest.py
+# Load test for the /sensor-data ingest queue. Simulates --devices ESP32 boards
+# posting readings over --concurrency keep-alive connections for --duration
+# seconds, then prints sustained POSTs/s, latency percentiles and the server's
+# /api/ingest_stats (flushes, published, persisted, dropped).
+#
+#   python app.py                                   # in another terminal
+#   python bench_ingest.py --devices 5000 --concurrency 200 --duration 30
+from gevent import monkey
+monkey.patch_all()
+
+import json
+import time
+import random
+import argparse
+import http.client
+from urllib.parse import urlparse
+
+import gevent
+
+
+def worker(url, device_ids, deadline, latencies, errors):
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+    i = random.randrange(len(device_ids))
+    while time.perf_counter() < deadline:
+        device_id = device_ids[i % len(device_ids)]
+        i += 1
+        body = json.dumps({
+            "device_id": device_id,
+            "temperature": round(random.uniform(18, 30), 2),
+            "humidity": round(random.uniform(30, 70), 2),
+            "lights_state": random.choice(["ON", "OFF"]),
+            "ac_state": random.choice(["ON", "OFF"])
+        })
+        start = time.perf_counter()
+        try:
+            conn.request("POST", target.path, body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /sensor-data")
+    parser.add_argument('--url', default='http://localhost:1767/sensor-data')
+    parser.add_argument('--devices', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30.0)
+    args = parser.parse_args()
+
+    device_ids = [f"sim_device_{i}" for i in range(args.devices)]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+
+    print(f"🔥 {args.devices} simulated devices, {args.concurrency} connections, {args.duration:.0f}s...")
+    start = time.perf_counter()
+    gevent.joinall([
+        gevent.spawn(worker, args.url, device_ids, deadline, latencies, errors)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    print(f"POSTs:      {len(latencies)} ok, {len(errors)} failed")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} POSTs/s")
+    print(f"Latency:    p50 {percentile(latencies, 0.5):.1f} ms | p95 {percentile(latencies, 0.95):.1f} ms | "
+          f"p99 {percentile(latencies, 0.99):.1f} ms")
+
+    # Give the flusher one interval to drain before reading its counters
+    gevent.sleep(2)
+    target = urlparse(args.url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+    conn.request("GET", "/api/ingest_stats")
+    print(f"Server:     {conn.getresponse().read().decode()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# bench_roomdata_indexes.py
+# Before/after benchmark for the RoomData indexes and the time-series layout.
+# Seeds a LOCAL mongod with --rows documents spread over --rooms rooms, then
+# times the dashboard reads (one room ordered by time, a one-hour window and a
+# bucketed aggregate) on three layouts:
+#   1. plain collection, no indexes (the old layout)
+#   2. plain collection with the (room, time) index from models.py
+#   3. time-series collection (migrate_roomdata.py timeseries) with the same index
+#
+#   python bench_roomdata_indexes.py --rows 10000000 --rooms 12
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient, ASCENDING
+
+from timeseries import bucket_stages
+
+BENCH_URI = os.getenv("BENCH_MONGODB_URI", "mongodb://localhost:27017/digital_twin_bench")
+
+
+def seed(coll, room_ids, n_rows, batch_size=100000):
+    per_room = n_rows // len(room_ids)
+    batch = []
+    inserted = 0
+    start = time.perf_counter()
+    for rid in room_ids:
+        for t in range(per_room):
+            batch.append({
+                'room': rid,
+                'time': t,
+                'ts': datetime.fromtimestamp(t, tz=timezone.utc).replace(tzinfo=None),
+                'occupancy': t % 40,
+                'temperature': 22.0 + (t % 50) / 10,
+                'ac': bool(t % 3),
+                'lights': bool(t % 2)
+            })
+            if len(batch) >= batch_size:
+                coll.insert_many(batch, ordered=False)
+                inserted += len(batch)
+                batch = []
+                print(f"  seeded {inserted}/{n_rows} ({inserted / (time.perf_counter() - start):.0f} docs/s)", end='\r')
+    if batch:
+        coll.insert_many(batch, ordered=False)
+    print()
+    return per_room
+
+
+def timed(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def plan_stage(coll, query):
+    plan = coll.find(query).sort('time', ASCENDING).explain()['queryPlanner']['winningPlan']
+    while 'inputStage' in plan and plan.get('stage') not in ('COLLSCAN', 'IXSCAN'):
+        plan = plan['inputStage']
+    return plan.get('stage', '?')
+
+
+def run_queries(label, coll, room_id, per_room, repeats):
+    hour_start = per_room // 2
+    window = {'room': room_id, 'time': {'$gte': hour_start, '$lte': hour_start + 3600}}
+
+    full = timed(lambda: list(coll.find({'room': room_id}, {'_id': 0}).sort('time', ASCENDING)), repeats)
+    hour = timed(lambda: list(coll.find(window, {'_id': 0}).sort('time', ASCENDING)), repeats)
+    buckets = timed(lambda: list(coll.aggregate([{'$match': window}] + bucket_stages(60))), repeats)
+
+    print(f"{label:<24} plan: {plan_stage(coll, window):<9} | full room: {full:9.1f} ms | "
+          f"1h window: {hour:8.1f} ms | 1h @ 60s buckets: {buckets:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RoomData index / collection layouts")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--rooms', type=int, default=12)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    if 'localhost' not in BENCH_URI and '127.0.0.1' not in BENCH_URI:
+        sys.exit("Refusing to seed a non-local database. Set BENCH_MONGODB_URI to a local mongod.")
+
+    client = MongoClient(BENCH_URI)
+    database = client.get_default_database()
+    room_ids = [ObjectId() for _ in range(args.rooms)]
+    probe = room_ids[len(room_ids) // 2]
+
+    database.drop_collection('bench_room_data')
+    database.drop_collection('bench_room_data_ts')
+
+    plain = database['bench_room_data']
+    print(f"Seeding {args.rows} rows into a plain collection...")
+    per_room = seed(plain, room_ids, args.rows)
+    run_queries('no index', plain, probe, per_room, args.repeats)
+
+    plain.create_index([('room', ASCENDING), ('time', ASCENDING)])
+    run_queries('(room, time) index', plain, probe, per_room, args.repeats)
+
+    database.create_collection(
+        'bench_room_data_ts',
+        timeseries={'timeField': 'ts', 'metaField': 'room', 'granularity': 'seconds'}
+    )
+    ts = database['bench_room_data_ts']
+    print(f"Seeding {args.rows} rows into a time-series collection...")
+    seed(ts, room_ids, args.rows)
+    ts.create_index([('room', ASCENDING), ('time', ASCENDING)])
+    run_queries('time-series + index', ts, probe, per_room, args.repeats)
+
+    for name in ('bench_room_data', 'bench_room_data_ts'):
+        stats = database.command('collStats', name)
+        print(f"{name:<24} storage: {stats['storageSize'] / 1e6:8.1f} MB | "
+              f"indexes: {stats['totalIndexSize'] / 1e6:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# bench_security_home.py
+# Seeds a throwaway database on a LOCAL mongod and compares the number of
+# MongoDB round trips and the latency of /api/security_home_data against the
+# old per-user / per-room implementation.
+#
+#   python bench_security_home.py --staff 300 --rooms 12 --rows 1200
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from pymongo import monitoring
+
+BENCH_URI = os.getenv("BENCH_MONGODB_URI", "mongodb://localhost:27017/digital_twin_bench")
+os.environ["MONGODB_URI"] = BENCH_URI
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts every command pymongo sends to the server (find, getMore, aggregate...)"""
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+# Must be registered before app.py creates its MongoClient
+monitoring.register(counter)
+
+from app import app  # noqa: E402
+from models import Role, User, Rooms, SecurityEmails, RoomData, RoomDataRollup  # noqa: E402
+from rollups import rebuild_rollups  # noqa: E402
+
+
+def seed(n_staff, n_rooms, n_rows, rooms_per_staff):
+    for doc in (RoomData, RoomDataRollup, SecurityEmails, User, Rooms, Role):
+        doc.drop_collection()
+
+    sec = Role(name='Security Officer', department='Security', facilities_email=False).save()
+    Role(name='Facilities Officer', department='Facilities', facilities_email=True).save()
+
+    rooms = []
+    for i in range(n_rooms):
+        rooms.append(Rooms(room_id=f'B-{i:03d}', room_name=f'Bench Room {i}',
+                           room_floor='Ground Floor', max_occupancy=50).save())
+
+    users = User.objects.insert([
+        User(user_id=f'staff{i}', name=f'Staff {i}', email=f'staff{i}@none',
+             password='x', role=sec)
+        for i in range(n_staff)
+    ])
+    SecurityEmails.objects.insert([
+        SecurityEmails(user=u, room=rooms[(i + k) % n_rooms])
+        for i, u in enumerate(users) for k in range(rooms_per_staff)
+    ])
+    for r in rooms:
+        RoomData.objects.insert([
+            RoomData(room=r, time=t, occupancy=t % 40, temperature=24.0,
+                     ac=bool(t % 2), lights=True)
+            for t in range(n_rows)
+        ], load_bulk=False)
+    rebuild_rollups()
+
+
+def legacy_security_home_data():
+    """The pre-batching implementation, kept here for comparison only"""
+    staff_list = []
+    for u in User.objects():
+        if u.role and u.role.department == 'Security':
+            staff_list.append({'id': str(u.id), 'user_id': u.user_id, 'name': u.name,
+                               'email': u.email, 'role': u.role.name})
+    staff_rooms = {}
+    for staff in staff_list:
+        user_obj = User.objects(id=staff['id']).first()
+        rooms_for_staff = []
+        for se in SecurityEmails.objects(user=user_obj):
+            if se.room:
+                rooms_for_staff.append(se.room.room_name)
+        staff_rooms[staff['user_id']] = rooms_for_staff
+    rooms_data = []
+    for r in Rooms.objects().order_by('room_id'):
+        timeseries = [{'time': rd.time, 'occupancy': rd.occupancy, 'temperature': rd.temperature,
+                       'ac': rd.ac, 'lights': rd.lights}
+                      for rd in RoomData.objects(room=r).order_by('time')]
+        rooms_data.append({'room_id': r.room_id, 'timeseries': timeseries})
+    return staff_list, staff_rooms, rooms_data
+
+
+def measure(label, fn, repeats):
+    timings = []
+    queries = 0
+    for _ in range(repeats):
+        before = counter.count
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries = counter.count - before
+    print(f"{label:<10} round trips: {queries:>6} | "
+          f"median: {statistics.median(timings):8.1f} ms | best: {min(timings):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/security_home_data")
+    parser.add_argument('--staff', type=int, default=300)
+    parser.add_argument('--rooms', type=int, default=12)
+    parser.add_argument('--rows', type=int, default=1200, help='RoomData rows per room')
+    parser.add_argument('--rooms-per-staff', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    if 'localhost' not in BENCH_URI and '127.0.0.1' not in BENCH_URI:
+        sys.exit("Refusing to seed a non-local database. Set BENCH_MONGODB_URI to a local mongod.")
+
+    with app.app_context():
+        print(f"Seeding {args.staff} staff, {args.rooms} rooms, {args.rows} rows/room...")
+        seed(args.staff, args.rooms, args.rows, args.rooms_per_staff)
+
+        client = app.test_client()
+
+        def get(url):
+            resp = client.get(url)
+            assert resp.status_code == 200, resp.get_json()
+
+        measure('legacy', legacy_security_home_data, args.repeats)
+        # raw=1 sends the same points as legacy; the default sends minute rollups
+        measure('batched', lambda: get('/api/security_home_data?raw=1'), args.repeats)
+        measure('rollups', lambda: get('/api/security_home_data'), args.repeats)
+
+
+if __name__ == '__main__':
+    main()
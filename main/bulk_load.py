@@ -0,0 +1,138 @@
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+
+from models import RoomData
+from rollups import apply_rollups, rebuild_rollups
+
+
+def _strided_counts(occupancy_csv, stride, chunksize):
+    """Yields arrays of every `stride`-th Count value from an occupancy CSV"""
+    position = 0
+    for chunk in pd.read_csv(occupancy_csv, usecols=['Count'], chunksize=chunksize):
+        counts = chunk['Count'].fillna(0).to_numpy()
+        offset = (-position) % stride
+        yield counts[offset::stride].astype(np.int64)
+        position += len(counts)
+
+
+class _CountBuffer:
+    """Hands out occupancy values in arbitrary-sized runs from a chunked reader"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = deque()
+        self.available = 0
+
+    def take(self, n):
+        while self.available < n:
+            nxt = next(self.chunks, None)
+            if nxt is None:
+                break
+            self.pending.append(nxt)
+            self.available += len(nxt)
+        parts = []
+        needed = min(n, self.available)
+        while needed:
+            head = self.pending.popleft()
+            parts.append(head[:needed])
+            if len(head) > needed:
+                self.pending.appendleft(head[needed:])
+            needed -= len(parts[-1])
+        taken = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        self.available -= len(taken)
+        return taken
+
+
+def frame_chunks(iot_csv, occupancy_csv=None, occupancy_column='occu',
+                 occupancy_stride=1, limit=None, chunksize=20000):
+    """Streams an IoT CSV (timestamp,temp,ac,lights) as RoomData-shaped DataFrames.
+
+    Occupancy comes from `occupancy_column` of the IoT CSV or, when
+    `occupancy_csv` is given, from every `occupancy_stride`-th `Count` of that
+    file (the frame-level people counter logs). Rows stop at whichever file
+    runs out first, or at `limit`. All column mapping is vectorised.
+    """
+    counts = None
+    if occupancy_csv is not None:
+        counts = _CountBuffer(_strided_counts(occupancy_csv, occupancy_stride, chunksize))
+
+    remaining = limit
+    for chunk in pd.read_csv(iot_csv, chunksize=chunksize):
+        if remaining is not None:
+            chunk = chunk.head(remaining)
+        if counts is not None:
+            occupancy = counts.take(len(chunk))
+            chunk = chunk.head(len(occupancy))
+        else:
+            occupancy = chunk[occupancy_column].fillna(0).to_numpy().astype(np.int64)
+        if chunk.empty:
+            return
+
+        yield pd.DataFrame({
+            'time': chunk['timestamp'].to_numpy().astype(np.int64),
+            'occupancy': occupancy,
+            'temperature': chunk['temp'].to_numpy().astype(np.float64),
+            'ac': chunk['ac'].eq('On').to_numpy(),
+            'lights': chunk['lights'].eq('On').to_numpy()
+        })
+
+        if remaining is not None:
+            remaining -= len(chunk)
+            if remaining <= 0:
+                return
+
+
+def _records(room_id, frame):
+    """Plain-Python RoomData documents for one chunk (tolist() gives native types)"""
+    ts = pd.to_datetime(frame['time'], unit='s').dt.to_pydatetime().tolist()
+    return [
+        {'room': room_id, 'time': t, 'occupancy': o, 'temperature': temp, 'ac': ac, 'lights': lights, 'ts': stamp}
+        for t, o, temp, ac, lights, stamp in zip(
+            frame['time'].tolist(), frame['occupancy'].tolist(), frame['temperature'].tolist(),
+            frame['ac'].tolist(), frame['lights'].tolist(), ts
+        )
+    ]
+
+
+def load_frames(room, frames, mode='insert'):
+    """Writes RoomData chunks with unordered bulk writes and keeps rollups current.
+
+    mode='insert' appends new rows (insert_many) and folds them into the
+    rollups incrementally; mode='upsert' replaces rows matching (room, time)
+    and rebuilds the rollup days it touched. Returns (rows, seconds).
+    """
+    collection = RoomData._get_collection()
+    room_id = getattr(room, 'id', room)
+    rows = 0
+    first = last = None
+    start = time.perf_counter()
+
+    for frame in frames:
+        records = _records(room_id, frame)
+        if mode == 'insert':
+            collection.insert_many(records, ordered=False)
+            apply_rollups(records)
+        else:
+            collection.bulk_write([
+                UpdateOne({'room': room_id, 'time': r['time']}, {'$set': r}, upsert=True)
+                for r in records
+            ], ordered=False)
+            chunk_first, chunk_last = int(frame['time'].min()), int(frame['time'].max())
+            first = chunk_first if first is None else min(first, chunk_first)
+            last = chunk_last if last is None else max(last, chunk_last)
+        rows += len(records)
+
+    if mode != 'insert' and rows:
+        rebuild_rollups([room_id], first, last)
+
+    elapsed = time.perf_counter() - start
+    print(f"📥 Loaded {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+    return rows, elapsed
+
+
+def load_csv(room, iot_csv, mode='insert', **chunk_options):
+    """frame_chunks() + load_frames() in one call"""
+    return load_frames(room, frame_chunks(iot_csv, **chunk_options), mode=mode)
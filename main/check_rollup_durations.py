@@ -0,0 +1,71 @@
+# check_rollup_durations.py
+# Regression check: live ESP32 readings arrive every 5 s, one RoomData row
+# each, and the rollups have to weight every row by the time it covers.
+# Feeds SensorIngest readings 5 s apart (no Redis or MongoDB needed: only the
+# row building and the rollup folding run) and checks the AC-on-while-empty
+# time, the time-weighted means, the gap handling and that the 1 Hz seeded
+# rows (no duration) still count one second each.
+#
+#   python check_rollup_durations.py
+import sys
+from unittest import mock
+
+from ingest import SensorIngest
+from live_state import DeviceStateStore
+from rollups import fold_rollups
+
+ROOM = 'C-006'
+ROOM_KEY = 'room-c006'
+START = 1_760_000_040   # a minute boundary
+
+
+def ingest_rows(times, occupancy=0, ac='ON', device='esp32_1', ingest=None):
+    if ingest is None:
+        ingest = SensorIngest(None, DeviceStateStore({device: ROOM}))
+        ingest._room_keys[ROOM] = ROOM_KEY
+    ingest.set_room_occupancy(ROOM, occupancy)
+    with mock.patch('ingest.time.time', side_effect=times):
+        for _ in times:
+            ingest.submit({'device_id': device, 'temperature': 24.0, 'humidity': 50.0,
+                           'ac_state': ac, 'lights_state': 'OFF'})
+    batch, ingest._pending = ingest._pending, []
+    return ingest._rows(batch)[1], ingest
+
+
+failures = 0
+
+
+def check(name, got, expected):
+    global failures
+    ok = got == expected
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} {name:<48} {got!r}" + ("" if ok else f" (expected {expected!r})"))
+
+
+# One minute of an empty room with the AC on: 12 readings, 5 s apart
+rows, ingest = ingest_rows([START + 5 * i + 0.2 for i in range(12)])
+check("durations of readings 5 s apart", [r['duration'] for r in rows], [5] * 12)
+minute = fold_rollups(rows)[(ROOM_KEY, 'minute', START)]
+check("minute bucket: rows", minute['samples'], 12)
+check("minute bucket: seconds covered", minute['seconds'], 60)
+check("minute bucket: AC-on-while-empty seconds", minute['ac_on_empty_seconds'], 60)
+
+# Next minute the room is occupied by 3 for 30 s; the time-weighted mean is 1.5
+more, _ = ingest_rows([START + 60 + 5 * i + 0.2 for i in range(6)], occupancy=3, ingest=ingest)
+more += ingest_rows([START + 90 + 5 * i + 0.2 for i in range(6)], occupancy=0, ingest=ingest)[0]
+minute = fold_rollups(more)[(ROOM_KEY, 'minute', START + 60)]
+check("occupied half minute: occupancy-seconds / seconds", minute['occupancy_sum'] / minute['seconds'], 1.5)
+check("occupied half minute: AC-on-while-empty seconds", minute['ac_on_empty_seconds'], 30)
+
+# A board that was offline for 10 minutes does not claim the gap
+late, _ = ingest_rows([START + 180.2, START + 780.2], ingest=ingest)
+check("first reading after a 10 minute gap", late[-1]['duration'], 5)
+
+# Seeded 1 Hz CSV rows carry no duration and still count one second each
+seeded = [{'room': ROOM_KEY, 'time': START + i, 'occupancy': 0, 'temperature': 24.0, 'ac': True, 'lights': False}
+          for i in range(60)]
+minute = fold_rollups(seeded)[(ROOM_KEY, 'minute', START)]
+check("seeded 1 Hz rows: AC-on-while-empty seconds", minute['ac_on_empty_seconds'], 60)
+
+print("✅ rollups weight every row by its duration" if failures == 0 else f"❌ {failures} checks failed")
+sys.exit(1 if failures else 0)
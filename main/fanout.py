@@ -0,0 +1,100 @@
+import time
+import threading
+
+
+def _track_key(detection):
+    # Track ids are only unique per camera in the multi-camera translators
+    return (detection.get('camera'), detection['id'])
+
+
+class TrackingFanout:
+    """Coalesces tracker messages and emits them to Socket.IO rooms on a fixed tick.
+
+    The trackers publish once per frame (live_tracker.py) or once per
+    detection (live_translation*.py). Instead of forwarding every message,
+    offer() folds it into the latest state of its lab room, keyed by track
+    id, and run_forever() emits one 'live_tracking_update' per changed room
+    every 1/tick_hz seconds to the clients that joined that room.
+    """
+
+    def __init__(self, socketio, default_room, tick_hz=12.0, track_ttl=1.0,
+                 event='live_tracking_update', report_every=60.0):
+        self.socketio = socketio
+        self.default_room = default_room
+        self.interval = 1.0 / tick_hz
+        self.track_ttl = track_ttl
+        self.event = event
+        self.report_every = report_every
+
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self.stats = {'received': 0, 'merged': 0, 'emitted': 0, 'expired_tracks': 0}
+
+    def _room_state(self, room_id):
+        state = self._rooms.get(room_id)
+        if state is None:
+            state = self._rooms[room_id] = {'room_count': None, 'tracks': {}, 'dirty': False}
+        return state
+
+    def offer(self, payload):
+        """Folds one tracker message into its room's pending state"""
+        now = time.monotonic()
+        room_id = payload.get('room_id') or self.default_room
+        with self._lock:
+            state = self._room_state(room_id)
+            self.stats['received'] += 1
+            if state['dirty']:
+                self.stats['merged'] += 1
+
+            if 'detections' in payload:
+                # A whole frame supersedes whatever the previous frame said
+                state['tracks'] = {_track_key(d): (d, now) for d in payload['detections'] if 'id' in d}
+                state['room_count'] = payload.get('room_count', state['room_count'])
+            elif 'id' in payload:
+                state['tracks'][_track_key(payload)] = (payload, now)
+                if 'occupancy' in payload:
+                    state['room_count'] = payload['occupancy']
+            state['dirty'] = True
+
+    def _drain(self):
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for room_id, state in self._rooms.items():
+                stale = [tid for tid, (_, seen) in state['tracks'].items() if now - seen > self.track_ttl]
+                for tid in stale:
+                    del state['tracks'][tid]
+                if stale:
+                    self.stats['expired_tracks'] += len(stale)
+                    state['dirty'] = True
+                if not state['dirty']:
+                    continue
+                state['dirty'] = False
+                ready.append((room_id, {
+                    'room_id': room_id,
+                    'room_count': state['room_count'],
+                    'detections': [d for d, _ in state['tracks'].values()]
+                }))
+        return ready
+
+    def tick(self):
+        for room_id, payload in self._drain():
+            self.socketio.emit(self.event, payload, to=room_id)
+            self.stats['emitted'] += 1
+
+    def run_forever(self):
+        self._running = True
+        last_report = time.monotonic()
+        while self._running:
+            started = time.monotonic()
+            self.tick()
+            if started - last_report >= self.report_every:
+                s = self.stats
+                print(f"📡 Fan-out: {s['received']} received, {s['emitted']} emitted, "
+                      f"{s['merged']} merged, {s['expired_tracks']} expired tracks")
+                last_report = started
+            self.socketio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._running = False
@@ -0,0 +1,188 @@
+import json
+import time
+import threading
+
+import redis
+
+from models import Rooms, RoomData, SensorReading
+from rollups import apply_rollups
+
+
+def _switch_state(value):
+    """ESP32 boards send "ON"/"OFF"; accept booleans too"""
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().upper() == 'ON'
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SensorIngest:
+    """Write-behind queue for ESP32 readings.
+
+    submit() only records the reading in memory and returns, so a slow Redis
+    or MongoDB never stalls the HTTP request. run_forever() flushes pending
+    readings every `flush_interval` seconds, or as soon as `batch_size`
+    readings are waiting:
+      * the newest reading per device is published to Redis in one pipeline
+        (through the TrackingBus when given, so it can be a stream), together
+        with the shared device-state hash (see live_state.py)
+      * every reading is written to SensorReading with one insert_many
+      * readings from devices mapped to a room also become RoomData rows
+        (and rollups) once the room's occupancy is known from the tracker.
+        Each row's duration is the time since the device's previous reading,
+        or `sample_seconds` (the boards post every 5 s) for a device's first
+        reading and after a gap of more than `max_gap` readings
+    """
+
+    def __init__(self, redis_client, state, channel='iot_stream', bus=None,
+                 flush_interval=1.0, batch_size=500, max_pending=50000,
+                 sample_seconds=5, max_gap=3):
+        self.redis = redis_client
+        self.state = state
+        self.channel = channel
+        self.bus = bus
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.sample_seconds = sample_seconds
+        self.max_gap = max_gap
+
+        self.room_occupancy = {}
+        self._last_reading = {}
+        self._room_keys = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self.stats = {'received': 0, 'dropped': 0, 'published': 0, 'persisted': 0,
+                      'room_rows': 0, 'flushes': 0, 'redis_errors': 0, 'db_errors': 0}
+
+    def submit(self, payload):
+        """Queues one reading; returns the normalised record"""
+        now = time.time()
+        record = {
+            'device_id': str(payload.get('device_id') or 'unknown'),
+            'received_at': now,
+            'temperature': _as_float(payload.get('temperature')),
+            'humidity': _as_float(payload.get('humidity')),
+            'ac': _switch_state(payload.get('ac_state')),
+            'lights': _switch_state(payload.get('lights_state')),
+            'payload': payload
+        }
+        with self._lock:
+            self.state.update(record)
+            self._pending.append(record)
+            self.stats['received'] += 1
+            if len(self._pending) > self.max_pending:
+                overflow = len(self._pending) - self.max_pending
+                del self._pending[:overflow]
+                self.stats['dropped'] += overflow
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+        return record
+
+    def set_room_occupancy(self, room_id, count):
+        self.room_occupancy[room_id] = int(count)
+
+    def run_forever(self):
+        self._running = True
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        self.stats['flushes'] += 1
+        self._publish(batch)
+        self._persist(batch)
+        return len(batch)
+
+    def _publish(self, batch):
+        newest = {}
+        for record in batch:
+            newest[record['device_id']] = record
+        synced = set()
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for record in newest.values():
+                if self.bus is not None:
+                    self.bus.publish(self.channel, json.dumps(record['payload']), pipe=pipe)
+                else:
+                    pipe.publish(self.channel, json.dumps(record['payload']))
+            with self._lock:
+                synced = self.state.sync(pipe)
+            pipe.execute()
+            self.stats['published'] += len(newest)
+        except redis.RedisError as e:
+            # Devices whose HSET never landed go out with the next flush
+            with self._lock:
+                self.state.mark_dirty(synced)
+            self.stats['redis_errors'] += 1
+            print(f"⚠️ Could not publish {len(newest)} IoT readings to Redis: {e}")
+
+    def _room_key(self, room_id):
+        if room_id not in self._room_keys:
+            room = Rooms.objects(room_id=room_id).only('id').first()
+            self._room_keys[room_id] = room.id if room else None
+        return self._room_keys[room_id]
+
+    def _duration(self, record):
+        """Seconds since the device's previous reading, sample_seconds if there is none close by"""
+        previous = self._last_reading.get(record['device_id'])
+        self._last_reading[record['device_id']] = record['received_at']
+        if previous is None:
+            return self.sample_seconds
+        gap = round(record['received_at'] - previous)
+        return gap if 0 < gap <= self.max_gap * self.sample_seconds else self.sample_seconds
+
+    def _rows(self, batch):
+        """(SensorReading docs, RoomData rows) of a flushed batch"""
+        readings = []
+        room_rows = []
+        for record in batch:
+            t = int(record['received_at'])
+            duration = self._duration(record)
+            room_id = self.state.room_for(record['device_id'])
+            room_key = self._room_key(room_id) if room_id else None
+            readings.append({
+                'device_id': record['device_id'], 'room': room_key, 'time': t,
+                'ts': RoomData.ts_for(t), 'temperature': record['temperature'],
+                'humidity': record['humidity'], 'ac': record['ac'], 'lights': record['lights']
+            })
+            occupancy = self.room_occupancy.get(room_id)
+            if (room_key is not None and occupancy is not None and record['temperature'] is not None
+                    and record['ac'] is not None and record['lights'] is not None):
+                room_rows.append({
+                    'room': room_key, 'time': t, 'ts': RoomData.ts_for(t), 'occupancy': occupancy,
+                    'temperature': record['temperature'], 'ac': record['ac'], 'lights': record['lights'],
+                    'duration': duration
+                })
+        return readings, room_rows
+
+    def _persist(self, batch):
+        readings, room_rows = self._rows(batch)
+        try:
+            SensorReading._get_collection().insert_many(readings, ordered=False)
+            self.stats['persisted'] += len(readings)
+            if room_rows:
+                RoomData._get_collection().insert_many(room_rows, ordered=False)
+                apply_rollups(room_rows)
+                self.stats['room_rows'] += len(room_rows)
+        except Exception as e:
+            self.stats['db_errors'] += 1
+            print(f"⚠️ Could not persist {len(readings)} IoT readings: {e}")
@@ -0,0 +1,80 @@
+import json
+
+import redis
+
+
+class DeviceStateStore:
+    """Latest reading per ESP32 device, keyed by device_id and mapped to rooms.
+
+    Writes land in process memory immediately. When a Redis client is given,
+    the ingest flusher also mirrors them into one Redis hash (`hash_key`,
+    field = device_id) so every Flask worker serves the same devices;
+    reads merge that hash with local state, newest reading winning.
+    """
+
+    def __init__(self, device_rooms=None, redis_client=None, hash_key='iot:latest'):
+        self.device_rooms = dict(device_rooms or {})
+        self.redis = redis_client
+        self.hash_key = hash_key
+        self.devices = {}
+        self._dirty = set()
+
+    def room_for(self, device_id):
+        return self.device_rooms.get(device_id)
+
+    def update(self, record):
+        """Stores a normalised ingest record as the device's latest state"""
+        device_id = record['device_id']
+        self.devices[device_id] = {
+            'device_id': device_id,
+            'room_id': self.room_for(device_id),
+            'received_at': record['received_at'],
+            'reading': record['payload']
+        }
+        self._dirty.add(device_id)
+
+    def sync(self, pipe):
+        """Queues HSETs for devices changed since the last sync on a Redis pipeline.
+
+        Returns the queued device ids; hand them to mark_dirty() if the
+        pipeline fails, so the next sync sends them again.
+        """
+        if self.redis is None or not self._dirty:
+            return set()
+        dirty, self._dirty = self._dirty, set()
+        mapping = {d: json.dumps(self.devices[d]) for d in dirty if d in self.devices}
+        if mapping:
+            pipe.hset(self.hash_key, mapping=mapping)
+        return set(mapping)
+
+    def mark_dirty(self, device_ids):
+        """Devices to send again on the next sync (e.g. their last one failed)"""
+        self._dirty.update(device_ids)
+
+    def _all(self):
+        states = dict(self.devices)
+        if self.redis is None:
+            return states
+        try:
+            shared = self.redis.hgetall(self.hash_key)
+        except redis.RedisError:
+            return states
+        for device_id, raw in shared.items():
+            try:
+                state = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+            local = states.get(device_id)
+            if local is None or state.get('received_at', 0) > local['received_at']:
+                states[device_id] = state
+        return states
+
+    def snapshot(self, room_id=None, device_id=None):
+        """Device states matching the filters, most recent first"""
+        states = [
+            s for s in self._all().values()
+            if (room_id is None or s.get('room_id') == room_id)
+            and (device_id is None or s['device_id'] == device_id)
+        ]
+        states.sort(key=lambda s: s['received_at'], reverse=True)
+        return states
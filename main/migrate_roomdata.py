@@ -0,0 +1,115 @@
+# migrate_roomdata.py
+# Maintenance commands for the RoomData collection.
+#
+#   python migrate_roomdata.py indexes
+#       Creates the indexes declared in models.py (room+time, SecurityEmails.user/room, ...).
+#
+#   python migrate_roomdata.py timeseries [--granularity seconds] [--batch 50000]
+#       Rebuilds room_data as a MongoDB time-series collection (timeField=ts,
+#       metaField=room). The old collection is kept as room_data_backup_<unix time>.
+#       Needs MongoDB 5.0+; upserts into a time-series collection (update_powerlab.py)
+#       need MongoDB 7.0+.
+#
+#   python migrate_roomdata.py rollups [--room C-006]
+#       Rebuilds the minute/hour/day RoomDataRollup documents from raw RoomData.
+#       Run once after upgrading to duration-weighted rollups (seconds,
+#       ac_on_seconds, ... replaced the per-row *_samples counters).
+import sys
+import time
+import argparse
+
+from app import app
+from models import Role, User, Rooms, SecurityEmails, RoomData, RoomDataRollup
+from rollups import rebuild_rollups
+
+
+def ensure_indexes():
+    for doc in (Role, User, Rooms, SecurityEmails, RoomData, RoomDataRollup):
+        doc.ensure_indexes()
+        names = sorted(doc._get_collection().index_information())
+        print(f"✅ {doc.__name__}: {', '.join(names)}")
+
+
+def to_timeseries(granularity, batch_size):
+    source = RoomData._get_collection()
+    database = source.database
+    name = source.name
+    staging = f"{name}_ts_staging"
+
+    options = source.options()
+    if 'timeseries' in options:
+        print(f"'{name}' is already a time-series collection, nothing to do.")
+        return
+
+    if staging in database.list_collection_names():
+        database.drop_collection(staging)
+    database.create_collection(
+        staging,
+        timeseries={'timeField': 'ts', 'metaField': 'room', 'granularity': granularity}
+    )
+    target = database[staging]
+
+    total = source.estimated_document_count()
+    print(f"Copying {total} documents from '{name}' into time-series layout...")
+
+    copied = 0
+    batch = []
+    start = time.perf_counter()
+    for doc in source.find({}, batch_size=batch_size):
+        if doc.get('ts') is None:
+            doc['ts'] = RoomData.ts_for(doc['time'])
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            target.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+            print(f"  {copied}/{total} ({copied / (time.perf_counter() - start):.0f} docs/s)")
+    if batch:
+        target.insert_many(batch, ordered=False)
+        copied += len(batch)
+
+    if target.count_documents({}) != source.count_documents({}):
+        sys.exit("❌ Document counts differ after copy; leaving the original collection in place.")
+
+    backup = f"{name}_backup_{int(time.time())}"
+    source.rename(backup)
+    target.rename(name)
+    RoomData._collection = None
+    RoomData.ensure_indexes()
+    print(f"✅ '{name}' is now a time-series collection ({copied} documents). Backup: '{backup}'")
+
+
+def backfill_rollups(room_id):
+    room_ids = None
+    if room_id:
+        room = Rooms.objects(room_id=room_id).first()
+        if not room:
+            sys.exit(f"❌ Room {room_id} not found.")
+        room_ids = [room.id]
+    start = time.perf_counter()
+    rows = rebuild_rollups(room_ids)
+    print(f"✅ Rebuilt rollups from {rows} RoomData rows in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RoomData maintenance commands")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('indexes', help='create the indexes declared in models.py')
+    ts = sub.add_parser('timeseries', help='convert room_data into a time-series collection')
+    ts.add_argument('--granularity', choices=['seconds', 'minutes', 'hours'], default='seconds')
+    ts.add_argument('--batch', type=int, default=50000)
+    rollups = sub.add_parser('rollups', help='rebuild minute/hour/day rollups from raw RoomData')
+    rollups.add_argument('--room', help='room_id to rebuild (default: all rooms)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'indexes':
+            ensure_indexes()
+        elif args.command == 'rollups':
+            backfill_rollups(args.room)
+        else:
+            to_timeseries(args.granularity, args.batch)
+
+
+if __name__ == '__main__':
+    main()
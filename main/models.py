@@ -1,4 +1,5 @@
 from flask_mongoengine import MongoEngine
+from datetime import datetime, timezone
 from mongoengine import Document, StringField, IntField, BooleanField, ReferenceField, DateTimeField
 
 db = MongoEngine()
@@ -16,6 +17,8 @@ class User(db.Document):
     role = db.ReferenceField(Role, required=True)
     name = db.StringField()
 
+    meta = {'indexes': ['role']}
+
 class Rooms(db.Document):
     room_id = db.StringField(required=True, unique=True)
     room_name = db.StringField(required=True, unique=True)
@@ -26,10 +29,62 @@ class SecurityEmails(db.Document):
     room = db.ReferenceField(Rooms, required=True)
     user = db.ReferenceField(User, required=True)
 
+    meta = {'indexes': ['user', 'room']}
+
 class RoomData(db.Document):
     room = db.ReferenceField(Rooms, required=True)
     time = db.IntField(required=True)
     occupancy = db.IntField(required=True)
     temperature = db.FloatField(required=True)
     ac = db.BooleanField(required=True)
-    lights = db.BooleanField(required=True)
\ No newline at end of file
+    lights = db.BooleanField(required=True)
+    # Seconds this reading stands for (the interval since the device's previous
+    # one); unset on the 1 Hz seeded CSV rows, which count rollups.SAMPLE_SECONDS
+    duration = db.IntField()
+    # Date mirror of `time`; MongoDB time-series collections need a BSON date
+    # as their timeField (see migrate_roomdata.py)
+    ts = db.DateTimeField()
+
+    meta = {'indexes': [('room', 'time')]}
+
+    @staticmethod
+    def ts_for(time):
+        return datetime.fromtimestamp(int(time), tz=timezone.utc).replace(tzinfo=None)
+
+    def clean(self):
+        if self.ts is None and self.time is not None:
+            self.ts = RoomData.ts_for(self.time)
+
+
+class RoomDataRollup(db.Document):
+    """Per-room minute/hour/day summary of RoomData, maintained by rollups.py"""
+    room = db.ReferenceField(Rooms, required=True)
+    granularity = db.StringField(required=True, choices=('minute', 'hour', 'day'))
+    bucket = db.IntField(required=True)
+    samples = db.IntField(default=0)
+    # Sums below are weighted by each row's duration (occupancy-seconds etc.)
+    seconds = db.IntField(default=0)
+    occupancy_sum = db.IntField(default=0)
+    occupancy_min = db.IntField()
+    occupancy_max = db.IntField()
+    temperature_sum = db.FloatField(default=0.0)
+    temperature_min = db.FloatField()
+    temperature_max = db.FloatField()
+    ac_on_seconds = db.IntField(default=0)
+    lights_on_seconds = db.IntField(default=0)
+    ac_on_empty_seconds = db.IntField(default=0)
+
+    meta = {'indexes': [{'fields': ('room', 'granularity', 'bucket'), 'unique': True}]}
+
+class SensorReading(db.Document):
+    """Raw ESP32 reading, persisted in batches by ingest.py"""
+    device_id = db.StringField(required=True)
+    room = db.ReferenceField(Rooms)
+    time = db.IntField(required=True)
+    ts = db.DateTimeField()
+    temperature = db.FloatField()
+    humidity = db.FloatField()
+    ac = db.BooleanField()
+    lights = db.BooleanField()
+
+    meta = {'indexes': [('device_id', 'time'), ('room', 'time')]}
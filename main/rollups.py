@@ -0,0 +1,217 @@
+from pymongo import UpdateOne
+
+from models import RoomData, RoomDataRollup
+
+# Bucket widths in seconds (RoomData.time units). Every RoomData row covers
+# its `duration` in seconds (5 s for live ESP32 readings); rows without one are
+# the 1 Hz seeded CSV data and count SAMPLE_SECONDS. Sums, means, on-fractions
+# and AC-on-while-empty time are all weighted by those seconds, not by rows.
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+SAMPLE_SECONDS = 1
+
+SUM_FIELDS = ('samples', 'seconds', 'occupancy_sum', 'temperature_sum',
+              'ac_on_seconds', 'lights_on_seconds', 'ac_on_empty_seconds')
+
+
+def row_seconds(row):
+    return int(row.get('duration') or SAMPLE_SECONDS)
+
+
+def _fold(partials, key, row):
+    p = partials.get(key)
+    occupancy = int(row['occupancy'])
+    temperature = float(row['temperature'])
+    ac = bool(row['ac'])
+    seconds = row_seconds(row)
+    if p is None:
+        partials[key] = p = {
+            'samples': 0, 'seconds': 0, 'occupancy_sum': 0, 'temperature_sum': 0.0,
+            'ac_on_seconds': 0, 'lights_on_seconds': 0, 'ac_on_empty_seconds': 0,
+            'occupancy_min': occupancy, 'occupancy_max': occupancy,
+            'temperature_min': temperature, 'temperature_max': temperature
+        }
+    p['samples'] += 1
+    p['seconds'] += seconds
+    p['occupancy_sum'] += occupancy * seconds
+    p['temperature_sum'] += temperature * seconds
+    p['ac_on_seconds'] += seconds if ac else 0
+    p['lights_on_seconds'] += seconds if row['lights'] else 0
+    p['ac_on_empty_seconds'] += seconds if ac and occupancy == 0 else 0
+    p['occupancy_min'] = min(p['occupancy_min'], occupancy)
+    p['occupancy_max'] = max(p['occupancy_max'], occupancy)
+    p['temperature_min'] = min(p['temperature_min'], temperature)
+    p['temperature_max'] = max(p['temperature_max'], temperature)
+
+
+def fold_rollups(rows):
+    """{(room, granularity, bucket): partial sums} of RoomData rows, before any database write.
+
+    `rows` are dicts (or RoomData documents) with room, time, occupancy,
+    temperature, ac, lights and optionally duration; `room` may be a Rooms
+    document or its id.
+    """
+    partials = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            row = {f: row[f] for f in ('room', 'time', 'occupancy', 'temperature', 'ac', 'lights', 'duration')}
+        room = getattr(row['room'], 'id', row['room'])
+        time = int(row['time'])
+        for granularity, width in GRANULARITIES.items():
+            _fold(partials, (room, granularity, time - time % width), row)
+    return partials
+
+
+def apply_rollups(rows):
+    """Folds freshly written RoomData rows into the minute/hour/day rollups.
+
+    Rows are pre-aggregated per bucket (fold_rollups), so the database sees
+    one upsert per touched bucket rather than one per row. Only use this for
+    rows that are new: re-written rows would be counted twice (see
+    rebuild_rollups).
+    """
+    partials = fold_rollups(rows)
+    if not partials:
+        return 0
+
+    ops = []
+    for (room, granularity, bucket), p in partials.items():
+        ops.append(UpdateOne(
+            {'room': room, 'granularity': granularity, 'bucket': bucket},
+            {
+                '$inc': {k: p[k] for k in SUM_FIELDS},
+                '$min': {'occupancy_min': p['occupancy_min'], 'temperature_min': p['temperature_min']},
+                '$max': {'occupancy_max': p['occupancy_max'], 'temperature_max': p['temperature_max']}
+            },
+            upsert=True
+        ))
+    RoomDataRollup._get_collection().bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def rebuild_rollups(room_ids=None, start=None, end=None, chunk_size=50000):
+    """Recomputes rollups from raw RoomData.
+
+    Used after rows were overwritten in place (update_powerlab.py upserts) and
+    for backfilling. The range is widened to whole days so every affected
+    minute/hour/day bucket is rebuilt from scratch.
+    """
+    day = GRANULARITIES['day']
+    rollup_query = {}
+    raw_query = RoomData.objects()
+    if room_ids is not None:
+        rollup_query['room__in'] = room_ids
+        raw_query = raw_query.filter(room__in=room_ids)
+    if start is not None:
+        start -= start % day
+        rollup_query['bucket__gte'] = start
+        raw_query = raw_query.filter(time__gte=start)
+    if end is not None:
+        end += day - end % day - 1
+        rollup_query['bucket__lte'] = end
+        raw_query = raw_query.filter(time__lte=end)
+
+    RoomDataRollup.objects(**rollup_query).delete()
+
+    rows = []
+    total = 0
+    for row in raw_query.only('room', 'time', 'occupancy', 'temperature', 'ac', 'lights', 'duration').as_pymongo():
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            apply_rollups(rows)
+            total += len(rows)
+            rows = []
+    apply_rollups(rows)
+    return total + len(rows)
+
+
+def granularity_for(resolution):
+    """Coarsest rollup granularity that evenly divides `resolution`, or None"""
+    for granularity in ('day', 'hour', 'minute'):
+        if resolution % GRANULARITIES[granularity] == 0:
+            return granularity
+    return None
+
+
+def latest_bucket(room_ids, granularity):
+    """Start of the newest `granularity` bucket of any of the rooms, or None without data"""
+    latest = (RoomDataRollup.objects(room__in=room_ids, granularity=granularity)
+              .order_by('-bucket').only('bucket').first())
+    return latest.bucket if latest else None
+
+
+def rollup_timeseries(room_ids, resolution, start=None, end=None):
+    """Same shape as timeseries.bucketed_timeseries, computed from rollups.
+
+    Buckets are whole rollup buckets, so start/end are effectively widened to
+    the chosen granularity.
+    """
+    granularity = granularity_for(resolution)
+    query = RoomDataRollup.objects(room__in=room_ids, granularity=granularity)
+    if start is not None:
+        query = query.filter(bucket__gte=start - start % GRANULARITIES[granularity])
+    if end is not None:
+        query = query.filter(bucket__lte=end)
+
+    pipeline = [
+        {'$group': {
+            '_id': {
+                'room': '$room',
+                'time': {'$subtract': ['$bucket', {'$mod': ['$bucket', resolution]}]}
+            },
+            'samples': {'$sum': '$samples'},
+            'seconds': {'$sum': '$seconds'},
+            'occupancy_sum': {'$sum': '$occupancy_sum'},
+            'max_occupancy': {'$max': '$occupancy_max'},
+            'temperature_sum': {'$sum': '$temperature_sum'},
+            'ac_on_seconds': {'$sum': '$ac_on_seconds'},
+            'lights_on_seconds': {'$sum': '$lights_on_seconds'}
+        }},
+        {'$sort': {'_id.room': 1, '_id.time': 1}}
+    ]
+
+    timeseries = {rid: [] for rid in room_ids}
+    for b in query.aggregate(pipeline):
+        n = b['seconds'] or 1
+        timeseries[b['_id']['room']].append({
+            'time': int(b['_id']['time']),
+            'occupancy': round(b['occupancy_sum'] / n, 2),
+            'max_occupancy': b['max_occupancy'],
+            'temperature': round(b['temperature_sum'] / n, 2),
+            'ac_on_fraction': round(b['ac_on_seconds'] / n, 3),
+            'lights_on_fraction': round(b['lights_on_seconds'] / n, 3),
+            'samples': b['samples']
+        })
+    return timeseries
+
+
+def room_summaries(room_ids):
+    """All-time occupancy/temperature/AC-waste summary per room from the day rollups"""
+    pipeline = [
+        {'$group': {
+            '_id': '$room',
+            'samples': {'$sum': '$samples'},
+            'seconds': {'$sum': '$seconds'},
+            'occupancy_sum': {'$sum': '$occupancy_sum'},
+            'occupancy_min': {'$min': '$occupancy_min'},
+            'occupancy_max': {'$max': '$occupancy_max'},
+            'temperature_sum': {'$sum': '$temperature_sum'},
+            'temperature_min': {'$min': '$temperature_min'},
+            'temperature_max': {'$max': '$temperature_max'},
+            'ac_on_empty_seconds': {'$sum': '$ac_on_empty_seconds'}
+        }}
+    ]
+
+    summaries = {rid: None for rid in room_ids}
+    for s in RoomDataRollup.objects(room__in=room_ids, granularity='day').aggregate(pipeline):
+        n = s['seconds'] or 1
+        summaries[s['_id']] = {
+            'samples': s['samples'],
+            'occupancy_min': s['occupancy_min'],
+            'occupancy_max': s['occupancy_max'],
+            'occupancy_mean': round(s['occupancy_sum'] / n, 2),
+            'temperature_min': s['temperature_min'],
+            'temperature_max': s['temperature_max'],
+            'temperature_mean': round(s['temperature_sum'] / n, 2),
+            'ac_on_empty_minutes': round(s['ac_on_empty_seconds'] / 60, 1)
+        }
+    return summaries
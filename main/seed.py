@@ -1,7 +1,7 @@
 from app import app
-from models import db, User, Role, Rooms, SecurityEmails, RoomData
+from models import db, User, Role, Rooms, SecurityEmails, RoomData, RoomDataRollup
 from werkzeug.security import generate_password_hash
-import pandas as pd
+from bulk_load import load_csv
 
 # Connect to the app context to access the DB
 with app.app_context():
@@ -14,6 +14,7 @@ with app.app_context():
     room_7 = Rooms.objects(room_id='C-007').first()
     RoomData.objects(room=room_6).delete()
     RoomData.objects(room=room_7).delete()
+    RoomDataRollup.objects(room__in=[room_6, room_7]).delete()
 
     print("Seeding Database...")
 
@@ -119,71 +120,28 @@ with app.app_context():
     #     user=User.objects(user_id='mk07899').first()
     # ).save()
 
-    data_proj = pd.read_csv("../csv_files/active_files/csv_power_lab_iot_30min.csv")
-    occu_proj = pd.read_csv('../csv_files/active_files/dilab_counts_synced.csv')
-
-    occu_subset = occu_proj.iloc[0:29999:25].reset_index(drop=True)
-    
-    data_proj = data_proj.head(len(occu_subset))
-    data_proj['occu'] = occu_subset['Count'].astype(int)
-    
-    target_room = Rooms.objects(room_id='C-006').first()
-
-    for index, row in data_proj.iterrows():
-        RoomData(
-            room = target_room,
-            time = row['timestamp'],
-            occupancy = row['occu'],
-            temperature = row['temp'],
-            ac = row['ac'] == 'On',
-            lights = row['lights'] == 'On'
-        ).save()
+    # Every 25th frame of the first 30000 people-count frames -> 1200 rows
+    load_csv(
+        Rooms.objects(room_id='C-006').first(),
+        "../csv_files/active_files/csv_power_lab_iot_30min.csv",
+        occupancy_csv='../csv_files/active_files/dilab_counts_synced.csv',
+        occupancy_stride=25,
+        limit=len(range(0, 29999, 25))
+    )
     
     print("Seeding Database...")
-    data_proj = pd.read_csv("../csv_files/active_files/combined_proj_data_30min.csv")
-    occu_proj = pd.read_csv('../csv_files/active_files/combined_count_123.csv')
-
-    occu_subset = occu_proj.iloc[0:29999:25].reset_index(drop=True)
-    data_proj = data_proj.head(len(occu_subset))
-    data_proj['occu'] = occu_subset['Count'].astype(int)
-    target_room = Rooms.objects(room_id='C-007').first()
-
-    for index, row in data_proj.iterrows():
-        RoomData(
-            room = target_room,
-            time = row['timestamp'],
-            occupancy = row['occu'],
-            temperature = row['temp'],
-            ac = row['ac'] == 'On',
-            lights = row['lights'] == 'On'
-        ).save()
+    load_csv(
+        Rooms.objects(room_id='C-007').first(),
+        "../csv_files/active_files/combined_proj_data_30min.csv",
+        occupancy_csv='../csv_files/active_files/combined_count_123.csv',
+        occupancy_stride=25,
+        limit=len(range(0, 29999, 25))
+    )
 
     # print("Seeding Database...")
-    # data_proj = pd.read_csv("../csv_files/active_files/arif_iot_30min.csv")
-    # target_room = Rooms.objects(room_id='C-109').first()
-
-    # for index, row in data_proj.iterrows():
-    #     RoomData(
-    #         room = target_room,
-    #         time = row['timestamp'],
-    #         occupancy = row['occu'],
-    #         temperature = row['temp'],
-    #         ac = row['ac'] == 'On',
-    #         lights = row['lights'] == 'On'
-    #     ).save()
+    # load_csv(Rooms.objects(room_id='C-109').first(), "../csv_files/active_files/arif_iot_30min.csv")
 
     # print("Seeding Database...")
-    # data_proj = pd.read_csv("../csv_files/active_files/hall_iot_30min.csv")
-    # target_room = Rooms.objects(room_id='E-220').first()
-
-    # for index, row in data_proj.iterrows():
-    #     RoomData(
-    #         room = target_room,
-    #         time = row['timestamp'],
-    #         occupancy = row['occu'],
-    #         temperature = row['temp'],
-    #         ac = row['ac'] == 'On',
-    #         lights = row['lights'] == 'On'
-    #     ).save()
+    # load_csv(Rooms.objects(room_id='E-220').first(), "../csv_files/active_files/hall_iot_30min.csv")
 
     print("Database seeded successfully!")
\ No newline at end of file
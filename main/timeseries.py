@@ -0,0 +1,149 @@
+from models import RoomData
+from rollups import GRANULARITIES, SAMPLE_SECONDS, granularity_for, latest_bucket, rollup_timeseries
+
+# Fields every raw RoomData point carries in API responses
+RAW_FIELDS = ('time', 'occupancy', 'temperature', 'ac', 'lights')
+
+# What the dashboard endpoints send when the caller asks for nothing in
+# particular: minute rollups over the last day of stored data
+DEFAULT_RESOLUTION = 60
+DEFAULT_SPAN = 86400
+
+
+def parse_window(args, default_resolution=None):
+    """Reads start/end/resolution/raw from request args.
+
+    start/end/resolution are optional integers in RoomData.time units
+    (seconds). Without a resolution, `default_resolution` applies unless
+    raw=1 asks for the raw points; raw=1 together with a resolution is an
+    error. Raises ValueError on malformed or inconsistent values.
+    """
+    window = {}
+    for key in ('start', 'end', 'resolution'):
+        value = args.get(key)
+        if value in (None, ''):
+            window[key] = None
+            continue
+        try:
+            window[key] = int(value)
+        except ValueError:
+            raise ValueError(f"'{key}' must be an integer")
+
+    if window['resolution'] is not None and window['resolution'] <= 0:
+        raise ValueError("'resolution' must be a positive number of seconds")
+    if window['start'] is not None and window['end'] is not None and window['start'] > window['end']:
+        raise ValueError("'start' must not be after 'end'")
+
+    raw = args.get('raw', '')
+    if raw not in ('', '0', '1', 'false', 'true'):
+        raise ValueError("'raw' must be 1/0 or true/false")
+    window['raw'] = raw in ('1', 'true')
+    if window['raw'] and window['resolution'] is not None:
+        raise ValueError("'raw' and 'resolution' can't be combined")
+    if not window['raw'] and window['resolution'] is None:
+        window['resolution'] = default_resolution
+    return window
+
+
+def bound_window(room_ids, window, span=DEFAULT_SPAN):
+    """Limits a window without start/end to the last `span` seconds of stored data.
+
+    The end is anchored on the newest minute rollup of the rooms rather
+    than on the clock, so seeded data keeps showing up. Returns the window
+    unchanged when the caller set start or end, or when there is no data.
+    """
+    if window['start'] is not None or window['end'] is not None:
+        return window
+    latest = latest_bucket(room_ids, 'minute')
+    if latest is None:
+        return window
+    return dict(window, start=latest + GRANULARITIES['minute'] - span)
+
+
+def _filtered(room_ids, start, end):
+    query = RoomData.objects(room__in=room_ids)
+    if start is not None:
+        query = query.filter(time__gte=start)
+    if end is not None:
+        query = query.filter(time__lte=end)
+    return query
+
+
+def raw_timeseries(room_ids, start=None, end=None):
+    """Every RoomData point for the given rooms in one query, grouped per room id"""
+    timeseries = {rid: [] for rid in room_ids}
+    entries = (_filtered(room_ids, start, end)
+               .only('room', *RAW_FIELDS)
+               .order_by('room', 'time')
+               .as_pymongo())
+    for rd in entries:
+        timeseries[rd['room']].append({f: rd.get(f) for f in RAW_FIELDS})
+    return timeseries
+
+
+def bucket_stages(resolution):
+    """Aggregation stages that group RoomData into `resolution`-second buckets per room.
+
+    Means and on-fractions are weighted by each row's duration, like the rollups.
+    """
+    seconds = {'$ifNull': ['$duration', SAMPLE_SECONDS]}
+    return [
+        {'$group': {
+            '_id': {
+                'room': '$room',
+                'time': {'$subtract': ['$time', {'$mod': ['$time', resolution]}]}
+            },
+            'seconds': {'$sum': seconds},
+            'occupancy_sum': {'$sum': {'$multiply': ['$occupancy', seconds]}},
+            'max_occupancy': {'$max': '$occupancy'},
+            'temperature_sum': {'$sum': {'$multiply': ['$temperature', seconds]}},
+            'temperature_seconds': {'$sum': {'$cond': [{'$eq': [{'$ifNull': ['$temperature', None]}, None]}, 0, seconds]}},
+            'ac_on_seconds': {'$sum': {'$cond': ['$ac', seconds, 0]}},
+            'lights_on_seconds': {'$sum': {'$cond': ['$lights', seconds, 0]}},
+            'samples': {'$sum': 1}
+        }},
+        {'$project': {
+            'max_occupancy': 1, 'samples': 1,
+            'occupancy': {'$divide': ['$occupancy_sum', '$seconds']},
+            'temperature': {'$cond': [{'$gt': ['$temperature_seconds', 0]},
+                                      {'$divide': ['$temperature_sum', '$temperature_seconds']}, None]},
+            'ac_on_fraction': {'$divide': ['$ac_on_seconds', '$seconds']},
+            'lights_on_fraction': {'$divide': ['$lights_on_seconds', '$seconds']}
+        }},
+        {'$sort': {'_id.room': 1, '_id.time': 1}}
+    ]
+
+
+def bucketed_timeseries(room_ids, resolution, start=None, end=None):
+    """Downsamples RoomData into fixed-width time buckets inside MongoDB.
+
+    Each bucket reports mean/max occupancy, mean temperature and the fraction
+    of the time the AC / lights were on, so the payload size depends on the
+    window and resolution rather than on how much history is stored.
+    """
+    timeseries = {rid: [] for rid in room_ids}
+    for b in _filtered(room_ids, start, end).aggregate(bucket_stages(resolution)):
+        timeseries[b['_id']['room']].append({
+            'time': int(b['_id']['time']),
+            'occupancy': round(b['occupancy'], 2),
+            'max_occupancy': b['max_occupancy'],
+            'temperature': round(b['temperature'], 2) if b['temperature'] is not None else None,
+            'ac_on_fraction': round(b['ac_on_fraction'], 3),
+            'lights_on_fraction': round(b['lights_on_fraction'], 3),
+            'samples': b['samples']
+        })
+    return timeseries
+
+
+def room_timeseries(room_ids, window):
+    """Raw points when the window has no resolution, bucketed aggregates otherwise.
+
+    Resolutions that are whole minutes/hours/days are served from the
+    pre-aggregated rollups instead of scanning raw RoomData.
+    """
+    resolution = window['resolution']
+    if resolution and granularity_for(resolution):
+        return rollup_timeseries(room_ids, resolution, window['start'], window['end'])
+    if resolution:
+        return bucketed_timeseries(room_ids, window['resolution'], window['start'], window['end'])
+    return raw_timeseries(room_ids, window['start'], window['end'])
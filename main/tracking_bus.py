@@ -0,0 +1,193 @@
+import os
+import time
+import socket
+
+import redis
+
+
+class TrackingBus:
+    """Publishes/consumes tracker and IoT messages over Redis pub/sub or Redis Streams.
+
+    mode='pubsub' is the original fire-and-forget PUBLISH. mode='stream'
+    XADDs every message to `stream:<channel>` (trimmed to ~maxlen entries)
+    and listen() reads through a consumer group, acknowledging each entry
+    after it has been handled. The group remembers the last delivered ID,
+    so a restarted worker picks up where it stopped (entries it had read
+    but not acked are re-delivered first), and history() can replay the
+    recent past straight from the stream.
+
+    A consumer group splits its entries between its consumers, so every
+    worker reads through a group of its own (`<group>:<consumer>`) and,
+    like with pub/sub, each Socket.IO process sees every frame. The
+    consumer name is stable across restarts: TRACKING_CONSUMER, else the
+    host name. Several workers on one host need names of their own, either
+    from TRACKING_CONSUMER or per_process=True (`<host>-<pid>`, which gives
+    up resuming). Groups of other consumers idle for `stale_after` seconds
+    are destroyed when a listener starts, so they don't pile up.
+    """
+
+    FIELD = b'd'
+
+    def __init__(self, redis_client, mode='pubsub', maxlen=10000, group='flask-app',
+                 consumer=None, per_process=False, read_count=200, block_ms=5000, stale_after=86400):
+        if mode not in ('pubsub', 'stream'):
+            raise ValueError(f"unknown tracking bus mode {mode!r}")
+        self.redis = redis_client
+        self.mode = mode
+        self.maxlen = maxlen
+        self.consumer = consumer or socket.gethostname()
+        if per_process:
+            self.consumer = f"{self.consumer}-{os.getpid()}"
+        self.group_prefix = f"{group}:"
+        self.group = self.group_prefix + self.consumer
+        self.read_count = read_count
+        self.block_ms = block_ms
+        self.stale_after = stale_after
+        self.last_ids = {}
+        self.stats = {'published': 0, 'received': 0, 'redelivered': 0, 'reconnects': 0}
+
+    @classmethod
+    def from_env(cls, redis_client, group='flask-app', **kwargs):
+        """TRACKING_BUS=stream|pubsub, TRACKING_STREAM_MAXLEN, TRACKING_GROUP, TRACKING_CONSUMER,
+        TRACKING_CONSUMER_PER_PROCESS=1, TRACKING_STALE_GROUP_S"""
+        return cls(
+            redis_client,
+            mode=os.getenv("TRACKING_BUS", "pubsub"),
+            maxlen=int(os.getenv("TRACKING_STREAM_MAXLEN", "10000")),
+            group=os.getenv("TRACKING_GROUP", group),
+            consumer=os.getenv("TRACKING_CONSUMER") or None,
+            per_process=os.getenv("TRACKING_CONSUMER_PER_PROCESS") == "1",
+            stale_after=float(os.getenv("TRACKING_STALE_GROUP_S", "86400")),
+            **kwargs
+        )
+
+    @staticmethod
+    def stream_key(channel):
+        return f"stream:{channel}"
+
+    def publish(self, channel, data, pipe=None):
+        """PUBLISH or XADD one encoded message; queued on `pipe` when given"""
+        target = pipe if pipe is not None else self.redis
+        if self.mode == 'stream':
+            result = target.xadd(self.stream_key(channel), {self.FIELD: data},
+                                 maxlen=self.maxlen, approximate=True)
+        else:
+            result = target.publish(channel, data)
+        self.stats['published'] += 1
+        return result
+
+    def listen(self, channels):
+        """Yields (channel, data) forever from whichever transport is configured"""
+        if self.mode == 'stream':
+            yield from self._listen_streams(channels)
+            return
+
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(*channels)
+        for message in pubsub.listen():
+            if message['type'] == 'message':
+                self.stats['received'] += 1
+                yield _text(message['channel']), message['data']
+
+    def _ensure_groups(self, keys):
+        for key in keys:
+            try:
+                # '$': a brand-new group starts at new entries, an existing one keeps its position
+                self.redis.xgroup_create(key, self.group, id='$', mkstream=True)
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    def _prune_groups(self, keys):
+        """Destroys other consumers' groups whose consumers have all been idle for stale_after seconds"""
+        for key in keys:
+            for info in self.redis.xinfo_groups(key):
+                name = _text(info['name'])
+                if not name.startswith(self.group_prefix) or name == self.group:
+                    continue
+                consumers = self.redis.xinfo_consumers(key, name)
+                idle_ms = min((c['idle'] for c in consumers), default=None)
+                # No consumers yet: a worker may be between XGROUP CREATE and its first read
+                if idle_ms is not None and idle_ms >= self.stale_after * 1000:
+                    self.redis.xgroup_destroy(key, name)
+                    print(f"🧹 Tracking bus dropped stale group {name} on {key} (idle {idle_ms / 1000:.0f}s)")
+
+    def _listen_streams(self, channels):
+        channel_for = {self.stream_key(c): c for c in channels}
+        backoff = 1.0
+        while True:
+            try:
+                self._ensure_groups(channel_for)
+                self._prune_groups(channel_for)
+                # Start with our own pending (read-but-unacked) entries, then switch to new ones
+                cursors = {key: '0' for key in channel_for}
+                while True:
+                    replaying = any(c != '>' for c in cursors.values())
+                    response = self.redis.xreadgroup(
+                        self.group, self.consumer, cursors, count=self.read_count,
+                        block=None if replaying else self.block_ms
+                    )
+                    backoff = 1.0
+                    for key, entries in response or []:
+                        key = _text(key)
+                        replay = cursors[key] != '>'
+                        if replay and not entries:
+                            cursors[key] = '>'
+                            continue
+                        entry_ids = []
+                        for entry_id, fields in entries:
+                            entry_id = _text(entry_id)
+                            entry_ids.append(entry_id)
+                            if replay:
+                                self.stats['redelivered'] += 1
+                                cursors[key] = entry_id
+                            # Pending entries already trimmed away come back without fields
+                            if fields:
+                                self.stats['received'] += 1
+                                self.last_ids[channel_for[key]] = entry_id
+                                yield channel_for[key], fields.get(self.FIELD)
+                        # One XACK for the batch, once every entry in it has been handled
+                        if entry_ids:
+                            self.redis.xack(key, self.group, *entry_ids)
+            except redis.ResponseError as e:
+                # NOGROUP: the stream (and its groups) got deleted under us; re-create and carry on
+                if 'NOGROUP' not in str(e):
+                    raise
+                print(f"⚠️ Tracking bus group {self.group} is gone ({e}), re-creating it...")
+            except redis.ConnectionError as e:
+                self.stats['reconnects'] += 1
+                print(f"⚠️ Tracking bus lost Redis ({e}), retrying in {backoff:.0f}s...")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def history(self, channel, since=None, count=500):
+        """Entries after `since` (a stream ID, exclusive, or a unix time in seconds)"""
+        if self.mode != 'stream':
+            raise RuntimeError("history needs TRACKING_BUS=stream")
+        start, exclusive = _range_start(since)
+        entries = self.redis.xrange(self.stream_key(channel), min=start, max='+',
+                                    count=count + 1 if exclusive else count)
+        result = []
+        for entry_id, fields in entries:
+            entry_id = _text(entry_id)
+            if exclusive and entry_id == start:
+                continue
+            result.append((entry_id, fields.get(self.FIELD)))
+        return result[:count]
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _range_start(since):
+    if since is None or since == '':
+        return '-', False
+    since = str(since)
+    if '-' in since:
+        ms, _, seq = since.partition('-')
+        if not (ms.isdigit() and seq.isdigit()):
+            raise ValueError(f"invalid stream id {since!r}")
+        return since, True
+    # Unix seconds -> the millisecond part of a stream ID
+    return str(int(float(since) * 1000)), False
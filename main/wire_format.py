@@ -0,0 +1,247 @@
+"""Packed binary encoding for live tracking payloads, with JSON as fallback.
+
+Shared by the tracker publishers (mps_experiments/) and app.py's
+redis_listener. A binary message is
+
+    header   '<2sBBIdiHBB' magic b'DT', version, flags, frame, timestamp,
+                           room_count, n_detections, n_strings, room_id idx
+    strings  n_strings x (u8 length + utf-8), room/region/camera names used in this frame
+    records  n_detections x RECORD (id, x, z, occupancy, region idx, camera idx, flags)
+
+Header and record flags say which keys the payload had, so 0 stays distinct
+from "not sent"; a string index of NO_INDEX is a None value. Payloads the
+struct can't hold as they are (other keys, detections with different keys,
+None numbers, out-of-range ints, strings over 255 bytes) are sent as JSON.
+Anything that does not start with MAGIC is treated as JSON, so old
+publishers keep working.
+"""
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'DT'
+VERSION = 2
+
+HEADER = struct.Struct('<2sBBIdiHBB')
+RECORD = np.dtype([
+    ('id', '<u4'), ('x', '<f4'), ('z', '<f4'), ('occupancy', '<i2'),
+    ('region', 'u1'), ('camera', 'u1'), ('flags', 'u1')
+])
+NO_INDEX = 255
+MAX_STRING = 255
+
+# header flags
+HAS_ROOM_COUNT = 1
+SINGLE_DETECTION = 2   # one flat detection message (live_translation*.py style)
+HAS_FRAME = 4
+HAS_TIMESTAMP = 8
+HAS_ROOM_ID = 16
+
+# record flags
+OCCLUDED = 1
+HAS_OCCLUDED = 2
+HAS_REGION = 4
+HAS_CAMERA = 8
+HAS_OCCUPANCY = 16
+
+HEADER_KEYS = {'frame', 'timestamp', 'room_id'}
+DETECTION_KEYS = {'id', 'x', 'z', 'region', 'camera', 'is_occluded', 'occupancy'}
+
+
+def pack_frame(ids, xz, regions=None, occluded=None, cameras=None, occupancy=None,
+               room_count=None, frame=None, timestamp=None, room_id=None, single=False):
+    """Packs one frame from arrays.
+
+    ids: (N,) ints, xz: (N, 2) world coordinates, regions/cameras: length-N
+    sequences of names (or None), occluded: (N,) bools, occupancy: (N,)
+    ints. A column or header field left as None is not sent. Raises
+    ValueError for values the struct can't hold.
+    """
+    n = len(ids)
+    strings = []
+    lookup = {}
+
+    def index_of(name):
+        if name is None:
+            return NO_INDEX
+        idx = lookup.get(name)
+        if idx is None:
+            if not isinstance(name, str):
+                raise ValueError(f"name {name!r} is not a string")
+            if len(strings) >= NO_INDEX:
+                raise ValueError("too many distinct room/region/camera names in one frame")
+            if len(name.encode('utf-8')) > MAX_STRING:
+                raise ValueError(f"name longer than {MAX_STRING} bytes: {name[:32]!r}...")
+            idx = lookup[name] = len(strings)
+            strings.append(name)
+        return idx
+
+    records = np.empty(n, dtype=RECORD)
+    records['id'] = _column(ids, 'iu', 'id', 0, 2 ** 32 - 1)
+    xz = _column(xz, 'iuf', 'x/z')
+    records['x'] = xz[:, 0] if n else xz
+    records['z'] = xz[:, 1] if n else xz
+    records['occupancy'] = _column(occupancy, 'iu', 'occupancy', -2 ** 15, 2 ** 15 - 1) if occupancy is not None else 0
+    records['region'] = [index_of(r) for r in regions] if regions is not None else NO_INDEX
+    records['camera'] = [index_of(c) for c in cameras] if cameras is not None else NO_INDEX
+    rflags = ((HAS_OCCLUDED if occluded is not None else 0) | (HAS_REGION if regions is not None else 0)
+              | (HAS_CAMERA if cameras is not None else 0) | (HAS_OCCUPANCY if occupancy is not None else 0))
+    records['flags'] = rflags | (_column(occluded, 'b', 'is_occluded').astype(np.uint8) * OCCLUDED
+                                 if occluded is not None else 0)
+
+    flags = ((HAS_ROOM_COUNT if room_count is not None else 0) | (SINGLE_DETECTION if single else 0)
+             | (HAS_FRAME if frame is not None else 0) | (HAS_TIMESTAMP if timestamp is not None else 0)
+             | (HAS_ROOM_ID if room_id is not None else 0))
+    room_idx = index_of(room_id)
+    parts = [HEADER.pack(MAGIC, VERSION, flags,
+                         int(_column([frame or 0], 'iu', 'frame', 0, 2 ** 32 - 1)[0]),
+                         float(_column([timestamp or 0.0], 'iuf', 'timestamp')[0]),
+                         int(_column([room_count or 0], 'iu', 'room_count', -2 ** 31, 2 ** 31 - 1)[0]),
+                         n, len(strings), room_idx)]
+    for s in strings:
+        raw = s.encode('utf-8')
+        parts.append(bytes((len(raw),)) + raw)
+    parts.append(records.tobytes())
+    return b''.join(parts)
+
+
+def _column(values, kinds, name, lo=None, hi=None):
+    """values as an array, ValueError unless its dtype kind is one of `kinds` and it fits [lo, hi]"""
+    arr = np.asarray(values)
+    if arr.size and arr.dtype.kind not in kinds:
+        raise ValueError(f"{name} values are {arr.dtype}, expected kind {kinds!r}")
+    if arr.size and lo is not None and (arr.min() < lo or arr.max() > hi):
+        raise ValueError(f"{name} values outside [{lo}, {hi}]")
+    return arr
+
+
+def _pack_payload(payload):
+    """pack_frame() of a payload, or None when the binary format can't hold it exactly"""
+    if 'detections' in payload:
+        if not (HEADER_KEYS | {'detections', 'room_count'}).issuperset(payload):
+            return None
+        dets = payload['detections']
+        if not isinstance(dets, list):
+            return None
+        keys = dets[0].keys() if dets else {'id', 'x', 'z'}
+        if any(d.keys() != keys for d in dets):
+            return None
+        if 'room_count' in payload and payload['room_count'] is None:
+            return None
+        single = False
+    else:
+        dets = [payload]
+        keys = payload.keys() - HEADER_KEYS
+        single = True
+
+    if not {'id', 'x', 'z'} <= keys <= DETECTION_KEYS:
+        return None
+    if any(k in payload and payload[k] is None for k in HEADER_KEYS):
+        return None
+
+    def column(key):
+        return [d[key] for d in dets] if key in keys else None
+
+    try:
+        return pack_frame(
+            column('id'),
+            [(d['x'], d['z']) for d in dets],
+            regions=column('region'),
+            occluded=column('is_occluded'),
+            cameras=column('camera'),
+            occupancy=column('occupancy'),
+            room_count=None if single else payload.get('room_count'),
+            frame=payload.get('frame'),
+            timestamp=payload.get('timestamp'),
+            room_id=payload.get('room_id'),
+            single=single
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_payload(payload, binary=True):
+    """Encodes the dict payloads the trackers already build.
+
+    Accepts a frame ({"room_count", "detections": [...]}) or a single
+    detection ({"camera", "id", "x", "z", "region", "occupancy"}), either
+    with optional "frame", "timestamp" and "room_id". Falls back to JSON
+    for payloads the binary format can't hold as they are.
+    """
+    if binary:
+        packed = _pack_payload(payload)
+        if packed is not None:
+            return packed
+    return json.dumps(payload)
+
+
+def decode(data):
+    """Binary or JSON message -> the same dict shape the JSON publishers send.
+
+    Raises ValueError for anything malformed: truncated or inconsistent
+    binary frames, invalid JSON, and JSON that is not an object.
+    """
+    if isinstance(data, (bytearray, memoryview)):
+        data = bytes(data)
+    if not isinstance(data, (str, bytes)):
+        raise ValueError(f"expected a str or bytes message, got {type(data).__name__}")
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        payload = json.loads(data)
+        if not isinstance(payload, dict):
+            raise ValueError(f"expected a JSON object, got {type(payload).__name__}")
+        return payload
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"binary message truncated: {len(data)} bytes, header needs {HEADER.size}")
+    magic, version, flags, frame, timestamp, room_count, n, n_strings, room_idx = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"unsupported wire format version {version}")
+
+    offset = HEADER.size
+    strings = []
+    for _ in range(n_strings):
+        if offset >= len(data):
+            raise ValueError("binary message truncated in its string table")
+        length = data[offset]
+        if offset + 1 + length > len(data):
+            raise ValueError("binary message truncated in its string table")
+        strings.append(data[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+    if len(data) - offset != n * RECORD.itemsize:
+        raise ValueError(f"binary message has {len(data) - offset} record bytes, "
+                         f"{n} detections need {n * RECORD.itemsize}")
+    records = np.frombuffer(data, dtype=RECORD, count=n, offset=offset)
+    # Every string index has to point into the table (NO_INDEX = None)
+    used = np.concatenate([records['region'], records['camera'], [room_idx]])
+    if ((used != NO_INDEX) & (used >= len(strings))).any():
+        raise ValueError("binary message refers to a name outside its string table")
+
+    detections = []
+    for rid, x, z, occupancy, region, camera, rflags in zip(
+            records['id'].tolist(), records['x'].tolist(), records['z'].tolist(), records['occupancy'].tolist(),
+            records['region'].tolist(), records['camera'].tolist(), records['flags'].tolist()):
+        d = {'id': rid, 'x': round(x, 3), 'z': round(z, 3)}
+        if rflags & HAS_REGION:
+            d['region'] = strings[region] if region != NO_INDEX else None
+        if rflags & HAS_CAMERA:
+            d['camera'] = strings[camera] if camera != NO_INDEX else None
+        if rflags & HAS_OCCUPANCY:
+            d['occupancy'] = occupancy
+        if rflags & HAS_OCCLUDED:
+            d['is_occluded'] = bool(rflags & OCCLUDED)
+        detections.append(d)
+
+    if flags & SINGLE_DETECTION and detections:
+        payload = detections[0]
+    else:
+        payload = {'detections': detections}
+        if flags & HAS_ROOM_COUNT:
+            payload['room_count'] = room_count
+    if flags & HAS_FRAME:
+        payload['frame'] = frame
+    if flags & HAS_TIMESTAMP:
+        payload['timestamp'] = timestamp
+    if flags & HAS_ROOM_ID:
+        payload['room_id'] = strings[room_idx] if room_idx != NO_INDEX else None
+    return payload
@@ -0,0 +1,120 @@
+# bench_headless.py
+# CPU spent per frame on live_tracker.py's drawing, i.e. what --headless and
+# --render-every N save. Draws the same kind of scene the tracker does
+# (7 walkway regions, 2 door lines, 2 blended zones, labelled people, HUD)
+# at 1080p and at the 3024x1706 calibration resolution, on random frames.
+# The "old" row is the previous per-frame drawing (frame copy, every polygon
+# and label redrawn, full-frame addWeighted); the others use the cached
+# StaticOverlay. --regions 30 shows the old cost growing with calibration
+# complexity while the cached one does not. imshow/waitKey are left out (no display here),
+# so the real savings are larger. MJPEG encoding is shown for reference
+# (pessimistic: random frames compress far worse than camera images).
+#
+#   python bench_headless.py
+#   python bench_headless.py --people 30 --frames 300
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from render import StaticOverlay, region_ops, draw_scene
+
+RESOLUTIONS = {"1080p": (1920, 1080), "3K": (3024, 1706)}
+
+
+def make_scene(w, h, people, n_regions=7, seed=0):
+    """Walkway quads, door lines/zones and boxes laid out like the live view"""
+    rng = np.random.default_rng(seed)
+    sx, sy = w / 3024, h / 1706
+    regions = {}
+    for i in range(n_regions):
+        x0 = 400 + 2000 * i // n_regions
+        quad = [(x0, 1500), (x0 + 600, 1600), (x0 + 500, 700), (x0 + 100, 650)]
+        regions[f"WALKWAY_{i + 1}"] = np.array([(x * sx, y * sy) for x, y in quad], dtype=np.float32)
+    scale = lambda pts: np.array([(int(x * sx), int(y * sy)) for x, y in pts], dtype=np.int32)
+    inner = scale([(2001, 1578), (495, 1436), (495, 1358), (2001, 1500)])
+    outer = scale([(1998, 1629), (474, 1478), (474, 1556), (1998, 1707)])
+    lines = [(tuple(inner[0]), tuple(inner[1]), (0, 255, 255)), (tuple(outer[0]), tuple(outer[1]), (255, 0, 255))]
+    zones = [(inner, (0, 255, 255)), (outer, (255, 0, 255))]
+    draws = []
+    for tid in range(people):
+        x1, y1 = int(rng.uniform(0, w - 200)), int(rng.uniform(100, h - 500))
+        x2, y2 = x1 + int(150 * sx / sy), y1 + int(400 * sy)
+        label = f"ID {tid} | WALKWAY_2 | (4.21, -0.73) | AR 2.67 | H {y2 - y1}"
+        draws.append(((x1, y1, x2, y2), ((x1 + x2) // 2, y2), (0, 255, 0), label))
+    hud = {"fps": 14.2, "inference": 52.3, "latency": 61.0, "count": 7}
+    return regions, lines, zones, draws, hud
+
+
+def static_overlay(regions, lines, zones):
+    return StaticOverlay([
+        (1.0, region_ops(regions) + [("line", a, b, c, 3) for a, b, c in lines]),
+        (0.15, [("fill", p, c) for p, c in zones]),
+        (1.0, [("polyline", p, c, 2) for p, c in zones]),
+    ])
+
+
+def old_draw(frame, regions, lines, zones, draws, hud):
+    """The tracker's drawing before the static overlay cache"""
+    frame = frame.copy()
+    for name, poly in regions.items():
+        cv2.polylines(frame, [poly.astype(np.int32)], True, (255, 0, 0), 2)
+        cx, cy = np.mean(poly, axis=0).astype(int)
+        cv2.putText(frame, name, (cx, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+    for (x1, y1, x2, y2), foot, color, label in draws:
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.circle(frame, foot, 4, (0, 255, 255), -1)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 2)
+    for a, b, color in lines:
+        cv2.line(frame, a, b, color, 3)
+    overlay = frame.copy()
+    for poly, color in zones:
+        cv2.fillPoly(overlay, [poly], color)
+    cv2.addWeighted(overlay, 0.15, frame, 0.85, 0, frame)
+    for poly, color in zones:
+        cv2.polylines(frame, [poly], True, color, 2)
+    cv2.rectangle(frame, (10, 10), (450, 100), (0, 0, 0), -1)
+    for text, org in ((f"FPS: {hud['fps']:.1f}", (20, 40)), (f"People Inside: {hud['count']}", (50, 70))):
+        cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    return frame
+
+
+def cpu_ms_per_frame(fn, frames):
+    fn(frames[0])  # warm-up
+    start = time.process_time()
+    for f in frames:
+        fn(f)
+    return (time.process_time() - start) / len(frames) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame CPU cost of drawing vs headless")
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--people', type=int, default=12)
+    parser.add_argument('--every', type=int, default=5, help="N for the --render-every row")
+    parser.add_argument('--regions', type=int, default=7, help="walkway polygons in the calibration")
+    args = parser.parse_args()
+
+    for label, (w, h) in RESOLUTIONS.items():
+        regions, lines, zones, draws, hud = make_scene(w, h, args.people, args.regions)
+        overlay = static_overlay(regions, lines, zones)
+        base = np.random.default_rng(1).integers(0, 255, (h, w, 3), dtype=np.uint8)
+        frames = [base.copy() for _ in range(8)]
+        frames = [frames[i % len(frames)] for i in range(args.frames)]
+
+        old = cpu_ms_per_frame(lambda f: old_draw(f, regions, lines, zones, draws, hud), frames)
+        inplace = cpu_ms_per_frame(lambda f: draw_scene(f, overlay, draws, hud), frames)
+        static_only = cpu_ms_per_frame(overlay.composite, frames)
+        jpeg = cpu_ms_per_frame(lambda f: cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, 70]), frames)
+
+        print(f"🖼️  {label} ({w}x{h}), {args.regions} regions, {args.people} people, CPU ms per frame:")
+        print(f"   every frame (old, copy + draw)  {old:7.2f}")
+        print(f"   every frame (cached overlay)    {inplace:7.2f}   (static layer alone {static_only:.2f})")
+        print(f"   --render-every {args.every:<3}              {inplace / args.every:7.2f}")
+        print(f"   --headless                      {0.0:7.2f}   (saves {old:.2f} ms per frame)")
+        print(f"   + MJPEG encode per sent frame   {jpeg:7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# bench_multi_stream.py
+# Three-camera inference cost: the old setup (one YOLO instance per camera,
+# .track(persist=True) called one after another) vs MultiStreamTracker (one
+# shared model, one batched predict per step, per-camera ByteTrack state).
+# Reads the sync_angle_*.mp4 clips when they are present, otherwise runs on
+# random 1080p frames (inference timing only; nothing gets tracked then).
+# On the clips it also diffs every frame's track ids between the two setups.
+#
+#   python bench_multi_stream.py                       # CPU, 60 steps
+#   python bench_multi_stream.py --model yolo11n.pt --steps 200 --device mps
+import os
+import time
+import argparse
+
+import cv2
+from ultralytics import YOLO
+
+from multi_stream import MultiStreamTracker, frames_from, synthetic_frames
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CAMERAS = ["CAM_1", "CAM_2", "CAM_3"]
+CLIPS = {cam: os.path.join(BASE_DIR, 'vids', f'sync_angle_{i}.mp4') for i, cam in enumerate(CAMERAS, 1)}
+TRACKER_PATH = os.path.join(BASE_DIR, "custom_bytetrack.yaml")
+
+
+def load_steps(n):
+    if all(os.path.isfile(p) for p in CLIPS.values()):
+        caps = {cam: cv2.VideoCapture(p) for cam, p in CLIPS.items()}
+        steps = []
+        while len(steps) < n:
+            frames = frames_from(caps)
+            if any(f is None for f in frames.values()):
+                break
+            steps.append(frames)
+        for cap in caps.values():
+            cap.release()
+        return steps, "sync_angle clips"
+    frames = synthetic_frames(CAMERAS)
+    return [frames] * n, "random 1080p frames"
+
+
+def model_mb(model):
+    return sum(p.numel() * p.element_size() for p in model.model.parameters()) / 1e6
+
+
+def frame_ids(res):
+    return tuple(sorted(res[0].boxes.id.int().tolist())) if res[0].boxes.id is not None else ()
+
+
+def sequential(model_path, steps, device):
+    models = {cam: YOLO(model_path) for cam in CAMERAS}
+    ids = {cam: [] for cam in CAMERAS}
+    start = time.perf_counter()
+    for frames in steps:
+        for cam in CAMERAS:
+            res = models[cam].track(frames[cam], persist=True, device=device, tracker=TRACKER_PATH,
+                                    classes=[0], verbose=False)
+            ids[cam].append(frame_ids(res))
+    elapsed = time.perf_counter() - start
+    return elapsed, ids, sum(model_mb(m) for m in models.values())
+
+
+def batched(model_path, steps, device):
+    model = YOLO(model_path)
+    engine = MultiStreamTracker(model, CAMERAS, tracker=TRACKER_PATH, device=device)
+    ids = {cam: [] for cam in CAMERAS}
+    start = time.perf_counter()
+    for frames in steps:
+        for cam, res in engine.track(frames).items():
+            ids[cam].append(frame_ids(res))
+    elapsed = time.perf_counter() - start
+    print(f"   {engine.report()}")
+    return elapsed, ids, model_mb(model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-camera models vs one batched multi-stream model")
+    parser.add_argument('--model', default='yolo11x-seg.pt')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--steps', type=int, default=60, help="frames per camera")
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    steps, source = load_steps(args.steps + args.warmup)
+    print(f"🎞️  {len(steps) - args.warmup} steps x {len(CAMERAS)} cameras from {source} on {args.device}")
+
+    runs = []
+    for label, fn in (("3 models, sequential (old)", sequential), ("1 model, batched (new)", batched)):
+        if args.warmup:
+            fn(args.model, steps[:args.warmup], args.device)
+        elapsed, ids, weights_mb = fn(args.model, steps[args.warmup:], args.device)
+        n = len(steps) - args.warmup
+        per_cam = n / elapsed
+        tracks = ", ".join(f"{cam} {len({t for f in ids[cam] for t in f})}" for cam in CAMERAS)
+        print(f"{label:<28} {per_cam:6.2f} FPS per camera | {per_cam * len(CAMERAS):6.2f} FPS total "
+              f"| {weights_mb:6.1f} MB weights | track ids: {tracks}")
+        runs.append(ids)
+
+    # Same detections through the same ByteTrack settings should give the same ids frame by frame
+    old, new = runs
+    for cam in CAMERAS:
+        diff = [i for i, (a, b) in enumerate(zip(old[cam], new[cam])) if a != b]
+        first = f", first at step {diff[0]}: {old[cam][diff[0]]} vs {new[cam][diff[0]]}" if diff else ""
+        print(f"   {cam}: track ids differ on {len(diff)}/{len(old[cam])} frames{first}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# bench_region_lookup.py
+# Region lookup for a whole frame of foot points: the old per-detection
+# pointPolygonTest loop vs one LabelRaster fancy-index (regions.py), using the
+# real camera calibrations in homo_maps/. Also checks both agree point for point,
+# and times per-point cv2.perspectiveTransform against the batched map_points().
+#
+#   python bench_region_lookup.py
+import time
+
+import cv2
+import numpy as np
+
+from regions import LabelRaster, stack_homographies, map_points
+
+CALIBRATIONS = {
+    "CAM_1": ("homo_maps/cam1_calib.npz", (2560, 1440)),
+    "CAM_2": ("homo_maps/cam2_calib.npz", (2560, 1440)),
+    "CAM_3": ("homo_maps/cam3_calib.npz", (2560, 1440)),
+}
+DETECTIONS = (100, 200, 500)
+REPEATS = 50
+
+
+def load_calibration(npz_file):
+    data = np.load(npz_file)
+    polygons = {k.replace("poly_", ""): data[k] for k in data.files if k.startswith("poly_")}
+    homographies = {k.replace("H_", ""): data[k] for k in data.files if k.startswith("H_")}
+    return polygons, homographies
+
+
+def loop_lookup(feet, polygons):
+    # What the trackers did: astype + pointPolygonTest per polygon, per detection
+    regions = []
+    for foot in feet:
+        region_name = None
+        for name, poly in polygons.items():
+            if cv2.pointPolygonTest(poly.astype(np.int32), (float(foot[0]), float(foot[1])), False) >= 0:
+                region_name = name
+                break
+        regions.append(region_name)
+    return regions
+
+
+def loop_map(feet, region_idx, names, homographies):
+    # What the trackers did: one 1x1x2 array and perspectiveTransform per person
+    world = []
+    for foot, idx in zip(feet, region_idx):
+        if idx < 0:
+            continue
+        pt = np.array([[foot]], dtype=np.float32)
+        world.append(cv2.perspectiveTransform(pt, homographies[names[idx]])[0][0])
+    return np.array(world)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        out = fn(*args)
+    return out, (time.perf_counter() - start) / REPEATS * 1e3
+
+
+rng = np.random.default_rng(7)
+
+for cam_id, (npz_file, size) in CALIBRATIONS.items():
+    polygons, homographies = load_calibration(npz_file)
+    h_stack = stack_homographies(list(polygons), homographies)
+    start = time.perf_counter()
+    raster = LabelRaster(polygons, size)
+    build_ms = (time.perf_counter() - start) * 1e3
+    print(f"--- {cam_id}: {len(polygons)} regions, raster built in {build_ms:.0f} ms "
+          f"({raster.labels.nbytes / 1e6:.1f} MB) ---")
+
+    for n in DETECTIONS:
+        feet = np.column_stack((rng.integers(0, size[0], n), rng.integers(0, size[1], n)))
+        expected, loop_ms = timed(loop_lookup, feet, polygons)
+        got, raster_ms = timed(raster.names_for, feet)
+        mismatches = sum(a != b for a, b in zip(expected, got))
+        print(f"{n:>4} feet | loop {loop_ms:7.2f} ms | raster {raster_ms:6.3f} ms | "
+              f"{loop_ms / raster_ms:6.0f}x | mismatches {mismatches}")
+
+        region_idx = raster.lookup(feet)
+        expected_world, map_loop_ms = timed(loop_map, feet, region_idx, raster.names, homographies)
+        world, map_ms = timed(map_points, feet, region_idx, h_stack)
+        inside = world[region_idx >= 0]
+        max_err = float(np.abs(inside - expected_world).max()) if len(inside) else 0.0
+        print(f"{'':>4}      | map  {map_loop_ms:7.2f} ms | batch  {map_ms:6.3f} ms | "
+              f"{map_loop_ms / map_ms:6.0f}x | {len(inside)} mapped, max diff {max_err:.1e} m")
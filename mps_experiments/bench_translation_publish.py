@@ -0,0 +1,98 @@
+# bench_translation_publish.py
+# Publishing cost of live_translation_no_vis.py: the old mode (one Redis
+# PUBLISH and one print per tracked person per camera) vs the new one (one
+# message per frame for all cameras, log line at most once a second).
+# Replays the recorded three-camera tracks of the sync_angle_*.mp4 clips
+# (csv_files/files/combined_frames.csv) so inference is out of the picture;
+# prints go to /dev/null so the terminal is not what gets measured.
+#
+#   python bench_translation_publish.py --redis-host localhost
+#   python bench_translation_publish.py --scale 5     # ~65 tracks per frame
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+import pandas as pd
+import redis
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import encode_payload
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDED = os.path.join(BASE_DIR, '..', 'csv_files', 'files', 'combined_frames.csv')
+
+
+def load_frames(scale):
+    df = pd.read_csv(RECORDED)
+    frames = []
+    for frame_idx, g in df.groupby('frame', sort=True):
+        detections = [{
+            "camera": cam.upper().replace("CAM", "CAM_"),
+            "id": int(tid) + copy * 10000,
+            "x": round(float(x), 3),
+            "z": round(float(z), 3),
+            "region": "WALKWAY_1",
+            "occupancy": 18
+        } for copy in range(scale)
+            for cam, tid, x, z in zip(g['camera'], g['track_id'], g['three_x'], g['three_z'])]
+        frames.append((int(frame_idx), detections))
+    return frames
+
+
+def per_detection(client, frames, binary):
+    messages = 0
+    for _, detections in frames:
+        for payload in detections:
+            client.publish("tracking_stream", encode_payload(payload, binary=binary))
+            print(f"📡 {payload['camera']} | Track {payload['id']}: ({payload['x']:.2f}, {payload['z']:.2f}) "
+                  f"| Occupancy: {payload['occupancy']}")
+            messages += 1
+    return messages
+
+
+def per_frame(client, frames, binary):
+    messages = 0
+    last_log = 0.0
+    for frame_idx, detections in frames:
+        payload = {"frame": frame_idx, "timestamp": time.time(), "room_count": 18, "detections": detections}
+        client.publish("tracking_stream", encode_payload(payload, binary=binary))
+        messages += 1
+        now = time.time()
+        if now - last_log >= 1.0:
+            last_log = now
+            print(f"📡 Frame {frame_idx} | {len(detections)} tracks | Occupancy: 18")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-detection vs per-frame publishing")
+    parser.add_argument('--redis-host', default='localhost')
+    parser.add_argument('--redis-port', type=int, default=6379)
+    parser.add_argument('--scale', type=int, default=1, help="replicate every track this many times")
+    parser.add_argument('--json', action='store_true', help="JSON instead of the packed wire format")
+    args = parser.parse_args()
+
+    client = redis.Redis(host=args.redis_host, port=args.redis_port)
+    try:
+        client.ping()
+    except redis.ConnectionError as e:
+        print(f"❌ Could not connect to Redis at {args.redis_host}:{args.redis_port}: {e}")
+        return
+
+    frames = load_frames(args.scale)
+    tracks = sum(len(d) for _, d in frames)
+    print(f"🎞️  {len(frames)} frames, {tracks / len(frames):.1f} tracks per frame across 3 cameras")
+
+    for label, fn in (("per-detection (old)", per_detection), ("per-frame (new)", per_frame)):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            messages = fn(client, frames, binary=not args.json)
+            elapsed = time.perf_counter() - start
+        print(f"{label:<20} {len(frames) / elapsed:8.0f} frames/s | {messages:>7} messages "
+              f"({messages / elapsed:8.0f}/s) | {elapsed / len(frames) * 1e3:6.3f} ms per frame")
+
+
+if __name__ == '__main__':
+    main()
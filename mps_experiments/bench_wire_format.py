@@ -0,0 +1,52 @@
+# bench_wire_format.py
+# Bytes per frame and encode/decode CPU for the live_detections payload,
+# JSON vs the packed binary format in main/wire_format.py, at 50 and 200 people.
+#
+#   python bench_wire_format.py
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import encode_payload, decode
+
+REPEATS = 2000
+
+
+def make_frame(n_people):
+    detections = []
+    for pid in range(n_people):
+        detections.append({
+            "id": pid + 1,
+            "x": random.uniform(-5, 8),
+            "z": random.uniform(-4, 8),
+            "occupancy": n_people,
+            "region": f"WALKWAY_{random.randint(1, 7)}",
+            "is_occluded": random.random() < 0.2
+        })
+    return {"room_count": n_people, "detections": detections}
+
+
+def per_call_us(fn, arg):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        fn(arg)
+    return (time.perf_counter() - start) / REPEATS * 1e6
+
+
+for n_people in (50, 200):
+    frame = make_frame(n_people)
+    as_json = encode_payload(frame, binary=False)
+    as_binary = encode_payload(frame, binary=True)
+
+    json_enc = per_call_us(lambda p: encode_payload(p, binary=False), frame)
+    json_dec = per_call_us(json.loads, as_json)
+    bin_enc = per_call_us(lambda p: encode_payload(p, binary=True), frame)
+    bin_dec = per_call_us(decode, as_binary)
+
+    print(f"--- {n_people} people ---")
+    print(f"JSON    {len(as_json.encode()):>7} bytes/frame | encode {json_enc:8.1f} us | decode {json_dec:8.1f} us")
+    print(f"binary  {len(as_binary):>7} bytes/frame | encode {bin_enc:8.1f} us | decode {bin_dec:8.1f} us")
+    print(f"size ratio: {len(as_binary) / len(as_json.encode()):.2f}")
@@ -0,0 +1,375 @@
+# calibration.py
+# Calibration build step. The region polygons and homographies of a camera are
+# validated once and compiled, with the special-case homographies and the
+# region rasters of the stream sizes in use, into one versioned artifact per
+# camera:
+#
+#   b"MPSCALIB" | uint32 version | uint32 header length | JSON header | arrays
+#
+# The header lists every array's dtype, shape and offset (64-byte aligned), so
+# loading is one np.memmap and a few views: no pickle, no recomputation.
+#
+# Polygons and homographies are stored in normalized coordinates (0..1 of the
+# frame), so one calibration serves every resolution of a camera: at(size)
+# materializes the pixel polygons, homographies and raster of a frame size
+# once (compiled sizes are views of the file) and a switch between the main
+# and sub-stream (channels 101/102) is a dict lookup after that.
+#
+#   python calibration.py                            # compile homo_maps/cam{1,2,3}_calib
+#   python calibration.py --size 640x360             # ... plus the sub-stream's rasters
+#   python calibration.py --inspect homo_maps/cam1_calib.calib
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+import cv2
+import numpy as np
+
+from regions import LabelRaster, stack_homographies
+
+FORMAT_VERSION = 2
+MAGIC = b"MPSCALIB"
+ALIGN = 64
+
+
+class CalibrationError(ValueError):
+    pass
+
+
+def read_npz(npz_file):
+    """homo_maps npz (poly_<name> / H_<name> arrays) -> (polygons, homographies), no pickle"""
+    polygons, homographies = {}, {}
+    with np.load(npz_file, allow_pickle=False) as data:
+        for key in data.files:
+            if key.startswith("poly_"):
+                polygons[key[len("poly_"):]] = data[key]
+            elif key.startswith("H_"):
+                homographies[key[len("H_"):]] = data[key]
+    return polygons, homographies
+
+
+def fit_homographies(pairs):
+    """{name: (image points, world points)} -> {name: (3, 3)} (cv2.findHomography)"""
+    homographies = {}
+    for name, (image, world) in pairs.items():
+        image, world = np.asarray(image, dtype=np.float32), np.asarray(world, dtype=np.float32)
+        H = None
+        if len(image) >= 4 and image.shape == world.shape:
+            H, _ = cv2.findHomography(image, world)
+        if H is None:
+            raise CalibrationError(f"invalid calibration:\n  {name}: no homography fits its image/world points")
+        homographies[name] = H
+    return homographies
+
+
+def _check_homography(label, H, points=None):
+    H = np.asarray(H)
+    if H.shape != (3, 3):
+        return [f"{label}: homography has shape {H.shape}, expected (3, 3)"]
+    if not np.isfinite(H).all():
+        return [f"{label}: homography has non-finite entries"]
+    if abs(np.linalg.det(H.astype(np.float64))) < 1e-12:
+        return [f"{label}: homography is singular"]
+    if points is not None:
+        # The region must not straddle the homography's horizon line
+        w = points @ H[2, :2] + H[2, 2]
+        if (np.abs(w) < 1e-12).any() or not ((w > 0).all() or (w < 0).all()):
+            return [f"{label}: polygon crosses the homography's horizon"]
+    return []
+
+
+def validate(polygons, homographies, size, extra=None):
+    """Raises CalibrationError listing every problem of a calibration"""
+    problems = []
+    w, h = size
+    if w <= 0 or h <= 0:
+        problems.append(f"frame size {w}x{h} is not positive")
+    if not polygons:
+        problems.append("no region polygons")
+    if len(polygons) > 254:
+        problems.append(f"{len(polygons)} regions, a label raster holds at most 254")
+    for name in sorted(set(polygons) ^ set(homographies)):
+        problems.append(f"{name}: has a {'polygon' if name in polygons else 'homography'} but no "
+                        f"{'homography' if name in polygons else 'polygon'}")
+
+    for name, poly in polygons.items():
+        poly = np.asarray(poly, dtype=np.float64)
+        if poly.ndim != 2 or poly.shape[1] != 2 or len(poly) < 3:
+            problems.append(f"{name}: polygon has shape {poly.shape}, expected (N >= 3, 2)")
+            continue
+        if not np.isfinite(poly).all():
+            problems.append(f"{name}: polygon has non-finite vertices")
+            continue
+        x, y = poly[:, 0], poly[:, 1]
+        if abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) < 1e-9:
+            problems.append(f"{name}: polygon has no area")
+        if x.max() < 0 or y.max() < 0 or x.min() >= w or y.min() >= h:
+            problems.append(f"{name}: polygon lies outside the {w}x{h} frame")
+        if name in homographies:
+            problems += _check_homography(name, homographies[name], poly)
+
+    for name, H in (extra or {}).items():
+        problems += _check_homography(name, H)
+    if problems:
+        raise CalibrationError("invalid calibration:\n  " + "\n  ".join(problems))
+
+
+def digest(polygons, source_size, homographies=None, world=None, extra_points=None):
+    """Fingerprint of a calibration's inputs, stored in the artifact to detect stale builds"""
+    sha = hashlib.sha1(f"{FORMAT_VERSION} {source_size[0]}x{source_size[1]}".encode())
+    groups = {"poly": polygons, "H": homographies or {}, "world": world or {}}
+    for name, (image, world_pts) in (extra_points or {}).items():
+        groups[f"extra_{name}"] = {"image": image, "world": world_pts}
+    for label, group in groups.items():
+        for name, arr in group.items():
+            arr = np.ascontiguousarray(arr)
+            sha.update(f"|{label}/{name}:{arr.dtype.str}:{arr.shape}".encode())
+            sha.update(arr.tobytes())
+    return sha.hexdigest()
+
+
+def normalize(points, size):
+    """(N, 2) pixels of a (w, h) frame -> (N, 2) float64 in 0..1"""
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2) / np.array(size, dtype=np.float64)
+
+
+def to_pixels(points, size):
+    """(N, 2) normalized -> float pixels of a (w, h) frame. Rounded to 1e-6 px,
+    so a polygon comes back at its own size exactly as it went in."""
+    return np.round(np.asarray(points, dtype=np.float64) * np.array(size, dtype=np.float64), 6)
+
+
+def homographies_to_pixels(stack, size):
+    """Homographies of normalized points -> homographies of a (w, h) frame's pixels"""
+    return stack @ np.diag([1.0 / size[0], 1.0 / size[1], 1.0])
+
+
+def _size_key(size):
+    return f"{int(size[0])}x{int(size[1])}"
+
+
+def compile_calibration(path, polygons, source_size, homographies=None, world=None, sizes=(),
+                        extra_points=None, camera=""):
+    """Validates a calibration and writes its artifact to `path`.
+
+    polygons: {region: (N, 2)} in source_size pixels, dict order = region
+    priority. homographies: {region: (3, 3)}, or world: {region: (N, 2)} world
+    points of the polygon vertices to fit them from. sizes: extra frame sizes
+    to compile (the source size always is). extra_points: {name: (image
+    points, world points)} of special-case homographies, fitted here and
+    appended after the regions' in the stack.
+    """
+    source_size = (int(source_size[0]), int(source_size[1]))
+    inputs = digest(polygons, source_size, homographies, world, extra_points)
+    if homographies is None:
+        homographies = fit_homographies({name: (poly, world[name]) for name, poly in polygons.items() if name in world})
+    extra = fit_homographies(extra_points or {})
+    validate(polygons, homographies, source_size, extra)
+
+    names = list(polygons)
+    stack = stack_homographies(names, homographies, extra=extra.values())
+    vertex_counts = [len(polygons[n]) for n in names]
+
+    # Normalized: vertices / frame size, homographies taking normalized points
+    arrays = {
+        "polygons": np.concatenate([normalize(polygons[n], source_size) for n in names]),
+        "homographies": stack @ np.diag([float(source_size[0]), float(source_size[1]), 1.0]),
+    }
+    targets = [source_size] + [tuple(map(int, s)) for s in sizes if tuple(map(int, s)) != source_size]
+    for size in dict.fromkeys(targets):
+        pixels = to_pixels(arrays["polygons"], size).astype(np.float32)
+        bounds = np.cumsum([0] + vertex_counts)
+        polys = {n: pixels[bounds[i]:bounds[i + 1]] for i, n in enumerate(names)}
+        arrays[f"raster/{_size_key(size)}"] = LabelRaster(polys, size).labels
+
+    header = {
+        "version": FORMAT_VERSION,
+        "camera": camera,
+        "digest": inputs,
+        "source_size": list(source_size),
+        "sizes": [list(s) for s in dict.fromkeys(targets)],
+        "names": names,
+        "vertex_counts": vertex_counts,
+        "extras": list(extra),
+        "arrays": {},
+    }
+    # Offsets depend on the header length, so lay the arrays out until it stops changing
+    offset_base = 0
+    while True:
+        offset = offset_base
+        for key, arr in arrays.items():
+            offset = -(-offset // ALIGN) * ALIGN
+            header["arrays"][key] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += arr.nbytes
+        blob = json.dumps(header).encode()
+        start = -(-(len(MAGIC) + 8 + len(blob)) // ALIGN) * ALIGN
+        if start == offset_base:
+            break
+        offset_base = start
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + np.array([FORMAT_VERSION, len(blob)], dtype="<u4").tobytes() + blob)
+        for key, arr in arrays.items():
+            f.write(b"\0" * (header["arrays"][key]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+    return header
+
+
+class CalibrationView:
+    """A calibration materialized for one (w, h) frame size.
+
+    polygons: {region: (N, 2) float32 pixels}, stack: (regions + extras, 3, 3)
+    homographies of this size's pixels, raster: the region LabelRaster,
+    extra_index: {name: stack index} of the special-case homographies.
+    scale: (sx, sy) from the calibration's source pixels to these.
+    """
+
+    __slots__ = ("size", "names", "polygons", "stack", "raster", "extra_index", "scale")
+
+    def __init__(self, size, names, polygons, stack, raster, extra_index, scale):
+        self.size = size
+        self.names = names
+        self.polygons = polygons
+        self.stack = stack
+        self.raster = raster
+        self.extra_index = extra_index
+        self.scale = scale
+
+    def to_source(self, points):
+        """(N, 2) pixels of this size -> pixels of the calibration's source size"""
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2) / np.array(self.scale)
+
+
+class Calibration:
+    """A compiled calibration, memory-mapped read-only.
+
+    names: regions in priority order (= LabelRaster / homography index);
+    extra_index: {name: stack index} of the special-case homographies.
+    at(size) is the calibration in a frame size's pixels, built on first use
+    and cached (rasters of compiled sizes are views of the file);
+    raster(size), polygons(size) and stack(size) are shorthands for it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._mm[:len(MAGIC)]) != MAGIC:
+            raise CalibrationError(f"{path} is not a compiled calibration")
+        version, length = np.frombuffer(self._mm[len(MAGIC):len(MAGIC) + 8], dtype="<u4")
+        if version != FORMAT_VERSION:
+            raise CalibrationError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        self.header = json.loads(bytes(self._mm[len(MAGIC) + 8:len(MAGIC) + 8 + length]))
+        self.version = int(version)
+        self.camera = self.header["camera"]
+        self.digest = self.header["digest"]
+        self.source_size = tuple(self.header["source_size"])
+        self.names = self.header["names"]
+        self.extra_index = {name: len(self.names) + i for i, name in enumerate(self.header["extras"])}
+        self._bounds = np.cumsum([0] + self.header["vertex_counts"])
+        self._views = {}
+
+    def _array(self, key):
+        spec = self.header["arrays"].get(key)
+        if spec is None:
+            return None
+        return np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=self._mm, offset=spec["offset"])
+
+    @property
+    def sizes(self):
+        """Frame sizes whose rasters are compiled in"""
+        return [tuple(s) for s in self.header["sizes"]]
+
+    def at(self, size=None):
+        size = self.source_size if size is None else (int(size[0]), int(size[1]))
+        view = self._views.get(size)
+        if view is not None:
+            return view
+
+        start = time.perf_counter()
+        pixels = to_pixels(self._array("polygons"), size).astype(np.float32)
+        polygons = {name: pixels[self._bounds[i]:self._bounds[i + 1]] for i, name in enumerate(self.names)}
+        labels = self._array(f"raster/{_size_key(size)}")
+        if labels is not None:
+            raster = LabelRaster.from_labels(self.names, labels, size)
+        else:
+            raster = LabelRaster(polygons, size)
+            print(f"📐 {self.camera or self.path}: {size[0]}x{size[1]} raster built in "
+                  f"{(time.perf_counter() - start) * 1e3:.0f} ms (compile it in with --size {size[0]}x{size[1]})")
+        scale = (size[0] / self.source_size[0], size[1] / self.source_size[1])
+        stack = homographies_to_pixels(self._array("homographies"), size)
+        view = self._views[size] = CalibrationView(size, self.names, polygons, stack, raster, self.extra_index, scale)
+        return view
+
+    def polygons(self, size=None):
+        return self.at(size).polygons
+
+    def stack(self, size=None):
+        return self.at(size).stack
+
+    def raster(self, size=None):
+        return self.at(size).raster
+
+
+def load_or_compile(path, polygons, source_size, homographies=None, world=None, sizes=(), extra_points=None, camera=""):
+    """The artifact at `path` (arguments as compile_calibration), rebuilt first
+    if it is missing, of another format version, compiled from other inputs or
+    missing one of `sizes` (the sizes it already had are kept)"""
+    want = digest(polygons, source_size, homographies, world, extra_points)
+    sizes = [tuple(map(int, s)) for s in sizes]
+    try:
+        calib = Calibration(path)
+        if calib.digest == want:
+            if all(s in calib.sizes for s in sizes):
+                return calib
+            sizes = list(dict.fromkeys(calib.sizes + sizes))
+    except (OSError, ValueError):
+        pass
+    start = time.perf_counter()
+    compile_calibration(path, polygons, source_size, homographies, world, sizes, extra_points, camera)
+    print(f"🛠️  compiled {path} in {(time.perf_counter() - start) * 1e3:.0f} ms")
+    return Calibration(path)
+
+
+def _parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and compile the camera calibrations")
+    parser.add_argument('--size', type=_parse_size, action='append', default=[], metavar='WxH',
+                        help="also compile this frame size's rasters (repeatable)")
+    parser.add_argument('--inspect', metavar='FILE', help="print a compiled artifact instead")
+    args = parser.parse_args()
+
+    if args.inspect:
+        start = time.perf_counter()
+        calib = Calibration(args.inspect)
+        raster = calib.raster()
+        elapsed = time.perf_counter() - start
+        print(f"📦 {args.inspect}: {calib.camera or '-'} v{calib.version}, source {calib.source_size}, "
+              f"sizes {calib.sizes}, {len(calib.names)} regions, extras {list(calib.extra_index)}")
+        print(f"   raster {raster.labels.shape}, digest {calib.digest[:12]}, opened in {elapsed * 1e3:.2f} ms")
+        return
+
+    from sync_cameras import CALIBRATION_SOURCES, compile_camera
+    failed = False
+    for cam_id in CALIBRATION_SOURCES:
+        try:
+            start = time.perf_counter()
+            header, path = compile_camera(cam_id, args.size)
+            print(f"✅ {cam_id}: {path} ({len(header['names'])} regions, extras {header['extras']}, "
+                  f"sizes {header['sizes']}) in {(time.perf_counter() - start) * 1e3:.0f} ms")
+        except CalibrationError as e:
+            print(f"❌ {cam_id}: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
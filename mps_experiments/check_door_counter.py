@@ -0,0 +1,280 @@
+# check_door_counter.py
+# DoorCounter (door_counter.py) against the per-track Python it replaces:
+#   pair   - live_tracker.py's outer/inner lines + zones state machine
+#   toward - LineCounter.process_cam1 (CAM_1's line + inside-line distance)
+#   gate   - LineCounter.process_cam2 (CAM_2's two doors, counted once)
+# The old code is copied below as the reference. Both are fed the same
+# tracks - random walks that cross the doors back and forth, with jitter,
+# dropped frames and lost ids, plus the recorded cam1/cam2 tracks of
+# combined_frames.csv - and every enter/exit event (frame, id, direction)
+# has to match. Then the per-frame cost of both as tracks and doors grow.
+#
+#   python check_door_counter.py
+#   python check_door_counter.py --walks 2000 --frames 200
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from regions import LabelRaster
+from door_counter import Door, DoorCounter
+from sync_cameras import CAMERA_DOORS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDED = os.path.join(BASE_DIR, '..', 'csv_files', 'files', 'combined_frames.csv')
+
+# live_tracker.py's door at the 1920x1080 fallback size
+SIZE = (1920, 1080)
+SX, SY = 1920 / 3024, 1080 / 1706
+scale_point = lambda pt: (int(pt[0] * SX), int(pt[1] * SY))
+INNER_A, INNER_B = scale_point((2001, 1578)), scale_point((495, 1436))
+OUTER_A, OUTER_B = scale_point((1998, 1629)), scale_point((474, 1478))
+INNER_POLYGON = np.array([INNER_A, INNER_B, scale_point((495, 1358)), scale_point((2001, 1500))], dtype=np.int32)
+OUTER_POLYGON = np.array([OUTER_A, OUTER_B, scale_point((474, 1556)), scale_point((1998, 1707))], dtype=np.int32)
+COUNT_COOLDOWN = 15
+
+MAIN_DOOR = Door("main", [(OUTER_A, OUTER_B), (INNER_A, INNER_B)], rule="pair",
+                 zones=(OUTER_POLYGON, INNER_POLYGON), margin=30, cooldown=COUNT_COOLDOWN)
+
+# The translation trackers' doors
+CAM1_V, CAM1_INSIDE = CAMERA_DOORS["CAM_1"][0].lines
+CAM2_OUT1, CAM2_H1 = CAMERA_DOORS["CAM_2"][0].lines
+CAM2_OUT2, CAM2_H2 = CAMERA_DOORS["CAM_2"][1].lines
+
+
+# ---------------------------------------------------------------- reference
+def point_side(p, a, b):
+    return (p[0] - a[0]) * (b[1] - a[1]) - (p[1] - a[1]) * (b[0] - a[0])
+
+def point_line_distance(P, A, B):
+    return abs((B[1]-A[1])*P[0] - (B[0]-A[0])*P[1] + B[0]*A[1] - B[1]*A[0]) / max(1e-5, np.linalg.norm([B[1]-A[1], B[0]-A[0]]))
+
+def within_segment(p, a, b, margin=30):
+    return (min(a[0], b[0]) - margin <= p[0] <= max(a[0], b[0]) + margin
+            and min(a[1], b[1]) - margin <= p[1] <= max(a[1], b[1]) + margin)
+
+def within_segment_x(p, a, b, margin=20):
+    return min(a[0], b[0]) - margin <= p[0] <= max(a[0], b[0]) + margin
+
+def crossed_line(prev_side, curr_side, foot, a, b):
+    if prev_side is None or prev_side == 0 or curr_side == 0:
+        return False
+    return prev_side * curr_side < 0 and within_segment(foot, a, b)
+
+
+class OldPairDoor:
+    """live_tracker.py's counting block, one door"""
+
+    def __init__(self, inner, outer, zones):
+        self.inner, self.outer, self.zones = inner, outer, zones
+        self.state = {}
+
+    def update(self, frame_idx, tid, foot, events):
+        inner_now = point_side(foot, *self.inner)
+        outer_now = point_side(foot, *self.outer)
+        zone = self.zones.names_for([foot])[0]
+        state = self.state.get(tid)
+        if state is None:
+            self.state[tid] = {"inner": inner_now, "outer": outer_now, "zone": zone, "seq": None, "last": -9999}
+            return
+        last_zone = state["zone"]
+        cross_inner = crossed_line(state["inner"], inner_now, foot, *self.inner)
+        cross_outer = crossed_line(state["outer"], outer_now, foot, *self.outer)
+
+        def count(direction):
+            if frame_idx - state["last"] >= COUNT_COOLDOWN:
+                events.append((frame_idx, tid, direction))
+                state["last"] = frame_idx
+
+        if state["seq"] is None:
+            if cross_outer and not cross_inner:
+                state["seq"] = "outer_first"
+            elif cross_inner and not cross_outer:
+                state["seq"] = "inner_first"
+        elif state["seq"] == "outer_first":
+            if cross_inner or zone == "inner":
+                count(1)
+                state["seq"] = None
+        elif state["seq"] == "inner_first":
+            if cross_outer or zone == "outer":
+                count(-1)
+                state["seq"] = None
+        if state["seq"] is None:
+            if last_zone == "outer" and zone == "inner":
+                count(1)
+            elif last_zone == "inner" and zone == "outer":
+                count(-1)
+        state["inner"], state["outer"], state["zone"] = inner_now, outer_now, zone
+
+
+class OldLineCounter:
+    """LineCounter.process_cam1 / process_cam2"""
+
+    def __init__(self, cam_id):
+        self.cam_id = cam_id
+        self.state = {}
+
+    def update(self, frame_idx, tid, foot, events):
+        if self.cam_id == "CAM_1":
+            side_now = point_side(foot, *CAM1_V)
+            dist_now = point_line_distance(foot, *CAM1_INSIDE)
+            p = self.state.get(tid)
+            if p is None:
+                self.state[tid] = {"side": side_now, "dist": dist_now, "counted": False}
+                return
+            if p["side"] * side_now < 0 and not p["counted"]:
+                events.append((frame_idx, tid, 1 if dist_now < p["dist"] else -1))
+                p["counted"] = True
+            p["side"], p["dist"] = side_now, dist_now
+            return
+
+        now = {k: point_side(foot, *line) for k, line in
+               (("out1", CAM2_OUT1), ("h1", CAM2_H1), ("out2", CAM2_OUT2), ("h2", CAM2_H2))}
+        p = self.state.get(tid)
+        if p is None:
+            self.state[tid] = dict(now, seq=None, counted=False)
+            return
+        cross_out1 = p["out1"] * now["out1"] < 0 and within_segment_x(foot, *CAM2_OUT1)
+        cross_h1 = p["h1"] * now["h1"] < 0 and within_segment_x(foot, *CAM2_H1)
+        cross_out2 = p["out2"] * now["out2"] < 0
+        cross_h2 = p["h2"] * now["h2"] < 0
+        if not p["counted"]:
+            if cross_out1: p["seq"] = "OUT1"
+            elif cross_h1:
+                events.append((frame_idx, tid, -1 if p["seq"] == "OUT1" else 1))
+                p["counted"] = True
+        if not p["counted"]:
+            if cross_out2: p["seq"] = "OUT2"
+            elif cross_h2:
+                events.append((frame_idx, tid, 1 if p["seq"] == "OUT2" else -1))
+                p["counted"] = True
+        p.update(now)
+
+
+# ---------------------------------------------------------------- tracks
+def walks(lines, n_people, n_frames, seed, integer):
+    """Per-frame (tids, feet): people pacing back and forth across the given lines"""
+    rng = np.random.default_rng(seed)
+    pts = np.array([p for line in lines for p in line], dtype=np.float64)
+    lo, hi = pts.min(axis=0) - 60, pts.max(axis=0) + 60
+    start = rng.integers(0, n_frames // 2, n_people)
+    length = rng.integers(20, n_frames // 2, n_people)
+    pos = rng.uniform(lo, hi, (n_people, 2))
+    goal = rng.uniform(lo, hi, (n_people, 2))
+    frames = []
+    for f in range(n_frames):
+        step = goal - pos
+        dist = np.linalg.norm(step, axis=1, keepdims=True)
+        pos += step / np.maximum(dist, 1e-9) * np.minimum(dist, rng.uniform(2, 12, (n_people, 1)))
+        pos += rng.normal(0, 1.5, pos.shape)
+        arrived = dist[:, 0] < 5
+        goal[arrived] = rng.uniform(lo, hi, (arrived.sum(), 2))
+        live = (f >= start) & (f < start + length) & (rng.random(n_people) > 0.08)
+        feet = np.rint(pos[live]) if integer else np.rint(pos[live] * 2) / 2
+        frames.append((np.nonzero(live)[0].tolist(), feet))
+    return frames
+
+
+def recorded(camera):
+    df = pd.read_csv(RECORDED)
+    df = df[df['camera'] == camera]
+    return [(g['track_id'].astype(int).tolist(), g[['feet_x', 'feet_y']].to_numpy(dtype=np.float64))
+            for _, g in df.groupby('frame', sort=True)]
+
+
+def run_old(old, frames, integer):
+    events = []
+    for f, (tids, feet) in enumerate(frames):
+        for tid, foot in zip(tids, feet):
+            foot = tuple(int(v) for v in foot) if integer else tuple(float(v) for v in foot)
+            old.update(f, tid, foot, events)
+    return events
+
+
+def run_new(counter, frames):
+    events = []
+    for f, (tids, feet) in enumerate(frames):
+        events.extend((f, tid, direction) for tid, _, direction in counter.update(f, tids, feet))
+    return events
+
+
+def compare(label, old_events, new_events):
+    assert old_events == new_events, (
+        f"{label}: {len(old_events)} old vs {len(new_events)} new events, first difference at "
+        f"{next(i for i, (a, b) in enumerate(zip(old_events + [None], new_events + [None])) if a != b)}")
+    enters = sum(1 for e in new_events if e[2] > 0)
+    print(f"✅ {label:<34} {len(new_events):6d} events ({enters} enter / {len(new_events) - enters} exit) identical")
+
+
+def check(args):
+    zones = LabelRaster({"inner": INNER_POLYGON, "outer": OUTER_POLYGON}, SIZE)
+    door_lines = [(INNER_A, INNER_B), (OUTER_A, OUTER_B)]
+    frames = walks(door_lines, args.walks, args.frames, 1, integer=True)
+    compare("pair (live_tracker door)", run_old(OldPairDoor((INNER_A, INNER_B), (OUTER_A, OUTER_B), zones), frames, True),
+            run_new(DoorCounter([MAIN_DOOR], size=SIZE, ttl=10 ** 9), frames))
+
+    for cam_id, lines in (("CAM_1", [CAM1_V]), ("CAM_2", [CAM2_OUT1, CAM2_H1, CAM2_OUT2, CAM2_H2])):
+        frames = walks(lines, args.walks, args.frames, 2, integer=False)
+        compare(f"{CAMERA_DOORS[cam_id][0].rule} ({cam_id} walks)", run_old(OldLineCounter(cam_id), frames, False),
+                run_new(DoorCounter(CAMERA_DOORS[cam_id], once=True, ttl=10 ** 9), frames))
+    for cam_id, camera in (("CAM_1", "cam1"), ("CAM_2", "cam2")):
+        frames = recorded(camera)
+        compare(f"{CAMERA_DOORS[cam_id][0].rule} ({cam_id}, recorded {camera})", run_old(OldLineCounter(cam_id), frames, False),
+                run_new(DoorCounter(CAMERA_DOORS[cam_id], once=True, ttl=10 ** 9), frames))
+
+
+# ---------------------------------------------------------------- timing
+def shifted_doors(n):
+    """n copies of the live_tracker door side by side, as n doors of one camera"""
+    doors = []
+    for i in range(n):
+        dx = (i % 4) * 40 - 60
+        shift = lambda pts: [(x + dx, y) for x, y in pts]
+        doors.append(Door(f"door {i}", [shift((OUTER_A, OUTER_B)), shift((INNER_A, INNER_B))], rule="pair",
+                          zones=(np.array(shift(OUTER_POLYGON)), np.array(shift(INNER_POLYGON))),
+                          margin=30, cooldown=COUNT_COOLDOWN))
+    return doors
+
+
+def bench(args):
+    print(f"\n⏱️  ms per frame, old per-track Python vs DoorCounter ({args.bench_frames} frames)")
+    print(f"{'tracks':>7} {'doors':>6} {'old':>9} {'new':>9}")
+    for n_doors in (1, 4, 16):
+        doors = shifted_doors(n_doors)
+        for n_tracks in (10, 50, 200):
+            frames = walks([(OUTER_A, OUTER_B), (INNER_A, INNER_B)], n_tracks * 2, args.bench_frames, 3, integer=True)
+            olds = [OldPairDoor(d.lines[1], d.lines[0], LabelRaster({"inner": d.zones[1], "outer": d.zones[0]}, SIZE))
+                    for d in doors]
+            start = time.perf_counter()
+            for f, (tids, feet) in enumerate(frames):
+                feet_t = [tuple(int(v) for v in foot) for foot in feet]
+                for old in olds:
+                    for tid, foot in zip(tids, feet_t):
+                        old.update(f, tid, foot, [])
+            t_old = (time.perf_counter() - start) / len(frames) * 1e3
+
+            counter = DoorCounter(doors, size=SIZE)
+            start = time.perf_counter()
+            for f, (tids, feet) in enumerate(frames):
+                counter.update(f, tids, feet)
+            t_new = (time.perf_counter() - start) / len(frames) * 1e3
+            mean_tracks = np.mean([len(t) for t, _ in frames])
+            print(f"{mean_tracks:7.0f} {n_doors:6d} {t_old:9.3f} {t_new:9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DoorCounter vs the old per-track counting code")
+    parser.add_argument('--walks', type=int, default=600, help="simulated people per check")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--bench-frames', type=int, default=200)
+    parser.add_argument('--no-bench', action='store_true')
+    args = parser.parse_args()
+    check(args)
+    if not args.no_bench:
+        bench(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# check_frame_grabber.py
+# Exercises FrameGrabber (frame_grabber.py) without a camera:
+#   1. a slow consumer on a local clip paced at 30 FPS gets the newest frame,
+#      never an older one, and the skipped frames are counted as dropped
+#   2. a flaky stand-in stream (fails to open, then dies mid-stream) is
+#      reopened with backoff and keeps delivering frames
+# Pass --source rtsp://... to point it at a real camera or a local RTSP
+# stand-in (mediamtx + ffmpeg -re -stream_loop -1 -i clip.mp4 -f rtsp ...).
+#
+#   python check_frame_grabber.py
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+from frame_grabber import FrameGrabber
+
+FPS = 30
+N_FRAMES = 90
+
+
+def write_clip(path):
+    """Flat grey frames whose brightness encodes the frame index"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (320, 240))
+    for i in range(N_FRAMES):
+        writer.write(np.full((240, 320, 3), 10 + 2 * i, dtype=np.uint8))
+    writer.release()
+
+
+def frame_index(frame):
+    return int(round((frame.mean() - 10) / 2))
+
+
+class FlakyCapture:
+    """cv2.VideoCapture stand-in: the first open fails, the first stream dies after 20 frames"""
+    opens = 0
+
+    def __init__(self, path):
+        FlakyCapture.opens += 1
+        self.cap = cv2.VideoCapture(path) if FlakyCapture.opens > 1 else None
+        self.reads = 0
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        self.reads += 1
+        if FlakyCapture.opens == 2 and self.reads > 20:
+            return False, None
+        return self.cap.read()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def check_slow_consumer(clip):
+    grabber = FrameGrabber(clip).start()
+    seen = []
+    lag = []
+    start = time.monotonic()
+    while True:
+        ok, frame = grabber.read(timeout=2.0)
+        if not ok:
+            break
+        idx = frame_index(frame)
+        seen.append(idx)
+        lag.append(int((time.monotonic() - start) * FPS) - idx)
+        time.sleep(0.1)   # "inference" at 10 FPS, slower than the 30 FPS source
+    grabber.release()
+
+    s = grabber.stats
+    assert seen == sorted(set(seen)), "frames must arrive newest-first, never repeated or out of order"
+    assert s['dropped'] > 0 and s['delivered'] + s['dropped'] == s['grabbed'], s
+    print(f"✅ slow consumer: {s['delivered']} delivered, {s['dropped']} dropped of {s['grabbed']} | "
+          f"max lag {max(lag)} frames (a synchronous cap.read() loop would fall {N_FRAMES - len(seen)} behind)")
+
+
+def check_reconnect(clip):
+    grabber = FrameGrabber("flaky://" + clip, backoff=0.05, realtime=True,
+                           capture_factory=lambda _: FlakyCapture(clip))
+    grabber.fps = FPS
+    grabber.start()
+    frames = 0
+    deadline = time.monotonic() + 5.0
+    while frames < 40 and time.monotonic() < deadline:
+        ok, _ = grabber.read(timeout=1.0)
+        frames += ok
+    grabber.release()
+    s = grabber.stats
+    assert frames >= 40 and s['reconnects'] == 2, s
+    print(f"✅ reconnect: {frames} frames read across {s['reconnects']} reconnects ({s['failures']} failures)")
+
+
+def watch(source, seconds):
+    grabber = FrameGrabber(source).start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ok, _ = grabber.read(timeout=1.0)
+        time.sleep(0.05)
+    grabber.release()
+    print(f"📊 {source}: {grabber.width}x{grabber.height} @ {grabber.fps:.1f} | {grabber.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check FrameGrabber drop-oldest and reconnect behaviour")
+    parser.add_argument('--source', help="watch a real stream instead of the synthetic checks")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.source:
+        watch(args.source, args.seconds)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, 'clip.mp4')
+        write_clip(clip)
+        check_slow_consumer(clip)
+        check_reconnect(clip)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# check_track_state.py
+# Soak test for TrackStore (track_state.py), the per-track state behind the
+# door counters. Replays the recorded three-camera tracks of the sync_angle
+# clips (csv_files/files/combined_frames.csv) over and over for a simulated
+# 24 hours, shifting track ids on every pass as a days-long RTSP session
+# does, and compares:
+#   old  - a dict that adds every new id and never forgets one
+#          (LineCounter.people_state, live_tracker's last_count_frame)
+#   new  - TrackStore with a frame TTL and a capacity
+# Prints entries, container bytes and process RSS once per simulated hour;
+# the new store has to stay flat (--new-only leaves the old dict out, so the
+# RSS column shows the store alone). A few behaviour checks (TTL keeps state
+# across a short gap, forgets it after, LRU capacity) run first.
+#
+#   python check_track_state.py                  # 24 h at the clips' 30 FPS
+#   python check_track_state.py --hours 2 --ttl 30 # live_tracker.py's TTL
+import os
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+from track_state import TrackRecord, TrackStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDED = os.path.join(BASE_DIR, '..', 'csv_files', 'files', 'combined_frames.csv')
+CAMERA_IDS = {'cam1': 0, 'cam2': 1, 'cam3': 2}
+
+
+class SoakTrack(TrackRecord):
+    __slots__ = ("side", "dist", "seq", "counted")
+
+    def __init__(self):
+        self.side = self.dist = self.seq = None
+        self.counted = False
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def deep_bytes(container, records):
+    return sys.getsizeof(container) + sum(sys.getsizeof(r) for r in records)
+
+
+def check_behaviour():
+    store = TrackStore(SoakTrack, ttl=5, capacity=3)
+    rec, new = store.touch(1, 0)
+    assert new
+    rec.side = 7
+    rec, new = store.touch(1, 4)          # seen again inside the TTL: same state
+    assert not new and rec.side == 7
+    store.expire(9)                       # last seen at 4, 9 - 5 = 4: still kept
+    assert 1 in store
+    store.expire(10)                      # now older than the TTL
+    assert 1 not in store and store.stats['expired'] == 1
+    for tid in (10, 11, 12):
+        store.touch(tid, 20)
+    store.touch(10, 21)                   # 11 is now the least recently seen
+    store.touch(13, 21)
+    assert 11 not in store and {10, 12, 13} <= set(r.tid for r in store)
+    assert store.stats['evicted'] == 1
+    print("✅ TTL keeps state across a short gap, forgets it after, LRU capacity holds")
+
+
+def load_frames():
+    df = pd.read_csv(RECORDED)
+    # One id space across cameras, as each counter sees its own camera's ids
+    df['key'] = df['camera'].map(CAMERA_IDS) * 100000 + df['track_id']
+    return [g['key'].to_numpy().tolist() for _, g in df.groupby('frame', sort=True)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="24 h memory soak for TrackStore")
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--fps', type=float, default=30.0, help="frames the counter sees per second")
+    parser.add_argument('--ttl', type=int, default=1200, help="frames (live_translation uses 1200)")
+    parser.add_argument('--capacity', type=int, default=4096)
+    parser.add_argument('--new-only', action='store_true', help="skip the unbounded dict")
+    args = parser.parse_args()
+
+    check_behaviour()
+
+    frames = load_frames()
+    span = max(max(ids) for ids in frames if ids) + 1
+    total = int(args.hours * 3600 * args.fps)
+    per_hour = int(3600 * args.fps)
+    print(f"🎞️  {len(frames)} recorded frames looped to {total} frames ({args.hours:g} h at {args.fps:g} FPS), "
+          f"ttl {args.ttl}, capacity {args.capacity}")
+
+    old = {}
+    store = TrackStore(SoakTrack, ttl=args.ttl, capacity=args.capacity)
+    rows = []
+    start = time.perf_counter()
+    print(f"{'hour':>4} {'old entries':>12} {'old MB':>8} {'new entries':>12} {'new MB':>8} {'RSS MB':>8}")
+    for frame_idx in range(total):
+        loop, i = divmod(frame_idx, len(frames))
+        offset = loop * span
+        for key in frames[i]:
+            tid = key + offset
+            if not args.new_only and tid not in old:
+                old[tid] = {"side": 0, "dist": 0.0, "counted": False}
+            rec, new = store.touch(tid, frame_idx)
+            if new:
+                rec.side = 0
+        store.expire(frame_idx)
+
+        if (frame_idx + 1) % per_hour == 0 or frame_idx + 1 == total:
+            hour = (frame_idx + 1) / per_hour
+            row = (hour, len(old), deep_bytes(old, old.values()) / 1e6, len(store),
+                   deep_bytes(store._records, store) / 1e6, rss_mb())
+            rows.append(row)
+            print(f"{row[0]:4.0f} {row[1]:12d} {row[2]:8.2f} {row[3]:12d} {row[4]:8.3f} {row[5]:8.1f}")
+
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  {total} frames in {elapsed:.1f}s | store stats {store.stats}")
+
+    new_sizes = [r[3] for r in rows]
+    assert max(new_sizes) <= args.capacity
+    assert rows[-1][3] <= max(new_sizes[:1]) * 1.5 + 50, "TrackStore kept growing"
+    print(f"✅ TrackStore stayed flat: {min(new_sizes)}-{max(new_sizes)} entries"
+          + ("" if args.new_only else f"; the unbounded dict reached {rows[-1][1]} entries / {rows[-1][2]:.1f} MB"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# check_wire_format.py
+# Round-trip check for main/wire_format.py: every payload the trackers build,
+# plus the edge cases the packed format has to keep (room_id, 0 vs absent,
+# per-detection occupancy), comes back from decode(encode_payload()) as the
+# same dict. Payloads the struct can't hold (extra keys, long names, None
+# numbers) must go out as JSON instead of losing anything, and malformed
+# messages (truncated frames, JSON that is not an object) must raise
+# ValueError, the one error app.py's listener expects from decode().
+#
+#   python check_wire_format.py
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import MAGIC, encode_payload, decode
+
+
+def detection(pid, **extra):
+    d = {"camera": "CAM_1", "id": pid, "x": 1.25, "z": -3.5, "region": "WALKWAY_1", "occupancy": 4}
+    d.update(extra)
+    return d
+
+
+CASES = {
+    # name: (payload, expect binary)
+    "live_translation detection": (detection(7), True),
+    "live_translation_no_vis frame": ({"frame": 12, "timestamp": 1760000000.25, "room_count": 3,
+                                       "detections": [detection(1), detection(2, camera="CAM_2")]}, True),
+    "live_tracker frame": ({"room_count": 5, "detections": [
+        {"id": 1, "x": 0.5, "z": 2.0, "occupancy": 2, "region": "ENTRY", "is_occluded": True},
+        {"id": 2, "x": 4.0, "z": 1.5, "occupancy": 2, "region": None, "is_occluded": False}]}, True),
+    "empty frame": ({"room_count": 0, "detections": []}, True),
+    "room_id routed frame": ({"room_id": "DILAB", "room_count": 1, "detections": [detection(3)]}, True),
+    "room_id on a detection": (detection(3, room_id="DILAB"), True),
+    "frame 0, timestamp 0": ({"frame": 0, "timestamp": 0.0, "room_count": 0, "detections": [detection(1)]}, True),
+    "no frame, no timestamp": ({"room_count": 2, "detections": [detection(1)]}, True),
+    "occupancy differs from room_count": ({"room_count": 9, "detections": [
+        detection(1, occupancy=0), detection(2, occupancy=6)]}, True),
+    "no occupancy, no region": ({"detections": [{"id": 1, "x": 0.0, "z": 0.0}]}, True),
+    "detection occupancy 0": (detection(1, occupancy=0), True),
+    "unknown frame key": ({"room_count": 1, "source": "cam-box-2", "detections": [detection(1)]}, False),
+    "unknown detection key": ({"room_count": 1, "detections": [detection(1, conf=0.8)]}, False),
+    "detections with different keys": ({"room_count": 1, "detections": [
+        detection(1), {"id": 2, "x": 0.0, "z": 0.0}]}, False),
+    "region over 255 bytes": ({"room_count": 1, "detections": [detection(1, region="R" * 300)]}, False),
+    "camera over 255 bytes": (detection(1, camera="é" * 200), False),
+    "room_id None": ({"room_id": None, "room_count": 1, "detections": [detection(1)]}, False),
+    "room_count None": ({"room_count": None, "detections": [detection(1)]}, False),
+    "negative id": (detection(-1), False),
+    "frame over u32": ({"frame": 2 ** 33, "room_count": 1, "detections": [detection(1)]}, False),
+}
+
+
+def same(a, b):
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= 1e-3 * max(1.0, abs(a))   # x/z travel as float32, timestamps as float64
+    return a == b and type(a) is type(b)
+
+
+failures = 0
+for name, (payload, binary) in CASES.items():
+    data = encode_payload(payload)
+    is_binary = isinstance(data, bytes) and data.startswith(MAGIC)
+    back = decode(data)
+    ok = is_binary == binary and same(payload, back)
+    failures += not ok
+    kind = "binary" if is_binary else "json"
+    print(f"{'✅' if ok else '❌'} {name:<36} {kind:<6} {len(data):>5} bytes")
+    if not ok:
+        print(f"   sent    {json.dumps(payload)[:200]}\n   decoded {json.dumps(back)[:200]}")
+
+
+frame = encode_payload(CASES["live_tracker frame"][0])
+named = encode_payload(CASES["room_id routed frame"][0])
+MALFORMED = {
+    "empty message": b"",
+    "magic only": MAGIC,
+    "truncated header": frame[:10],
+    "truncated string table": named[:27],
+    "truncated records": frame[:-5],
+    "trailing bytes": frame + b"\0",
+    "name index outside the table": named[:-3] + b"\x07" + named[-2:],
+    "unknown version": MAGIC + b"\x09" + frame[3:],
+    "invalid JSON": b"{not json",
+    "invalid utf-8": b"\xff\xfe",
+    "JSON list": b"[1, 2, 3]",
+    "JSON number": b"42",
+    "JSON string": '"hello"',
+    "JSON null": b"null",
+    "not bytes": 12,
+}
+for name, data in MALFORMED.items():
+    try:
+        decoded = decode(data)
+        ok, outcome = False, f"decoded to {decoded!r}"[:80]
+    except ValueError as e:
+        ok, outcome = True, f"ValueError: {e}"[:80]
+    except Exception as e:
+        ok, outcome = False, f"{type(e).__name__}: {e}"[:80]
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} {name:<36} {outcome}")
+print("✅ every payload round-trips, every malformed message raises ValueError" if failures == 0
+      else f"❌ {failures} checks failed")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,254 @@
+# door_counter.py
+# Enter/exit counting for any number of doors, declared as data and evaluated
+# for all tracks of a frame at once.
+import numpy as np
+
+from regions import LabelRaster
+from track_state import TrackRecord, TrackStore
+
+RULES = ("pair", "gate", "toward")
+NEVER = np.iinfo(np.int64).min // 2
+
+
+class Door:
+    """One counting door: two lines (a, b) and how crossing them counts.
+
+    rule:
+      "pair"   - line 0 then line 1 counts `direction`, line 1 then line 0
+                 counts -direction. With zones=(outer, inner) polygons, a
+                 started sequence also completes when the foot lands in the
+                 far zone, and an outer -> inner zone move (or back) counts
+                 on its own (live_tracker.py's door).
+      "gate"   - crossing line 1 counts: `direction` if the track crossed
+                 line 0 before, -direction if not (CAM_2's doors).
+      "toward" - crossing line 0 counts `direction` if the foot moved closer
+                 to line 1, -direction if it moved away (CAM_1's door).
+    margin: a crossing only counts with the foot within `margin` px of the
+    line's bounding box, on the x and y axes or only x (axes="x"); None
+    counts crossings anywhere along the infinite line.
+    cooldown: frames before the same track can count again at this door.
+    """
+
+    def __init__(self, name, lines, rule="pair", direction=1, zones=None, margin=None, axes="xy", cooldown=0):
+        if rule not in RULES:
+            raise ValueError(f"Unknown door rule '{rule}', expected one of {RULES}")
+        if len(lines) != 2:
+            raise ValueError(f"Door '{name}' needs two lines, got {len(lines)}")
+        if zones is not None and (rule != "pair" or len(zones) != 2):
+            raise ValueError(f"Door '{name}': zones are (outer, inner) polygons of a 'pair' door")
+        self.name = name
+        self.lines = [(tuple(a), tuple(b)) for a, b in lines]
+        self.rule = rule
+        self.direction = 1 if direction >= 0 else -1
+        self.zones = zones
+        self.margin = margin
+        self.axes = axes
+        self.cooldown = int(cooldown)
+
+    def __repr__(self):
+        return f"Door({self.name!r}, rule={self.rule!r}, direction={self.direction:+d})"
+
+
+class _Row(TrackRecord):
+    __slots__ = ("row",)
+
+
+class DoorCounter:
+    """Counts enter/exit events for a set of Doors over tracked foot points.
+
+    update(frame_idx, tids, feet) takes every track of a frame and returns
+    the events it produced as [(tid, door_name, +1 enter / -1 exit)].
+    Per-track state (last side of every line, zone, sequence, last count)
+    lives in arrays with one row per live track; the side of every foot
+    against every line, the crossings and the rules are a handful of array
+    operations over (tracks x doors), so adding doors or cameras adds data,
+    not code. Rows are handed out by a TrackStore, so a lost track keeps its
+    state for `ttl` frames and at most `capacity` tracks are kept.
+
+    size: (w, h) frame size in the doors' coordinates, needed when a door
+    has zones (they become one LabelRaster; where zones of different doors
+    overlap the earlier door wins).
+    once: count every track at most once over all doors, the first door in
+    declaration order winning a frame where several would count.
+    """
+
+    def __init__(self, doors, size=None, once=False, ttl=30, capacity=4096):
+        self.doors = list(doors)
+        self.once = once
+        n_doors = len(self.doors)
+
+        # Lines stacked as [door0 line0, door0 line1, door1 line0, ...]
+        ends = np.array([door.lines for door in self.doors], dtype=np.float64).reshape(-1, 2, 2)
+        self._a = ends[:, 0]
+        self._b = ends[:, 1]
+        self._d = self._b - self._a
+        self._norm = np.maximum(1e-5, np.hypot(self._d[:, 0], self._d[:, 1]))
+        self._lo = np.full((len(ends), 2), -np.inf)
+        self._hi = np.full((len(ends), 2), np.inf)
+        for i, door in enumerate(self.doors):
+            if door.margin is None:
+                continue
+            for j in (2 * i, 2 * i + 1):
+                lo = ends[j].min(axis=0) - door.margin
+                hi = ends[j].max(axis=0) + door.margin
+                axes = [0, 1] if door.axes == "xy" else [0]
+                self._lo[j, axes] = lo[axes]
+                self._hi[j, axes] = hi[axes]
+
+        self._direction = np.array([door.direction for door in self.doors], dtype=np.int64)
+        self._cooldown = np.array([door.cooldown for door in self.doors], dtype=np.int64)
+        self._pair = np.array([door.rule == "pair" for door in self.doors])
+        self._gate = np.array([door.rule == "gate" for door in self.doors])
+
+        # Zones of all doors in one raster: label 2i is door i's inner zone (priority), 2i + 1 its outer
+        zoned = [i for i, door in enumerate(self.doors) if door.zones is not None]
+        self._zones = None
+        if zoned:
+            if size is None:
+                raise ValueError("DoorCounter needs the frame size for doors with zones")
+            polygons = {}
+            for i in zoned:
+                outer, inner = self.doors[i].zones
+                polygons[(i, 1)] = inner
+                polygons[(i, 0)] = outer
+            self._zones = LabelRaster(polygons, size)
+            self._zone_door = np.array([i for i, _ in self._zones.names] + [-1])
+            self._zone_kind = np.array([k for _, k in self._zones.names] + [-1], dtype=np.int8)
+
+        self.tracks = TrackStore(_Row, ttl=ttl, capacity=capacity, on_drop=self._free_row)
+        self._free = list(range(capacity - 1, -1, -1))
+        self._side = np.full((capacity, 2 * n_doors), np.nan)
+        self._dist = np.full((capacity, n_doors), np.nan)
+        self._zone = np.full((capacity, n_doors), -1, dtype=np.int8)
+        self._seq = np.zeros((capacity, n_doors), dtype=np.int8)
+        self._last = np.full((capacity, n_doors), NEVER, dtype=np.int64)
+        self._counted = np.zeros(capacity, dtype=bool)
+
+        self.entered = np.zeros(n_doors, dtype=np.int64)
+        self.exited = np.zeros(n_doors, dtype=np.int64)
+
+    def _free_row(self, record):
+        self._free.append(record.row)
+
+    def _rows(self, tids, frame_idx):
+        rows = np.empty(len(tids), dtype=np.intp)
+        new = np.zeros(len(tids), dtype=bool)
+        for i, tid in enumerate(tids):
+            record, is_new = self.tracks.touch(tid, frame_idx)
+            if is_new:
+                record.row = self._free.pop()
+            rows[i] = record.row
+            new[i] = is_new
+        # New tracks start with no history, so nothing below can count them this frame
+        fresh = rows[new]
+        self._side[fresh] = np.nan
+        self._dist[fresh] = np.nan
+        self._zone[fresh] = -1
+        self._seq[fresh] = 0
+        self._last[fresh] = NEVER
+        self._counted[fresh] = False
+        return rows
+
+    def zones_of(self, feet):
+        """(N, 2) feet -> (N, doors) zone per door: 1 inner, 0 outer, -1 neither"""
+        zone = np.full((len(feet), len(self.doors)), -1, dtype=np.int8)
+        if self._zones is not None:
+            idx = self._zones.lookup(feet)
+            hit = np.nonzero(idx >= 0)[0]
+            zone[hit, self._zone_door[idx[hit]]] = self._zone_kind[idx[hit]]
+        return zone
+
+    def update(self, frame_idx, tids, feet):
+        """Feeds one frame's tracks; returns [(tid, door_name, +1 / -1)] in track order"""
+        tids = [int(t) for t in tids]
+        feet = np.asarray(feet, dtype=np.float64).reshape(-1, 2)
+        rows = self._rows(tids, frame_idx)
+
+        events = self._step(frame_idx, rows, feet) if len(rows) and self.doors else None
+        if events is not None:
+            hit_track, hit_door = np.nonzero(events)
+            out = [(tids[t], self.doors[d].name, int(events[t, d])) for t, d in zip(hit_track.tolist(), hit_door.tolist())]
+        else:
+            out = []
+        self.tracks.expire(frame_idx)
+        return out
+
+    def _step(self, frame_idx, rows, feet):
+        px, py = feet[:, 0:1], feet[:, 1:2]
+        a, d = self._a, self._d
+
+        # Side of every foot against every line (same expression as the old point_side)
+        side = (px - a[:, 0]) * d[:, 1] - (py - a[:, 1]) * d[:, 0]
+        near = ((px >= self._lo[:, 0]) & (px <= self._hi[:, 0])
+                & (py >= self._lo[:, 1]) & (py <= self._hi[:, 1]))
+        crossed = (self._side[rows] * side < 0) & near
+        c0, c1 = crossed[:, 0::2], crossed[:, 1::2]
+
+        # Distance to line 1 of every door, for "toward" doors
+        a1, b1, d1 = a[1::2], self._b[1::2], d[1::2]
+        dist = np.abs(d1[:, 1] * px - d1[:, 0] * py + b1[:, 0] * a1[:, 1] - b1[:, 1] * a1[:, 0]) / self._norm[1::2]
+
+        zone = self.zones_of(feet)
+        last_zone = self._zone[rows]
+        seq = self._seq[rows]
+
+        # Most frames nobody crosses a line or steps into a zone that moves a
+        # sequence on: only the per-track geometry advances
+        busy = crossed.any()
+        if not busy and self._zones is not None:
+            busy = ((zone != last_zone) | ((seq == 1) & (zone == 1)) | ((seq == -1) & (zone == 0))).any()
+        if not busy:
+            self._side[rows] = side
+            self._dist[rows] = dist
+            self._zone[rows] = zone
+            return None
+
+        last = self._last[rows]
+        cool = (frame_idx - last) >= self._cooldown
+
+        # "pair": a started sequence completes at the other line or in the far zone
+        start = seq == 0
+        fwd = (seq == 1) & (c1 | (zone == 1))
+        bwd = (seq == -1) & (c0 | (zone == 0))
+        new_seq = np.where(start & c0 & ~c1, 1, np.where(start & c1 & ~c0, -1, seq))
+        new_seq = np.where(fwd | bwd, 0, new_seq)
+        pair = np.where(fwd, 1, np.where(bwd, -1, 0)) * cool
+        # ... and with no sequence pending, outer zone -> inner zone counts by itself
+        moved = np.where((last_zone == 0) & (zone == 1), 1, np.where((last_zone == 1) & (zone == 0), -1, 0))
+        pair = np.where((new_seq == 0) & (pair == 0) & cool, moved, pair)
+
+        # "gate": line 0 arms the door, line 1 counts
+        gate = np.where(~c0 & c1, np.where(seq == 1, 1, -1), 0) * cool
+        gate_seq = np.where(c0, 1, np.where(gate != 0, 0, seq))
+
+        # "toward": line 0 counts, line 1 only tells the direction
+        toward = np.where(c0, np.where(dist < self._dist[rows], 1, -1), 0) * cool
+
+        events = np.where(self._pair, pair, np.where(self._gate, gate, toward)) * self._direction
+        new_seq = np.where(self._gate, gate_seq, np.where(self._pair, new_seq, seq))
+
+        if self.once:
+            # Already counted tracks change nothing; otherwise the first counting door wins
+            counted = self._counted[rows]
+            hit = events != 0
+            first = np.where(hit.any(axis=1), hit.argmax(axis=1), len(self.doors))
+            allowed = ~counted[:, None] & (np.arange(len(self.doors)) <= first[:, None])
+            events = np.where(allowed, events, 0)
+            new_seq = np.where(allowed, new_seq, seq)
+            self._counted[rows] = counted | (events != 0).any(axis=1)
+
+        self._side[rows] = side
+        self._dist[rows] = dist
+        self._zone[rows] = zone
+        self._seq[rows] = new_seq
+        self._last[rows] = np.where(events != 0, frame_idx, last)
+        self.entered += (events > 0).sum(axis=0)
+        self.exited += (events < 0).sum(axis=0)
+        return events
+
+    def totals(self):
+        """{door_name: (entered, exited)} since the counter started"""
+        return {door.name: (int(e), int(x)) for door, e, x in zip(self.doors, self.entered, self.exited)}
+
+    def __len__(self):
+        return len(self.tracks)
@@ -0,0 +1,182 @@
+# frame_grabber.py
+# Background RTSP/video capture that always hands the loop the newest frame.
+import os
+import time
+import threading
+
+import cv2
+
+
+class FrameGrabber:
+    """Decodes a cv2.VideoCapture source on its own thread, keeping only the newest frame.
+
+    Drop-in for the `cap` objects in the live scripts: read() returns
+    (ok, frame) with the most recent frame the loop has not seen yet,
+    waiting for one if needed. Frames decoded while the loop was busy with
+    inference are dropped (and counted) instead of queueing up in the
+    capture buffer, so detections never run on stale frames.
+
+    When a stream fails the grabber reopens it with exponential backoff
+    (`backoff` seconds, doubling up to `max_backoff`) rather than ending the
+    loop; read() just waits meanwhile. Local video files end at EOF unless
+    `loop_file` is set, and are paced at their own FPS when `realtime` is
+    set so they behave like a camera (the default for files). A local RTSP
+    stand-in works too, e.g. mediamtx plus
+        ffmpeg -re -stream_loop -1 -i clip.mp4 -f rtsp rtsp://localhost:8554/cam
+    """
+
+    def __init__(self, source, buffer_size=2, backoff=0.5, max_backoff=10.0, max_retries=None,
+                 loop_file=False, realtime=None, capture_factory=cv2.VideoCapture):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.loop_file = loop_file
+        self.realtime = self.is_file if realtime is None else realtime
+        self.capture_factory = capture_factory
+
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self.stats = {'grabbed': 0, 'delivered': 0, 'dropped': 0, 'reconnects': 0, 'failures': 0}
+
+        self._cap = None
+        self._frame = None
+        self._seq = 0
+        self._delivered_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._finished = False
+        self._thread = None
+
+    # ---- cv2.VideoCapture-compatible surface ----
+
+    def isOpened(self):
+        return self._running or self._frame_waiting()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return self._cap.get(prop) if self._cap is not None else 0.0
+
+    def set(self, prop, value):
+        return self._cap.set(prop, value) if self._cap is not None else False
+
+    def release(self):
+        self.stop()
+
+    # ---- grabber ----
+
+    def start(self):
+        """Opens the source (so width/height/fps are known) and starts the decode thread"""
+        if self._thread is None:
+            self._open()
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=f"FrameGrabber({self.source})", daemon=True)
+            self._thread.start()
+        return self
+
+    def read(self, timeout=None):
+        """Newest unseen frame as (ok, frame); (False, None) once the source has ended"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._frame_waiting():
+                if self._finished:
+                    return False, None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False, None
+                self._cond.wait(remaining)
+            self._delivered_seq = self._seq
+            self.stats['delivered'] += 1
+            return True, self._frame
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._finished = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._close()
+
+    def _frame_waiting(self):
+        return self._seq > self._delivered_seq
+
+    def _open(self):
+        self._close()
+        cap = self.capture_factory(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        # Keep the decoder's own queue short; dropping happens here instead
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.width
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.height
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+        self._cap = cap
+        return True
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _reconnect(self):
+        delay = self.backoff
+        attempts = 0
+        while self._running:
+            if self.max_retries is not None and attempts >= self.max_retries:
+                print(f"❌ Giving up on {self.source} after {attempts} reconnect attempts.")
+                return False
+            attempts += 1
+            print(f"⚠️ Lost {self.source}, reconnecting in {delay:.1f}s (attempt {attempts})...")
+            time.sleep(delay)
+            if self._open():
+                self.stats['reconnects'] += 1
+                print(f"✅ Reconnected to {self.source}")
+                return True
+            delay = min(delay * 2, self.max_backoff)
+        return False
+
+    def _run(self):
+        frame_interval = 1.0 / self.fps if self.realtime and self.fps else 0.0
+        next_due = time.monotonic()
+        while self._running:
+            ok, frame = (False, None) if self._cap is None else self._cap.read()
+            if not ok:
+                if self.is_file and self._cap is not None:
+                    # End of a local file: stop, or start it again from the top
+                    if not (self.loop_file and self._open()):
+                        break
+                    continue
+                self.stats['failures'] += 1
+                if not self._reconnect():
+                    break
+                next_due = time.monotonic()
+                continue
+
+            if frame_interval:
+                next_due += frame_interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            with self._cond:
+                if self._frame_waiting():
+                    self.stats['dropped'] += 1
+                self._frame = frame
+                self._seq += 1
+                self.stats['grabbed'] += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._running = False
+            self._finished = True
+            self._cond.notify_all()
@@ -2,8 +2,22 @@ import torch
 from ultralytics import YOLO
 import numpy as np
 import cv2
-import json
 import redis
+import time
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import encode_payload
+from tracking_bus import TrackingBus
+from publisher import Publisher
+from door_counter import DoorCounter
+from sync_cameras import TRACK_TTL, CAMERA_DOORS, load_camera, foot_points, map_feet
+from multi_stream import MultiStreamTracker, frames_from
+from render import StaticOverlay, region_ops
+
+# Packed binary payloads by default; WIRE_FORMAT=json for the old JSON messages
+WIRE_BINARY = os.getenv("WIRE_FORMAT", "binary") != "json"
 
 # ==========================================
 # 0. SETUP & DEVICE
@@ -25,6 +39,12 @@ except Exception as e:
     REDIS_AVAILABLE = False
     redis_client = None
 
+# PUBLISH by default; TRACKING_BUS=stream XADDs to a trimmed Redis stream instead
+tracking_bus = TrackingBus.from_env(redis_client)
+# One long-lived sender; each detection is keyed by (camera, track), so while Redis is slow
+# only every track's newest position waits to be sent
+publisher = Publisher(tracking_bus, encode=lambda p: encode_payload(p, binary=WIRE_BINARY)).start()
+
 device = 'mps' if torch.backends.mps.is_available() else 'cpu'
 print(f"Using device: {device}")
 
@@ -39,154 +59,51 @@ TRACKER_PATH = "custom_bytetrack.yaml"
 shared_state = {"count": 18}
 
 # ==========================================
-# 1. LOAD CALIBRATIONS HELPER & HALF-PERSON MATRICES
+# 1. LOAD CALIBRATIONS
 # ==========================================
-def load_calibration(npz_file):
-    try:
-        data = np.load(npz_file, allow_pickle=True)
-        regions_img = {}
-        homographies = {}
-        for key in data.files:
-            region_name = key.replace("poly_", "").replace("H_", "")
-            if key.startswith("poly_"):
-                regions_img[region_name] = data[key]
-            elif key.startswith("H_"):
-                homographies[region_name] = data[key]
-        return regions_img, homographies
-    except Exception as e:
-        print(f"Warning: Could not load {npz_file}. Error: {e}")
-        return {}, {}
-
+# Compiled artifacts (python calibration.py): polygons, homographies and region
+# rasters are memory-mapped, nothing is recomputed at startup. Each frame size
+# (main or sub-stream) is materialized once, on its first frame.
 print("Loading calibration maps...")
-cam1_polys, cam1_H = load_calibration("homo_maps/cam1_calib.npz")
-cam2_polys, cam2_H = load_calibration("homo_maps/cam2_calib.npz")
-cam3_polys, cam3_H = load_calibration("homo_maps/cam3_calib.npz")
-
-# --- OPTIMIZATION: Calculate Half-Person Matrices ONCE globally ---
-IBAD_DESK_GAP_REAL = np.array([(151*3.2, 248*3.2), (166*3.2, 263*3.2), (356*3.2, 188*3.2), (320*3.2, 182*3.2)], dtype=np.float32)
-IBAD_DESK_GAP_IMG = np.array([(-1.5, 7.5), (-3.5, 7.5), (-3.5, 4.5), (-1.5, 4.5)], dtype=np.float32)
-IBAD_HOMOGRAPHY, _ = cv2.findHomography(IBAD_DESK_GAP_REAL, IBAD_DESK_GAP_IMG)
-
-USHNA_TABLE_SIDE_REAL = np.array([(782, 497), (797, 553), (606, 544), (597, 490)], dtype=np.float32)
-USHNA_TABLE_SIDE_IMG = np.array([(3.25, 2), (3.25, 3), (7.75, 3), (7.75, 2)], dtype=np.float32)
-USHNA_HOMOGRAPHY, _ = cv2.findHomography(USHNA_TABLE_SIDE_REAL, USHNA_TABLE_SIDE_IMG)
-
+cam1_calib = load_camera("CAM_1")
+cam2_calib = load_camera("CAM_2")
+cam3_calib = load_camera("CAM_3")
 
 # ==========================================
 # 2. LINE COUNTING STATE MACHINE
 # ==========================================
-def point_side(p, a, b):
-    return (p[0] - a[0]) * (b[1] - a[1]) - (p[1] - a[1]) * (b[0] - a[0])
-
-def point_line_distance(P, A, B):
-    return abs((B[1]-A[1])*P[0] - (B[0]-A[0])*P[1] + B[0]*A[1] - B[1]*A[0]) / max(1e-5, np.linalg.norm([B[1]-A[1], B[0]-A[0]]))
-
-def within_segment_x(p, a, b, margin=20):
-    xmin = min(a[0], b[0]) - margin
-    xmax = max(a[0], b[0]) + margin
-    return xmin <= p[0] <= xmax
+# (color, thickness) of each door's two lines in the preview
+DOOR_STYLES = {
+    "CAM 1": [((0, 255, 255), 4), ((255, 0, 255), 4)],
+    "CAM 2 Door 1": [((255, 255, 0), 3), ((0, 255, 255), 4)],
+    "CAM 2 Door 2": [((255, 0, 255), 3), ((0, 0, 255), 3)],
+}
 
 class LineCounter:
+    """Counts one camera's CAMERA_DOORS into the shared occupancy, each track at most once"""
+
     def __init__(self, cam_id, shared_state_dict):
         self.cam_id = cam_id
-        self.people_state = {}
+        self.doors = CAMERA_DOORS.get(cam_id, [])
+        self.doors_counter = DoorCounter(self.doors, once=True, ttl=TRACK_TTL)
+        self.frame_idx = 0
         self.state = shared_state_dict  # Reference to the global dictionary
-        
-        if cam_id == "CAM_1":
-            self.v_line_a = (163, 967)
-            self.v_line_b = (12, 491)
-            self.inside_line_a = (130, 778)
-            self.inside_line_b = (174, 903)
-        elif cam_id == "CAM_2":
-            self.out1_a = (1802, 720)
-            self.out1_b = (2011, 704)
-            self.h1_a = (1855, 694)
-            self.h1_b = (1984, 686)
-            self.out2_a = (909, 272)
-            self.out2_b = (1019, 268)
-            self.h2_a = (909, 278)
-            self.h2_b = (1026, 280)
-
-    def process_cam1(self, tid, foot):
-        side_now = point_side(foot, self.v_line_a, self.v_line_b)
-        dist_now = point_line_distance(foot, self.inside_line_a, self.inside_line_b)
-        
-        if tid not in self.people_state:
-            self.people_state[tid] = {"side": side_now, "dist": dist_now, "counted": False}
-        else:
-            p_state = self.people_state[tid]
-            crossed = p_state["side"] * side_now < 0
-            
-            if crossed and not p_state["counted"]:
-                if dist_now < p_state["dist"]:
-                    self.state["count"] += 1
-                    print(f"[CAM 1] 🚶 ENTER → Global Count: {self.state['count']}")
-                else:
-                    self.state["count"] -= 1
-                    print(f"[CAM 1] 🚶 EXIT → Global Count: {self.state['count']}")
-                p_state["counted"] = True
-            
-            p_state["side"] = side_now
-            p_state["dist"] = dist_now
-            
-    def process_cam2(self, tid, foot):
-        out1_now = point_side(foot, self.out1_a, self.out1_b)
-        h1_now   = point_side(foot, self.h1_a, self.h1_b)
-        out2_now = point_side(foot, self.out2_a, self.out2_b)
-        h2_now   = point_side(foot, self.h2_a, self.h2_b)
-        
-        if tid not in self.people_state:
-            self.people_state[tid] = {"out1": out1_now, "h1": h1_now, "out2": out2_now, "h2": h2_now, "seq": None, "counted": False}
-        else:
-            p_state = self.people_state[tid]
-            cross_out1 = p_state["out1"] * out1_now < 0 and within_segment_x(foot, self.out1_a, self.out1_b)
-            cross_h1 = p_state["h1"] * h1_now < 0 and within_segment_x(foot, self.h1_a, self.h1_b)
-            cross_out2 = p_state["out2"] * out2_now < 0
-            cross_h2 = p_state["h2"] * h2_now < 0
-
-            if not p_state["counted"]:
-                if cross_out1: p_state["seq"] = "OUT1"
-                elif cross_h1:
-                    if p_state["seq"] == "OUT1":
-                        self.state["count"] -= 1
-                        print(f"[CAM 2 Door 1] 🚶 EXIT → Global Count: {self.state['count']}")
-                    else:
-                        self.state["count"] += 1
-                        print(f"[CAM 2 Door 1] 🚶 ENTER → Global Count: {self.state['count']}")
-                    p_state["counted"] = True
-
-            if not p_state["counted"]:
-                if cross_out2: p_state["seq"] = "OUT2"
-                elif cross_h2:
-                    if p_state["seq"] == "OUT2":
-                        self.state["count"] += 1
-                        print(f"[CAM 2 Door 2] 🚶 ENTER → Global Count: {self.state['count']}")
-                    else:
-                        self.state["count"] -= 1
-                        print(f"[CAM 2 Door 2] 🚶 EXIT → Global Count: {self.state['count']}")
-                    p_state["counted"] = True
-                    
-            p_state["out1"] = out1_now
-            p_state["h1"] = h1_now
-            p_state["out2"] = out2_now
-            p_state["h2"] = h2_now
-
-    def update(self, tid, foot):
-        if self.cam_id == "CAM_1":
-            self.process_cam1(tid, foot)
-        elif self.cam_id == "CAM_2":
-            self.process_cam2(tid, foot)
-
-    def draw_lines(self, frame):
-        if self.cam_id == "CAM_1":
-            cv2.line(frame, self.v_line_a, self.v_line_b, (0, 255, 255), 4)
-            cv2.line(frame, self.inside_line_a, self.inside_line_b, (255, 0, 255), 4)
-        elif self.cam_id == "CAM_2":
-            cv2.line(frame, self.out1_a, self.out1_b, (255, 255, 0), 3)
-            cv2.line(frame, self.h1_a, self.h1_b, (0, 255, 255), 4)
-            cv2.line(frame, self.out2_a, self.out2_b, (255, 0, 255), 3)
-            cv2.line(frame, self.h2_a, self.h2_b, (0, 0, 255), 3)
-            
+
+    def update(self, tids, feet):
+        """All tracks of one frame (may be none: the frame clock still advances);
+        feet in FRAME_SIZE pixels, the doors' coordinates"""
+        self.frame_idx += 1
+        for tid, door, direction in self.doors_counter.update(self.frame_idx, tids, feet):
+            self.state["count"] += direction
+            print(f"[{door}] 🚶 {'ENTER' if direction > 0 else 'EXIT'} → Global Count: {self.state['count']}")
+
+    def line_ops(self):
+        """Counting lines as StaticOverlay ops"""
+        return [("line", a, b, color, thickness)
+                for door in self.doors
+                for (a, b), (color, thickness) in zip(door.lines, DOOR_STYLES[door.name])]
+
+    def draw_occupancy(self, frame):
         cv2.putText(frame, f"Occupancy: {self.state['count']}", (50, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 4)
 
 # Instantiate Counters passing the shared dictionary
@@ -196,81 +113,60 @@ cam2_counter = LineCounter("CAM_2", shared_state)
 # ==========================================
 # 3. CORE TRANSLATION & DRAWING LOGIC
 # ==========================================
-def point_in_polygon(point, polygon):
-    return cv2.pointPolygonTest(polygon.astype(np.int32), point, False) >= 0
-
-def map_point(point_px, H_matrix):
-    pt = np.array([[point_px]], dtype=np.float32)
-    mapped = cv2.perspectiveTransform(pt, H_matrix)
-    return mapped[0][0]
-
-def draw_regions(frame, polys_dict):
-    for name, poly in polys_dict.items():
-        cv2.polylines(frame, [poly.astype(np.int32)], isClosed=True, color=(255, 0, 0), thickness=2)
-        cx, cy = np.mean(poly, axis=0).astype(int)
-        cv2.putText(frame, name, (cx - 20, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
-
-def process_and_translate(cam_id, frame, results, polys_dict, H_dict, state_dict, rescale_to_800=False, counter=None):
-    scale_factor = 2560/800
-    scaled_polys = {}
-    for key, poly in polys_dict.items():
-        if rescale_to_800:
-            scaled_poly = poly * scale_factor
-        else:
-            scaled_poly = poly
-        scaled_polys[key] = scaled_poly
+# Per camera: regions and counting lines rendered once, then blended onto each
+# frame (drawn in the calibration's pixels, rescaled if the stream size differs)
+STATIC_OVERLAYS = {}
+
+def draw_static(cam_id, frame, calib, counter=None):
+    overlay = STATIC_OVERLAYS.get(cam_id)
+    if overlay is None:
+        ops = region_ops(calib.polygons(), font_scale=0.5, text_thickness=1, label_dx=-20)
+        if counter:
+            ops += counter.line_ops()
+        overlay = STATIC_OVERLAYS[cam_id] = StaticOverlay([(1.0, ops)], base_size=calib.source_size)
+    overlay.composite(frame)
 
-    draw_regions(frame, scaled_polys)
-    if counter:
-        counter.draw_lines(frame)
+# Payloads published per camera on its last frame; logged once per LOG_EVERY seconds, not per detection
+BROADCASTS = {}
+LOG_EVERY = 1.0
+
+def process_and_translate(cam_id, frame, results, calib, state_dict, counter=None):
+    # The calibration in this stream's pixels, materialized on its first frame
+    view = calib.at((frame.shape[1], frame.shape[0]))
 
-    scale_x, scale_y = 1.0, 1.0
+    draw_static(cam_id, frame, calib, counter)
+    if counter:
+        counter.draw_occupancy(frame)
 
     if results[0].boxes.id is None:
+        if counter:
+            counter.update((), ())
+        BROADCASTS[cam_id] = 0
         return frame 
         
     boxes = results[0].boxes.xyxy.cpu().numpy()
     ids = results[0].boxes.id.cpu().numpy()
 
-    for box, track_id in zip(boxes, ids):
-        x1, y1, x2, y2 = map(int, box)
-        math_x1, math_x2 = x1 * scale_x, x2 * scale_x
-        math_y1, math_y2 = y1 * scale_y, y2 * scale_y
+    # Region and world position of every foot point in one pass
+    feet = foot_points(boxes)
+    region_idx = view.raster.lookup(feet)
+    world = map_feet(cam_id, view, boxes, feet, region_idx)
 
-        px = (math_x1 + math_x2) / 2.0
-        py = math_y2
-        foot = (px, py)
-        
-        # aspect ratio calculation
-        h = y2 - y1
-        w = x2 - x1
-        aspect_ratio = h / w if w > 0 else 0
+    # Line crossings of every track, before the payloads pick up the occupancy
+    if counter:
+        counter.update(ids, view.to_source(feet))
 
-        # Update counter BEFORE logic
-        if counter:
-            counter.update(int(track_id), foot)
+    broadcast = 0
+    for box, track_id, det_region, det_world in zip(boxes, ids, region_idx, world):
+        x1, y1, x2, y2 = map(int, box)
 
         region_name = None
         world_xy = None
 
-        # Determine region
-        for name, poly in scaled_polys.items():
-            if point_in_polygon(foot, poly):
-                region_name = name
-                if cam_id == "CAM_1":
-                    if region_name == "WALKWAY_1":
-                        displacement = -15 * aspect_ratio
-                        new_foot = (px, py + displacement)
-                        world_xy = map_point(new_foot, IBAD_HOMOGRAPHY)
-                        break
-                    elif region_name == "WALKWAY_25" and aspect_ratio < 1.8:
-                        new_foot = (px, py)
-                        world_xy = map_point(new_foot, USHNA_HOMOGRAPHY)
-                        break
-                
-                # Standard homography mapping for all other cases
-                world_xy = map_point(foot, H_dict[name])
-                break
+        # Region and world position were computed for the whole frame above
+        if det_region >= 0:
+            region_name = view.names[det_region]
+            world_xy = det_world
 
         if world_xy is not None:
             wx, wz = world_xy
@@ -288,12 +184,8 @@ def process_and_translate(cam_id, frame, results, polys_dict, H_dict, state_dict
             
             # Non-blocking Redis publish
             if REDIS_AVAILABLE:
-                try:
-                    redis_client.publish("tracking_stream", json.dumps(payload))
-                except Exception as e:
-                    print(f"❌ Redis publish failed: {e}")
-            
-            print(f"📡 BROADCAST: {json.dumps(payload)}")
+                publisher.submit("tracking_stream", payload, key=(cam_id, int(track_id)))
+            broadcast += 1
         else:
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
             label = f"ID:{int(track_id)} | Out"
@@ -304,25 +196,22 @@ def process_and_translate(cam_id, frame, results, polys_dict, H_dict, state_dict
         draw_py = int(y2)
         cv2.circle(frame, (draw_px, draw_py), radius=5, color=(0, 255, 255), thickness=-1)
 
+    BROADCASTS[cam_id] = broadcast
     return frame
 
 # ==========================================
 # 4. THE PROCESSING LOOP
 # ==========================================
 print("Loading Models into M4 Memory...")
-model_cam1 = YOLO(MODEL) 
-model_cam2 = YOLO(MODEL)
-model_cam3 = YOLO(MODEL)
+# One set of weights for all cameras; each camera keeps its own ByteTrack ids
+engine = MultiStreamTracker(YOLO(MODEL), ["CAM_1", "CAM_2", "CAM_3"], tracker=TRACKER_PATH, device=device)
 
-cap1 = cv2.VideoCapture(CAM_1)
-cap2 = cv2.VideoCapture(CAM_2)
-cap3 = cv2.VideoCapture(CAM_3)
+caps = {"CAM_1": cv2.VideoCapture(CAM_1), "CAM_2": cv2.VideoCapture(CAM_2), "CAM_3": cv2.VideoCapture(CAM_3)}
 
 print("Starting live translation stream...")
 
-CAM1_RESCALE = False 
-CAM2_RESCALE = False
-CAM3_RESCALE = True 
+frame_count = 0
+last_log = 0.0
 
 target_height = 400
 def resize_for_display(frame):
@@ -331,22 +220,27 @@ def resize_for_display(frame):
     return cv2.resize(frame, (int(target_height * aspect_ratio), target_height))
 
 while True:
-    ret1, frame1 = cap1.read()
-    ret2, frame2 = cap2.read()
-    ret3, frame3 = cap3.read()
-
-    if not (ret1 and ret2 and ret3):
+    frames = frames_from(caps)
+    if any(f is None for f in frames.values()):
         print("A video stream ended.")
         break
+    frame1, frame2, frame3 = frames["CAM_1"], frames["CAM_2"], frames["CAM_3"]
 
-    res1 = model_cam1.track(frame1, persist=True, device=device, tracker=TRACKER_PATH, classes=[0], verbose=False)
-    res2 = model_cam2.track(frame2, persist=True, device=device, tracker=TRACKER_PATH, classes=[0], verbose=False)
-    res3 = model_cam3.track(frame3, persist=True, device=device, tracker=TRACKER_PATH, classes=[0], verbose=False)
+    # One batched forward pass for all three cameras, then per-camera tracking
+    results = engine.track(frames)
+    res1, res2, res3 = results["CAM_1"], results["CAM_2"], results["CAM_3"]
 
     # Pass the shared_state dictionary to all processing functions
-    viz1 = process_and_translate("CAM_1", frame1.copy(), res1, cam1_polys, cam1_H, shared_state, rescale_to_800=CAM1_RESCALE, counter=cam1_counter)
-    viz2 = process_and_translate("CAM_2", frame2.copy(), res2, cam2_polys, cam2_H, shared_state, rescale_to_800=CAM2_RESCALE, counter=cam2_counter)
-    viz3 = process_and_translate("CAM_3", frame3.copy(), res3, cam3_polys, cam3_H, shared_state, rescale_to_800=CAM3_RESCALE)
+    viz1 = process_and_translate("CAM_1", frame1.copy(), res1, cam1_calib, shared_state, counter=cam1_counter)
+    viz2 = process_and_translate("CAM_2", frame2.copy(), res2, cam2_calib, shared_state, counter=cam2_counter)
+    viz3 = process_and_translate("CAM_3", frame3.copy(), res3, cam3_calib, shared_state)
+
+    now = time.time()
+    if any(BROADCASTS.values()) and now - last_log >= LOG_EVERY:
+        last_log = now
+        per_cam = ", ".join(f"{cam} {n}" for cam, n in BROADCASTS.items())
+        print(f"📡 Frame {frame_count} | {sum(BROADCASTS.values())} tracks ({per_cam}) | Occupancy: {shared_state['count']}")
+    frame_count += 1
 
     viz1_disp = resize_for_display(viz1)
     viz2_disp = resize_for_display(viz2)
@@ -358,8 +252,10 @@ while True:
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-cap1.release()
-cap2.release()
-cap3.release()
+for cap in caps.values():
+    cap.release()
+print(f"📊 Inference: {engine.report()}")
+publisher.stop()
+print(f"📊 Publisher: {publisher.stats}")
 cv2.destroyAllWindows()
 print("Process shut down.")
\ No newline at end of file
@@ -0,0 +1,111 @@
+# mjpeg.py
+# Browser preview for headless trackers: the newest rendered frame as an MJPEG stream.
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = "frame"
+
+
+class MjpegServer:
+    """Serves the newest published frame at http://host:port/ as multipart MJPEG.
+
+    publish() only keeps a reference to the frame. JPEG encoding happens on
+    the HTTP threads, once per frame that is actually sent however many
+    viewers share it, and not at all while nobody is watching. Viewers get
+    at most `max_fps` frames a second. Drawing the frames is the caller's
+    cost: skip it while `clients` is 0.
+    """
+
+    def __init__(self, port=8090, host="0.0.0.0", quality=70, max_fps=10.0):
+        self.address = (host, port)
+        self.quality = quality
+        self.max_fps = max_fps
+        self.clients = 0
+
+        self._frame = None
+        self._seq = 0
+        self._jpeg = None
+        self._jpeg_seq = -1
+        self._cond = threading.Condition()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.end_headers()
+                server._stream(self.wfile)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MjpegServer", daemon=True)
+        self._thread.start()
+        print(f"📺 MJPEG preview on http://{self.address[0]}:{self._server.server_port}/")
+        return self
+
+    def publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _jpeg_for(self, seq, frame):
+        # Encoded outside the lock so publish() never waits on it; shared by all viewers
+        with self._cond:
+            if self._jpeg_seq == seq:
+                return self._jpeg
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        jpeg = buf.tobytes()
+        with self._cond:
+            if seq > self._jpeg_seq:
+                self._jpeg, self._jpeg_seq = jpeg, seq
+        return jpeg
+
+    def _stream(self, wfile):
+        interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        with self._cond:
+            self.clients += 1
+            # Wait for the next frame: the last one may be from before anybody watched
+            seen = self._seq
+        try:
+            while self._server is not None:
+                with self._cond:
+                    while self._seq == seen and self._server is not None:
+                        self._cond.wait(1.0)
+                    if self._server is None:
+                        break
+                    seen, frame = self._seq, self._frame
+                jpeg = self._jpeg_for(seen, frame)
+                if jpeg is None:
+                    continue
+                wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+                wfile.write(jpeg)
+                wfile.write(b"\r\n")
+                if interval:
+                    time.sleep(interval)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
@@ -0,0 +1,115 @@
+# multi_stream.py
+# One shared YOLO model for every camera, with a separate tracker per camera.
+import time
+
+import numpy as np
+import torch
+import yaml
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+
+class MultiStreamTracker:
+    """Runs one model on a batch of frames from N cameras, then tracks each camera on its own.
+
+    Replaces one `YOLO(MODEL)` per camera with `.track(persist=True)` calls
+    in sequence: the weights are loaded once and each step is a single
+    `model.predict()` over all cameras' frames. Every result then goes
+    through that camera's own ByteTrack state, exactly as ultralytics does
+    inside `model.track()` (boxes in, track rows out, result re-indexed
+    and given the track ids). Track ids therefore stay independent per
+    camera, just like with separate models.
+
+    track() takes {cam_id: frame} and returns {cam_id: [result]}, the same
+    list shape `model.track()` returns, so results[0].boxes.id works as
+    before (None when a camera has no confirmed tracks). Cameras whose
+    frame is None are skipped for that step.
+    """
+
+    def __init__(self, model, cameras, tracker="bytetrack.yaml", device=None, classes=(0,), frame_rate=30, **predict_kw):
+        self.model = model
+        self.cameras = list(cameras)
+        # model.track() predicts at conf 0.1 unless told otherwise: ByteTrack's second
+        # association stage (track_low_thresh) needs the low-score boxes
+        predict_kw.setdefault("conf", 0.1)
+        self.predict_kw = dict(device=device, classes=list(classes), verbose=False, **predict_kw)
+
+        with open(check_yaml(tracker), errors="ignore") as f:
+            cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+        if cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"Only 'bytetrack' and 'botsort' are supported, got '{cfg.tracker_type}'")
+        self.trackers = {cam: TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate) for cam in self.cameras}
+
+        self.frames = {cam: 0 for cam in self.cameras}
+        self.batches = 0
+        self.infer_time = 0.0
+        self.track_time = 0.0
+        self._start = None
+
+    def track(self, frames):
+        """Batched inference over {cam_id: frame}, then a per-camera tracker update"""
+        cams = [cam for cam in self.cameras if frames.get(cam) is not None]
+        if not cams:
+            return {}
+        if self._start is None:
+            self._start = time.perf_counter()
+
+        t0 = time.perf_counter()
+        results = self.model.predict([frames[cam] for cam in cams], **self.predict_kw)
+        t1 = time.perf_counter()
+
+        out = {}
+        for cam, result in zip(cams, results):
+            out[cam] = [self._update(self.trackers[cam], result)]
+            self.frames[cam] += 1
+        self.track_time += time.perf_counter() - t1
+        self.infer_time += t1 - t0
+        self.batches += 1
+        return out
+
+    def reset(self, cam=None):
+        """Forget track ids, e.g. after a camera reconnects"""
+        for c in ([cam] if cam is not None else self.cameras):
+            self.trackers[c].reset()
+
+    @staticmethod
+    def _update(tracker, result):
+        det = result.boxes.cpu().numpy()
+        tracks = tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+
+    def fps(self):
+        """Per-camera and aggregate frames per second since the first batch"""
+        elapsed = time.perf_counter() - self._start if self._start else 0.0
+        if elapsed <= 0:
+            return {cam: 0.0 for cam in self.cameras} | {"total": 0.0}
+        per_cam = {cam: n / elapsed for cam, n in self.frames.items()}
+        per_cam["total"] = sum(self.frames.values()) / elapsed
+        return per_cam
+
+    def report(self):
+        fps = self.fps()
+        cams = " | ".join(f"{cam} {fps[cam]:.1f}" for cam in self.cameras)
+        per_batch = 1000 * self.infer_time / self.batches if self.batches else 0.0
+        return f"{cams} | total {fps['total']:.1f} FPS | {per_batch:.0f} ms/batch inference"
+
+
+def frames_from(caps):
+    """Reads one frame from every {cam_id: cap}; None for cameras that failed"""
+    frames = {}
+    for cam, cap in caps.items():
+        ok, frame = cap.read()
+        frames[cam] = frame if ok else None
+    return frames
+
+
+def synthetic_frames(cameras, size=(1080, 1920), seed=0):
+    """Stand-in frames for benchmarking when the recorded clips are not around"""
+    rng = np.random.default_rng(seed)
+    return {cam: rng.integers(0, 255, (*size, 3), dtype=np.uint8) for cam in cameras}
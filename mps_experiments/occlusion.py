@@ -0,0 +1,52 @@
+# occlusion.py
+# Per-frame occlusion flags for the live trackers.
+import numpy as np
+
+
+def occlusion_flags(boxes, ids, feet, in_region):
+    """Which detections have their foot inside another in-region person's box.
+
+    boxes: (N, 4) xyxy, ids: (N,) track ids, feet: (N, 2) foot points,
+    in_region: (N,) bools from the region raster. Same rule as the old
+    all-pairs loop in live_tracker.py (int-truncated boxes, inclusive edges,
+    a track never occludes itself, both people must be in a region), but
+    as a sort-and-sweep query: boxes are sorted by x1 once, and each foot
+    only checks boxes whose x1 lies in [foot_x - widest box, foot_x],
+    found with searchsorted. O(n log n + candidate pairs) instead of n²
+    Python iterations.
+    """
+    n = len(boxes)
+    flags = np.zeros(n, dtype=bool)
+    in_region = np.asarray(in_region, dtype=bool)
+    people = np.flatnonzero(in_region)
+    if len(people) < 2:
+        return flags
+
+    b = np.asarray(boxes).reshape(-1, 4).astype(np.int64)
+    feet = np.asarray(feet).reshape(-1, 2)
+    ids = np.asarray(ids).astype(np.int64)
+
+    order = people[np.argsort(b[people, 0], kind='stable')]
+    sorted_x1 = b[order, 0]
+    widest = int((b[order, 2] - b[order, 0]).max())
+
+    fx = feet[people, 0]
+    lo = np.searchsorted(sorted_x1, fx - widest, side='left')
+    hi = np.searchsorted(sorted_x1, fx, side='right')
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return flags
+
+    # Expand every foot's [lo, hi) window into (foot, box) candidate pairs
+    who = np.repeat(people, counts)
+    starts = np.repeat(lo, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    other = order[starts + offsets]
+
+    px, py = feet[who, 0], feet[who, 1]
+    hit = ((b[other, 0] <= px) & (px <= b[other, 2])
+           & (b[other, 1] <= py) & (py <= b[other, 3])
+           & (ids[who] != ids[other]))
+    flags[who[hit]] = True
+    return flags
@@ -0,0 +1,201 @@
+# pipeline.py
+# Bounded-queue stage pipeline (capture -> inference -> ... -> sink) for the live tracker.
+import queue
+import threading
+import time
+import traceback
+from bisect import bisect_left
+
+_DONE = object()
+
+
+class LatencyHistogram:
+    """Latencies counted in fixed, roughly log-spaced millisecond buckets.
+
+    Written by one thread (the stage that owns it); reading it from another
+    thread for a report is approximate but safe enough for a log line.
+    Percentiles are bucket upper bounds, i.e. "p95 <= 30 ms".
+    """
+
+    BOUNDS_MS = (1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.n += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        if not self.n:
+            return 0.0
+        target = p / 100.0 * self.n
+        seen = 0
+        for bound, c in zip(self.BOUNDS_MS, self.counts):
+            seen += c
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.n:
+            return "n=0"
+        return (f"n={self.n} mean={self.total / self.n:.1f} p50<={self.percentile(50):.1f} "
+                f"p95<={self.percentile(95):.1f} p99<={self.percentile(99):.1f} max={self.max:.1f} ms")
+
+
+class Pipeline:
+    """Runs `source` and each stage on its own thread, joined by bounded queues.
+
+    source() returns the next item, or None when the input has ended.
+    stages is a list of (name, fn) where fn(item) returns the item for the
+    next stage, or None to drop it. Iterating the pipeline yields finished
+    items on the caller's thread, so the last stage (drawing, imshow)
+    stays on the main thread as cv2 requires.
+
+    Every queue holds at most `maxsize` items and puts block when it is
+    full, so a slow stage holds back the ones before it instead of letting
+    work pile up; throughput is set by the slowest stage, not the sum of
+    all of them. The source only reads once the first queue has room, so
+    the frame it hands on is never older than it needs to be.
+
+    Per-stage service times, the caller's time per item ("sink") and the
+    capture-to-done latency ("end_to_end") go into LatencyHistograms.
+    """
+
+    def __init__(self, source, stages, maxsize=2, source_name="capture"):
+        self.source = source
+        self.source_name = source_name
+        self.stages = list(stages)
+        self.maxsize = maxsize
+
+        self.queues = [queue.Queue(maxsize) for _ in range(len(self.stages) + 1)]
+        self.histograms = {name: LatencyHistogram() for name in [source_name] + [n for n, _ in self.stages]}
+        self.histograms["sink"] = LatencyHistogram()
+        self.histograms["end_to_end"] = LatencyHistogram()
+        self.delivered = 0
+        self.error = None
+
+        self._slots = threading.Semaphore(maxsize)
+        self._stop = threading.Event()
+        self._threads = []
+        self._start = None
+
+    def start(self):
+        if not self._threads:
+            self._start = time.perf_counter()
+            self._threads.append(threading.Thread(target=self._run_source, name=self.source_name, daemon=True))
+            for i, (name, fn) in enumerate(self.stages):
+                self._threads.append(threading.Thread(target=self._run_stage, args=(i, name, fn), name=name, daemon=True))
+            for t in self._threads:
+                t.start()
+        return self
+
+    def __iter__(self):
+        out = self.queues[-1]
+        while True:
+            entry = self._get(out)
+            if entry is None or entry is _DONE:
+                break
+            t_captured, item = entry
+            t0 = time.perf_counter()
+            yield item
+            now = time.perf_counter()
+            self.histograms["sink"].add((now - t0) * 1000)
+            self.histograms["end_to_end"].add((now - t_captured) * 1000)
+            self.delivered += 1
+        if self.error is not None:
+            raise self.error
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for q in self.queues:
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+        self._slots.release()
+        for t in self._threads:
+            t.join(timeout)
+
+    def fps(self):
+        elapsed = time.perf_counter() - self._start if self._start else 0.0
+        return self.delivered / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        depths = " ".join(f"{q.qsize()}/{self.maxsize}" for q in self.queues)
+        lines = [f"{self.fps():.1f} FPS out | queue depths {depths}"]
+        lines += [f"  {name:<12} {h.summary()}" for name, h in self.histograms.items()]
+        return "\n".join(lines)
+
+    # ---- threads ----
+
+    def _put(self, q, entry):
+        while not self._stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _fail(self, name, e):
+        print(f"❌ Pipeline stage '{name}' failed: {e}")
+        traceback.print_exc()
+        self.error = e
+        self._stop.set()
+
+    def _run_source(self):
+        first = self.queues[0]
+        hist = self.histograms[self.source_name]
+        try:
+            while not self._stop.is_set():
+                self._slots.acquire()
+                if self._stop.is_set():
+                    break
+                t0 = time.perf_counter()
+                item = self.source()
+                if item is None:
+                    break
+                now = time.perf_counter()
+                hist.add((now - t0) * 1000)
+                if not self._put(first, (now, item)):
+                    break
+        except Exception as e:
+            self._fail(self.source_name, e)
+        self._put(first, _DONE)
+
+    def _run_stage(self, i, name, fn):
+        inbox, outbox = self.queues[i], self.queues[i + 1]
+        hist = self.histograms[name]
+        while True:
+            entry = self._get(inbox)
+            if i == 0 and entry is not None:
+                self._slots.release()
+            if entry is None or entry is _DONE:
+                break
+            t_captured, item = entry
+            t0 = time.perf_counter()
+            try:
+                item = fn(item)
+            except Exception as e:
+                self._fail(name, e)
+                break
+            hist.add((time.perf_counter() - t0) * 1000)
+            if item is not None and not self._put(outbox, (t_captured, item)):
+                return
+        self._put(outbox, _DONE)
@@ -0,0 +1,92 @@
+# publisher.py
+# One long-lived Redis publisher thread for the live trackers.
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import redis
+
+
+class Publisher:
+    """Publishes tracker payloads from a single background thread.
+
+    submit() never touches the network: it stores the payload under a key
+    (the channel by default, or e.g. (camera, track id) for per-detection
+    messages) and returns. If an unsent payload with the same key is still
+    waiting, the new one replaces it, so a slow Redis only ever sees the
+    latest state instead of a growing backlog. At most `max_pending` keys
+    wait at once; beyond that the least recently updated one is dropped.
+    The worker encodes whatever is pending and sends it through the
+    TrackingBus in one pipeline, oldest update first.
+    """
+
+    def __init__(self, bus, encode=json.dumps, max_pending=256, log_every=5.0):
+        self.bus = bus
+        self.encode = encode
+        self.max_pending = max_pending
+        self.log_every = log_every
+
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._last_error_log = 0.0
+        self.stats = {'queued': 0, 'sent': 0, 'coalesced': 0, 'dropped': 0, 'errors': 0, 'batches': 0}
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="Publisher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, channel, payload, key=None):
+        """Queues one payload; returns immediately"""
+        key = (channel, key)
+        with self._cond:
+            self.stats['queued'] += 1
+            if key in self._pending:
+                # Newer state for the same key replaces the unsent one
+                self.stats['coalesced'] += 1
+                self._pending.move_to_end(key)
+            elif len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.stats['dropped'] += 1
+            self._pending[key] = payload
+            self._cond.notify()
+
+    def stop(self, timeout=2.0):
+        """Sends what is still pending, then stops the worker"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, OrderedDict()
+            self._send(batch)
+
+    def _send(self, batch):
+        try:
+            pipe = self.bus.redis.pipeline(transaction=False)
+            for (channel, _), payload in batch.items():
+                self.bus.publish(channel, self.encode(payload), pipe=pipe)
+            pipe.execute()
+            self.stats['sent'] += len(batch)
+            self.stats['batches'] += 1
+        except (redis.RedisError, OSError) as e:
+            self.stats['errors'] += 1
+            self.stats['dropped'] += len(batch)
+            now = time.monotonic()
+            if now - self._last_error_log >= self.log_every:
+                self._last_error_log = now
+                print(f"❌ Redis publish failed ({len(batch)} messages dropped): {e}")
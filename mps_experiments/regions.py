@@ -0,0 +1,127 @@
+# regions.py
+# Calibration-time lookup tables and batched point mapping shared by the live trackers.
+import numpy as np
+
+
+def _polygon_mask(poly, xs, ys):
+    """Exact inside-or-on-edge mask of an int polygon over a pixel grid.
+
+    Same answer as cv2.pointPolygonTest(poly, (x, y), False) >= 0 for integer
+    pixels: even-odd crossings plus an explicit on-edge test, all in int64.
+    xs is a (1, W) row of x coordinates, ys a (H, 1) column of y coordinates.
+    """
+    inside = np.zeros((ys.shape[0], xs.shape[1]), dtype=bool)
+    on_edge = np.zeros_like(inside)
+    n = len(poly)
+    for i in range(n):
+        x1, y1 = (int(v) for v in poly[i])
+        x2, y2 = (int(v) for v in poly[(i + 1) % n])
+        cross = (xs - x1) * (y2 - y1) - (ys - y1) * (x2 - x1)
+        on_edge |= ((cross == 0)
+                    & (xs >= min(x1, x2)) & (xs <= max(x1, x2))
+                    & (ys >= min(y1, y2)) & (ys <= max(y1, y2)))
+        if y1 == y2:
+            continue
+        spans = (ys >= min(y1, y2)) & (ys < max(y1, y2))
+        right = cross < 0 if y2 > y1 else cross > 0
+        inside ^= spans & right
+    return inside | on_edge
+
+
+class LabelRaster:
+    """uint8 image mapping every pixel to the first polygon that contains it.
+
+    Built once from a calibration's polygons (dict order = priority, like the
+    old `for name, poly in REGIONS_IMG.items(): ... break` loops), so the
+    region of every foot point in a frame is one fancy-index instead of a
+    pointPolygonTest per polygon per detection. Pixel value 0 means no
+    polygon, i + 1 means names[i]. Polygons are truncated to int32 exactly
+    as point_in_polygon() did, so integer points get identical answers.
+    """
+
+    NONE = -1
+
+    def __init__(self, polygons, size, pad=2):
+        self.names = list(polygons)
+        if len(self.names) > 254:
+            raise ValueError("a uint8 label raster holds at most 254 polygons")
+        w, h = int(size[0]), int(size[1])
+        self.size = (w, h)
+        # A little slack so feet on the last row/column (y2 == frame height) still land inside
+        self.labels = np.zeros((h + pad, w + pad), dtype=np.uint8)
+
+        # Lowest priority first so earlier polygons overwrite later ones
+        for idx in range(len(self.names) - 1, -1, -1):
+            poly = np.asarray(polygons[self.names[idx]]).reshape(-1, 2).astype(np.int32)
+            x0, y0 = max(poly[:, 0].min(), 0), max(poly[:, 1].min(), 0)
+            x1 = min(poly[:, 0].max(), self.labels.shape[1] - 1)
+            y1 = min(poly[:, 1].max(), self.labels.shape[0] - 1)
+            if x1 < x0 or y1 < y0:
+                continue
+            xs = np.arange(x0, x1 + 1, dtype=np.int64)[None, :]
+            ys = np.arange(y0, y1 + 1, dtype=np.int64)[:, None]
+            mask = _polygon_mask(poly, xs, ys)
+            self.labels[y0:y1 + 1, x0:x1 + 1][mask] = idx + 1
+
+    @classmethod
+    def from_labels(cls, names, labels, size):
+        """A raster around labels built earlier (e.g. a compiled calibration's), no rasterizing"""
+        raster = cls.__new__(cls)
+        raster.names = list(names)
+        raster.size = (int(size[0]), int(size[1]))
+        raster.labels = labels
+        return raster
+
+    def lookup(self, points):
+        """(N, 2) pixel points -> (N,) polygon indexes, NONE where no polygon"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        xs = np.rint(pts[:, 0]).astype(np.intp)
+        ys = np.rint(pts[:, 1]).astype(np.intp)
+        h, w = self.labels.shape
+        valid = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        out = np.full(len(pts), self.NONE, dtype=np.intp)
+        out[valid] = self.labels[ys[valid], xs[valid]].astype(np.intp) - 1
+        return out
+
+    def names_for(self, points):
+        """(N, 2) pixel points -> list of polygon names (None where no polygon)"""
+        return [self.names[i] if i >= 0 else None for i in self.lookup(points).tolist()]
+
+    def name_at(self, point):
+        x, y = int(round(point[0])), int(round(point[1]))
+        h, w = self.labels.shape
+        if 0 <= x < w and 0 <= y < h and self.labels[y, x]:
+            return self.names[self.labels[y, x] - 1]
+        return None
+
+
+def stack_homographies(names, homographies, extra=()):
+    """Homographies in LabelRaster.names order (plus any extra ones) as one (R, 3, 3) array"""
+    return np.stack([np.asarray(homographies[n], dtype=np.float64) for n in names]
+                    + [np.asarray(H, dtype=np.float64) for H in extra])
+
+
+def map_points(points, h_idx, h_stack):
+    """Applies each point's homography to a whole frame of points in one pass.
+
+    points: (N, 2) pixel coordinates, h_idx: (N,) index into h_stack (usually
+    the LabelRaster region index, negative = no region), h_stack: (R, 3, 3).
+    Returns (N, 2) float world coordinates, NaN where h_idx < 0. Same maths
+    as cv2.perspectiveTransform, without a call per point.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    h_idx = np.asarray(h_idx)
+    world = np.full((len(pts), 2), np.nan)
+    valid = h_idx >= 0
+    if not valid.any():
+        return world
+    H = h_stack[h_idx[valid]]
+    x, y = pts[valid, 0], pts[valid, 1]
+    w = H[:, 2, 0] * x + H[:, 2, 1] * y + H[:, 2, 2]
+    # perspectiveTransform maps points at infinity to 0 instead of dividing by ~0
+    scale = np.zeros_like(w)
+    finite = np.abs(w) > np.finfo(np.float64).eps
+    scale[finite] = 1.0 / w[finite]
+    world[valid, 0] = (H[:, 0, 0] * x + H[:, 0, 1] * y + H[:, 0, 2]) * scale
+    world[valid, 1] = (H[:, 1, 0] * x + H[:, 1, 1] * y + H[:, 1, 2]) * scale
+    return world
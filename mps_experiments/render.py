@@ -0,0 +1,137 @@
+# render.py
+# Drawing for the live trackers' preview windows, kept off the headless hot path.
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def region_ops(regions, color=(255, 0, 0), thickness=2, font_scale=0.6, text_thickness=2, label_dx=0):
+    """Outline + centred name for every {name: polygon}, as StaticOverlay ops"""
+    ops = []
+    for name, poly in regions.items():
+        ops.append(("polyline", poly, color, thickness))
+        cx, cy = np.mean(poly, axis=0).astype(int)
+        ops.append(("text", name, (int(cx) + label_dx, int(cy)), color, font_scale, text_thickness))
+    return ops
+
+
+def _scaled(pts, sx, sy):
+    # Truncated like the poly.astype(np.int32) the scripts draw with
+    return (np.asarray(pts, dtype=np.float64).reshape(-1, 2) * (sx, sy)).astype(np.int32)
+
+
+def _draw_op(canvas, op, sx, sy, color=None):
+    kind = op[0]
+    if kind == "polyline":
+        _, pts, c, thickness = op
+        cv2.polylines(canvas, [_scaled(pts, sx, sy)], True, color or c, thickness)
+    elif kind == "fill":
+        _, pts, c = op
+        cv2.fillPoly(canvas, [_scaled(pts, sx, sy)], color or c)
+    elif kind == "line":
+        _, a, b, c, thickness = op
+        (a, b) = _scaled((a, b), sx, sy)
+        cv2.line(canvas, tuple(map(int, a)), tuple(map(int, b)), color or c, thickness)
+    elif kind == "text":
+        _, text, org, c, scale, thickness = op
+        (org,) = _scaled((org,), sx, sy)
+        cv2.putText(canvas, text, tuple(map(int, org)), FONT, scale, color or c, thickness)
+    else:
+        raise ValueError(f"Unknown overlay op '{kind}'")
+
+
+class StaticOverlay:
+    """Calibration geometry (regions, door lines, zones) rendered once, blended per frame.
+
+    layers is a list of (alpha, ops); each op is one of
+        ("polyline", pts, color, thickness)   ("fill", pts, color)
+        ("line", a, b, color, thickness)      ("text", str, org, color, scale, thickness)
+    in pixel coordinates of `base_size` (w, h). Layers stack in order, each
+    painted as a whole and laid over the ones below with its alpha, which is
+    what drawing them on the frame and addWeighted-ing an overlay copy did.
+
+    The first frame of a given size renders everything into a BGRA layer
+    (premultiplied colour + alpha) and crops it to the box that has any
+    coverage; a frame of another size rebuilds it with the geometry scaled.
+    After that every frame costs one multiply and one add over that box,
+    however many polygons and labels the calibration has.
+    """
+
+    def __init__(self, layers, base_size=None):
+        self.layers = [(float(alpha), list(ops)) for alpha, ops in layers]
+        self.base_size = base_size
+        self.bgra = None
+        self._size = None
+        self._roi = None
+
+    def build(self, size):
+        """Renders the layers for a (w, h) frame"""
+        w, h = size
+        bw, bh = self.base_size or size
+        sx, sy = w / bw, h / bh
+
+        color = np.zeros((h, w, 3), dtype=np.float32)
+        alpha = np.zeros((h, w), dtype=np.float32)
+        for a, ops in self.layers:
+            paint = np.zeros((h, w, 3), dtype=np.uint8)
+            mask = np.zeros((h, w), dtype=np.uint8)
+            for op in ops:
+                _draw_op(paint, op, sx, sy)
+                _draw_op(mask, op, sx, sy, color=255)
+            # Mask values are coverage (text is antialiased), and paint drawn on
+            # black is already colour * coverage, i.e. premultiplied
+            m = mask > 0
+            cover = a * mask[m].astype(np.float32)[:, None] / 255.0
+            color[m] = a * paint[m] + (1 - cover) * color[m]
+            alpha[m] = cover[:, 0] + (1 - cover[:, 0]) * alpha[m]
+
+        # `color` is already premultiplied: it started at zero and every layer went over it
+        self.bgra = np.dstack((np.rint(color), np.rint(alpha * 255))).astype(np.uint8)
+        self._size = size
+
+        ys, xs = np.nonzero(self.bgra[..., 3])
+        if len(ys) == 0:
+            self._roi = None
+            return self
+        y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+        crop = self.bgra[y0:y1, x0:x1]
+        self._roi = (slice(y0, y1), slice(x0, x1), cv2.merge([255 - crop[..., 3]] * 3), crop[..., :3].copy())
+        return self
+
+    def composite(self, frame):
+        """Blends the cached layer onto `frame` in place"""
+        h, w = frame.shape[:2]
+        if self._size != (w, h):
+            self.build((w, h))
+        if self._roi is not None:
+            ys, xs, inv_alpha, premul = self._roi
+            roi = frame[ys, xs]
+            cv2.multiply(roi, inv_alpha, dst=roi, scale=1 / 255.0)
+            cv2.add(roi, premul, dst=roi)
+        return frame
+
+
+def draw_scene(frame, overlay, draws, hud):
+    """Draws the live tracker view onto `frame` in place and returns it.
+
+    overlay: StaticOverlay with the regions, door lines and zones.
+    draws: [((x1, y1, x2, y2), foot, color, label)] per tracked person,
+    label may be None. hud: fps, inference, latency (ms) and count.
+    People and the HUD are drawn over the static layer.
+    """
+    overlay.composite(frame)
+
+    for (x1, y1, x2, y2), foot, color, label in draws:
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.circle(frame, foot, 4, (0, 255, 255), -1)
+        if label is not None:
+            cv2.putText(frame, label, (x1, y1 - 10), FONT, 1.5, color, 2)
+
+    # Black background rectangle so the HUD text is readable
+    cv2.rectangle(frame, (10, 10), (450, 100), (0, 0, 0), -1)
+    cv2.putText(frame, f"FPS: {hud['fps']:.1f}", (20, 40), FONT, 0.8, (0, 255, 0), 2)
+    cv2.putText(frame, f"Inference: {hud['inference']:.1f}ms", (180, 40), FONT, 0.8, (0, 255, 255), 2)
+    cv2.putText(frame, f"Total Latency: {hud['latency']:.1f}ms", (20, 80), FONT, 0.8, (0, 165, 255), 2)
+    cv2.putText(frame, f"People Inside: {hud['count']}", (50, 70), FONT, 1.5, (0, 0, 255), 4)
+    return frame
@@ -0,0 +1,197 @@
+# replay.py
+# Offline replay of recorded tracks through the translation trackers' stages -
+# foot points, region raster + world mapping, occlusion, door counting - with
+# no model and no video, as fast as the CPU goes. The enter/exit events are
+# diffed against the people-count logs recorded for the same footage
+# (Frame,Count per frame, Count = that frame's +enter/-exit), so a counting
+# change can be benchmarked and regression-tested on any box.
+#
+# Track CSVs: frame, track_id, x1, y1, x2, y2 (+ camera when several cameras
+# share a file, as in combined_frames.csv). By default the sync_angle clips'
+# cam1/cam2 tracks are checked against the 15 min count logs, whose first
+# frames are the same footage.
+#
+#   python replay.py
+#   python replay.py --tolerance 30 --min-f1 0.6          # fails (exit 1) below 0.6
+#   python replay.py --camera CAM_1 --tracks ../csv_files/temp_files/tracks_output_cam1_allframes.csv \
+#                    --truth ../csv_files/temp_files_30mins/cam1_people_count_log_1hr.csv
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from occlusion import occlusion_flags
+from door_counter import DoorCounter
+from sync_cameras import TRACK_TTL, CAMERA_DOORS, FRAME_SIZE, load_camera, foot_points, map_feet
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_DIR = os.path.join(BASE_DIR, '..', 'csv_files')
+RECORDED = os.path.join(CSV_DIR, 'files', 'combined_frames.csv')
+DEFAULT_RUNS = {
+    "CAM_1": (RECORDED, os.path.join(CSV_DIR, 'temp_files_15min', 'cam1_people_count_log_15min.csv')),
+    "CAM_2": (RECORDED, os.path.join(CSV_DIR, 'temp_files_15min', 'cam2_people_count_log_15min.csv')),
+}
+FPS = 30.0
+
+
+def load_tracks(path, cam_id):
+    """Track CSV -> (frames, ids, boxes) of one camera, sorted by frame"""
+    df = pd.read_csv(path)
+    if 'camera' in df.columns:
+        df = df[df['camera'] == cam_id.replace('CAM_', 'cam')]
+    if df.empty:
+        raise ValueError(f"No {cam_id} tracks in {path}")
+    df = df.sort_values('frame', kind='stable')
+    return (df['frame'].to_numpy(dtype=np.int64), df['track_id'].to_numpy(dtype=np.int64),
+            df[['x1', 'y1', 'x2', 'y2']].to_numpy(dtype=np.float64))
+
+
+def load_truth(path):
+    """people_count_log CSV -> [(frame, +1 / -1)], one entry per person"""
+    df = pd.read_csv(path)
+    df = df[df['Count'] != 0]
+    events = []
+    for frame, count in zip(df['Frame'].astype(int), df['Count'].astype(int)):
+        events.extend([(frame, 1 if count > 0 else -1)] * abs(count))
+    return events
+
+
+class Replay:
+    """One camera's stages, fed straight from recorded detections"""
+
+    def __init__(self, cam_id, calib=None, size=FRAME_SIZE, ttl=TRACK_TTL):
+        self.cam_id = cam_id
+        self.size = size
+        self.calib = calib
+        self.counter = DoorCounter(CAMERA_DOORS.get(cam_id, []), once=True, ttl=ttl)
+        self.events = []
+        self.stats = {'frames': 0, 'detections': 0, 'in_region': 0, 'occluded': 0}
+
+    def geometry(self, frames, ids, boxes):
+        """Foot points, regions, world points and occlusion of every detection
+        of the recording in one pass - none of it depends on earlier frames.
+        Returns the feet in the doors' (FRAME_SIZE) pixels."""
+        feet = foot_points(boxes)
+        self.stats['detections'] += len(ids)
+        if self.calib is None:
+            return feet
+        view = self.calib.at(self.size)
+        region_idx = view.raster.lookup(feet)
+        map_feet(self.cam_id, view, boxes, feet, region_idx)
+        in_region = region_idx >= 0
+
+        # Occlusion only pairs people of the same frame: every frame is moved
+        # `span` px further right than the one before, so one sweep over the
+        # whole recording never matches across frames. The boxes are truncated
+        # first, as occlusion_flags does, so the shift is exact.
+        b = boxes.astype(np.int64)
+        span = int(b[:, 2].max()) + 1
+        shift = (frames - frames[0]) * span
+        b[:, 0] += shift
+        b[:, 2] += shift
+        shifted_feet = feet + np.column_stack((shift, np.zeros_like(shift)))
+        occluded = occlusion_flags(b, ids, shifted_feet, in_region)
+        self.stats['in_region'] += int(in_region.sum())
+        self.stats['occluded'] += int(occluded.sum())
+        return view.to_source(feet)
+
+    def run(self, frames, ids, boxes):
+        """Every frame from the first to the last, empty ones included (they
+        age the tracks); counting keeps per-track state, so it goes frame by
+        frame as in the live loop"""
+        feet = self.geometry(frames, ids, boxes)
+        first, last = int(frames[0]), int(frames[-1])
+        bounds = np.searchsorted(frames, np.arange(first, last + 2))
+        for frame_idx in range(first, last + 1):
+            s, e = bounds[frame_idx - first], bounds[frame_idx - first + 1]
+            events = self.counter.update(frame_idx, ids[s:e], feet[s:e])
+            self.events.extend((frame_idx, tid, door, direction) for tid, door, direction in events)
+        self.stats['frames'] += last - first + 1
+        return self
+
+
+def diff_events(replayed, truth, tolerance):
+    """Matches each true event to the nearest unmatched replayed one of the same
+    direction within `tolerance` frames. Returns (offsets of the matches,
+    missed true events, extra replayed events)."""
+    free = sorted(replayed)
+    offsets, missed = [], []
+    for frame, direction in sorted(truth):
+        best = None
+        for i, (f, d) in enumerate(free):
+            if d == direction and abs(f - frame) <= tolerance and (best is None or abs(f - frame) < abs(free[best][0] - frame)):
+                best = i
+        if best is None:
+            missed.append((frame, direction))
+        else:
+            offsets.append(free.pop(best)[0] - frame)
+    return offsets, missed, free
+
+
+def report(cam_id, replay, truth, first, last, tolerance, elapsed):
+    replayed = [(frame, direction) for frame, _, _, direction in replay.events]
+    truth = [(f, d) for f, d in truth if first <= f <= last]
+    offsets, missed, extra = diff_events(replayed, truth, tolerance)
+    precision = len(offsets) / len(replayed) if replayed else 1.0
+    recall = len(offsets) / len(truth) if truth else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    net_error = sum(d for _, d in replayed) - sum(d for _, d in truth)
+    frames = replay.stats['frames']
+
+    enters = lambda events: sum(1 for _, d in events if d > 0)
+    print(f"🎞️  {cam_id}: frames {first}-{last}, {replay.stats['detections']} detections "
+          f"({replay.stats['in_region']} in regions, {replay.stats['occluded']} occluded)")
+    print(f"   replayed {len(replayed)} events ({enters(replayed)} enter / {len(replayed) - enters(replayed)} exit), "
+          f"log {len(truth)} ({enters(truth)} enter / {len(truth) - enters(truth)} exit)")
+    print(f"   matched {len(offsets)} within ±{tolerance} frames (mean |offset| "
+          f"{np.mean(np.abs(offsets)) if offsets else 0:.1f}), missed {len(missed)}, extra {len(extra)}")
+    print(f"   precision {precision:.2f}  recall {recall:.2f}  F1 {f1:.2f}  net count error {net_error:+d}")
+    if missed:
+        print(f"   missed: {missed}")
+    if extra:
+        print(f"   extra:  {extra}")
+    print(f"   ⏱️  {frames} frames in {elapsed * 1e3:.1f} ms = {frames / elapsed:,.0f} FPS, "
+          f"1 h of {FPS:g} FPS footage in {3600 * FPS / (frames / elapsed):.1f} s")
+    return f1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded tracks through geometry, occlusion and counting")
+    parser.add_argument('--camera', choices=sorted(DEFAULT_RUNS) + ['CAM_3'], help="one camera (default: CAM_1 and CAM_2)")
+    parser.add_argument('--tracks', help="track CSV (default: the sync_angle clips' combined_frames.csv)")
+    parser.add_argument('--truth', help="people_count_log CSV to diff against")
+    parser.add_argument('--calib', help="calibration npz, compiled on first use (default: homo_maps/camN_calib.npz)")
+    parser.add_argument('--tolerance', type=int, default=60, help="frames a replayed event may be off the log")
+    parser.add_argument('--ttl', type=int, default=TRACK_TTL)
+    parser.add_argument('--repeat', type=int, default=1, help="replay each camera N times, for timing")
+    parser.add_argument('--min-f1', type=float, default=None, help="exit 1 if any camera scores below this")
+    args = parser.parse_args()
+
+    cameras = [args.camera] if args.camera else sorted(DEFAULT_RUNS)
+    failed = False
+    for cam_id in cameras:
+        default_tracks, default_truth = DEFAULT_RUNS.get(cam_id, (RECORDED, None))
+        tracks = args.tracks or default_tracks
+        truth_path = args.truth if args.truth or args.camera else default_truth
+        calib = load_camera(cam_id, source=args.calib)
+
+        frames, ids, boxes = load_tracks(tracks, cam_id)
+        first, last = int(frames[0]), int(frames[-1])
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            replay = Replay(cam_id, calib, ttl=args.ttl).run(frames, ids, boxes)
+        elapsed = (time.perf_counter() - start) / args.repeat
+
+        truth = load_truth(truth_path) if truth_path else []
+        f1 = report(cam_id, replay, truth, first, last, args.tolerance, elapsed)
+        if args.min_f1 is not None and truth_path and f1 < args.min_f1:
+            print(f"❌ {cam_id} F1 {f1:.2f} is below {args.min_f1:.2f}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# sync_cameras.py
+# Calibration, foot-point geometry and counting doors of the three sync_angle
+# cameras, shared by live_translation*.py and the offline replay (replay.py).
+# Calibrations load from compiled artifacts (calibration.py), rebuilt
+# automatically when their npz changes.
+import os
+
+import numpy as np
+
+from door_counter import Door
+from regions import map_points
+from calibration import read_npz, compile_calibration, load_or_compile
+
+# Frames a lost track keeps its line state: the tracker's track_buffer, so a
+# revived id is not counted again
+TRACK_TTL = 1200
+
+# Counting doors per camera (see door_counter.Door); a new door or camera is a new entry.
+# CAM_1: crossing the door line counts, moving toward the inside line is an enter.
+# CAM_2: crossing a door's second line counts; Door 1 counts an exit if its first
+# line was crossed before (an enter otherwise), Door 2 the other way round.
+CAMERA_DOORS = {
+    "CAM_1": [
+        Door("CAM 1", [((163, 967), (12, 491)), ((130, 778), (174, 903))], rule="toward"),
+    ],
+    "CAM_2": [
+        Door("CAM 2 Door 1", [((1802, 720), (2011, 704)), ((1855, 694), (1984, 686))],
+             rule="gate", direction=-1, margin=20, axes="x"),
+        Door("CAM 2 Door 2", [((909, 272), (1019, 268)), ((909, 278), (1026, 280))], rule="gate"),
+    ],
+}
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pixel space the calibrations and doors are drawn in: the cameras' 2560x1440
+# main stream. Other stream sizes are scaled from it (Calibration.at).
+FRAME_SIZE = (2560, 1440)
+CALIBRATION_SOURCES = {
+    "CAM_1": os.path.join(BASE_DIR, "homo_maps", "cam1_calib.npz"),
+    "CAM_2": os.path.join(BASE_DIR, "homo_maps", "cam2_calib.npz"),
+    "CAM_3": os.path.join(BASE_DIR, "homo_maps", "cam3_calib.npz"),
+}
+
+# --- Half-person matrices (pixel points -> world points), fitted by the calibration build ---
+IBAD_DESK_GAP_REAL = np.array([(151*3.2, 248*3.2), (166*3.2, 263*3.2), (356*3.2, 188*3.2), (320*3.2, 182*3.2)], dtype=np.float32)
+IBAD_DESK_GAP_IMG = np.array([(-1.5, 7.5), (-3.5, 7.5), (-3.5, 4.5), (-1.5, 4.5)], dtype=np.float32)
+
+USHNA_TABLE_SIDE_REAL = np.array([(782, 497), (797, 553), (606, 544), (597, 490)], dtype=np.float32)
+USHNA_TABLE_SIDE_IMG = np.array([(3.25, 2), (3.25, 3), (7.75, 3), (7.75, 2)], dtype=np.float32)
+
+HALF_PERSON_POINTS = {
+    "CAM_1": {"IBAD": (IBAD_DESK_GAP_REAL, IBAD_DESK_GAP_IMG), "USHNA": (USHNA_TABLE_SIDE_REAL, USHNA_TABLE_SIDE_IMG)},
+}
+
+
+def artifact_path(source):
+    """homo_maps/cam1_calib.npz -> homo_maps/cam1_calib.calib"""
+    return os.path.splitext(source)[0] + ".calib"
+
+
+def _inputs(cam_id, source=None):
+    source = source or CALIBRATION_SOURCES[cam_id]
+    polygons, homographies = read_npz(source)
+    return source, dict(polygons=polygons, source_size=FRAME_SIZE, homographies=homographies,
+                        extra_points=HALF_PERSON_POINTS.get(cam_id), camera=cam_id)
+
+
+def compile_camera(cam_id, sizes=(), source=None):
+    """Builds a camera's calibration artifact; returns (header, path)"""
+    source, inputs = _inputs(cam_id, source)
+    path = artifact_path(source)
+    return compile_calibration(path, sizes=sizes, **inputs), path
+
+
+def load_camera(cam_id, sizes=(), source=None):
+    """A camera's compiled Calibration, (re)built first if its npz changed"""
+    source, inputs = _inputs(cam_id, source)
+    return load_or_compile(artifact_path(source), sizes=sizes, **inputs)
+
+
+def foot_points(boxes):
+    """(N, 4) xyxy boxes -> (N, 2) foot points, same rounding as the per-box code"""
+    b = boxes.astype(np.int32)
+    return np.column_stack(((b[:, 0] + b[:, 2]) / 2.0, b[:, 3]))
+
+
+def map_feet(cam_id, view, boxes, feet, region_idx):
+    """World coordinates of every foot in the frame in one pass (NaN outside the regions).
+
+    view: the camera's calibration at the frame's size (Calibration.at), whose
+    raster gave region_idx.
+    """
+    points = feet.astype(np.float64)
+    h_idx = region_idx.copy()
+    if cam_id == "CAM_1":
+        b = boxes.astype(np.int32)
+        h = b[:, 3] - b[:, 1]
+        w = b[:, 2] - b[:, 0]
+        aspect_ratio = np.where(w > 0, h / np.maximum(w, 1), 0)
+        names = view.names
+        ibad = region_idx == (names.index("WALKWAY_1") if "WALKWAY_1" in names else -2)
+        ushna = (region_idx == (names.index("WALKWAY_25") if "WALKWAY_25" in names else -2)) & (aspect_ratio < 1.8)
+        # The lift was tuned on the 2560x1440 stream
+        points[ibad, 1] += -15 * view.scale[1] * aspect_ratio[ibad]
+        h_idx[ibad] = view.extra_index["IBAD"]
+        h_idx[ushna] = view.extra_index["USHNA"]
+    return map_points(points, h_idx, view.stack)
@@ -1,7 +1,12 @@
 import redis
 import json
+import os
+import sys
 
-r = redis.Redis(host='13.204.143.167', port=6379, decode_responses=True)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import decode
+
+r = redis.Redis(host='13.204.143.167', port=6379, decode_responses=False)
 pubsub = r.pubsub()
 
 # Listen specifically to the IoT channel
@@ -14,6 +19,6 @@ for message in pubsub.listen():
     if message['type'] == 'message':
         print("\n🌡️ NEW IOT SENSOR DATA:")
         try:
-            print(json.dumps(json.loads(message['data']), indent=2))
+            print(json.dumps(decode(message['data']), indent=2))
         except:
             print(message['data'])
\ No newline at end of file
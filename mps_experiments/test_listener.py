@@ -1,17 +1,22 @@
 # test_listener.py (Run this on your Mac in a separate terminal)
+# With TRACKING_BUS=stream it reads through its own consumer group, so
+# restarting it resumes from the last message it printed.
 import redis
+import os
+import sys
 
-EC2_REDIS_IP = '13.204.143.167'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import decode
+from tracking_bus import TrackingBus
 
-r = redis.Redis(host=EC2_REDIS_IP, port=6379, decode_responses=True)
-pubsub = r.pubsub()
+EC2_REDIS_IP = '13.204.143.167'
 
-# Subscribe to the same channel
-pubsub.subscribe('tracking_stream')
+r = redis.Redis(host=EC2_REDIS_IP, port=6379, decode_responses=False)
+bus = TrackingBus.from_env(r, group='test-listener')
 
-print("🎧 Listening to AWS Redis for incoming data... (Press Ctrl+C to stop)")
+print(f"🎧 Listening to AWS Redis ({bus.mode}) for incoming data... (Press Ctrl+C to stop)")
 
-for message in pubsub.listen():
-    if message['type'] == 'message':
-        print("\n📨 RECEIVED DATA FROM AWS:")
-        print(message['data'])
\ No newline at end of file
+# Listen on the same channel
+for channel, data in bus.listen(['tracking_stream']):
+    print("\n📨 RECEIVED DATA FROM AWS:")
+    print(decode(data))
@@ -1,9 +1,13 @@
 import redis
-import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main'))
+from wire_format import decode
 
 # Connect to your EC2 instance
 print("Connecting to EC2 Redis...")
-redis_client = redis.Redis(host='3.109.201.41', port=6379, decode_responses=True)
+redis_client = redis.Redis(host='3.109.201.41', port=6379, decode_responses=False)
 
 # Subscribe to the channel
 pubsub = redis_client.pubsub()
@@ -14,6 +18,6 @@ print("🎧 Successfully subscribed! Waiting for coordinate data from the tracki
 # Listen forever
 for message in pubsub.listen():
     if message['type'] == 'message':
-        # Parse the JSON payload
-        data = json.loads(message['data'])
+        # Parse the binary or JSON payload
+        data = decode(message['data'])
         print(f"📥 RECEIVED: {data}")
\ No newline at end of file
@@ -0,0 +1,91 @@
+# track_state.py
+# Per-track state for the counting logic, bounded in time and in size.
+from collections import OrderedDict
+
+
+class TrackRecord:
+    """Base for per-track records; subclasses add their fields to __slots__"""
+    __slots__ = ("tid", "last_seen")
+
+    def __repr__(self):
+        fields = [n for cls in reversed(type(self).__mro__) for n in getattr(cls, "__slots__", ())]
+        return f"{type(self).__name__}(" + ", ".join(f"{n}={getattr(self, n, None)!r}" for n in fields) + ")"
+
+
+class TrackStore:
+    """Track id -> record, kept for `ttl` frames after the track was last seen.
+
+    touch(tid, frame_idx) marks a track as seen in this frame and returns
+    (record, is_new), creating the record with `factory()` the first time.
+    expire(frame_idx) drops records not seen for more than `ttl` frames, so
+    a person briefly lost by the detector keeps their side/zone/sequence
+    state and is not counted again when the tracker revives their id; set
+    ttl to at least the tracker's track_buffer. On top of that at most
+    `capacity` records are kept, evicting the least recently seen.
+
+    Records are kept in last-seen order, so both kinds of eviction pop from
+    the front and never scan the whole store. Memory is bounded by the
+    number of people seen in the last `ttl` frames, not by the session.
+    `on_drop(record)`, if given, is called for every expired or evicted
+    record (e.g. to free the array row it points at).
+    """
+
+    def __init__(self, factory, ttl=30, capacity=4096, on_drop=None):
+        self.factory = factory
+        self.ttl = ttl
+        self.capacity = capacity
+        self.on_drop = on_drop
+        self._records = OrderedDict()
+        self.stats = {'created': 0, 'expired': 0, 'evicted': 0}
+
+    def touch(self, tid, frame_idx):
+        record = self._records.get(tid)
+        is_new = record is None
+        if is_new:
+            if len(self._records) >= self.capacity:
+                _, dropped = self._records.popitem(last=False)
+                self.stats['evicted'] += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            record = self.factory()
+            record.tid = tid
+            self._records[tid] = record
+            self.stats['created'] += 1
+        else:
+            self._records.move_to_end(tid)
+        record.last_seen = frame_idx
+        return record, is_new
+
+    def get(self, tid, default=None):
+        return self._records.get(tid, default)
+
+    def expire(self, frame_idx):
+        """Drops every record last seen before frame_idx - ttl; returns how many"""
+        oldest = frame_idx - self.ttl
+        records = self._records
+        dropped = 0
+        while records:
+            record = next(iter(records.values()))
+            if record.last_seen >= oldest:
+                break
+            records.popitem(last=False)
+            dropped += 1
+            if self.on_drop is not None:
+                self.on_drop(record)
+        self.stats['expired'] += dropped
+        return dropped
+
+    def clear(self):
+        if self.on_drop is not None:
+            for record in self._records.values():
+                self.on_drop(record)
+        self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, tid):
+        return tid in self._records
+
+    def __iter__(self):
+        return iter(self._records.values())
@@ -4,6 +4,8 @@ import numpy as np
 from ultralytics import YOLO
 import os
 
+from frame_grabber import FrameGrabber
+
 # =========================
 # 1. INITIALIZE MPS (APPLE SILICON GPU)
 # =========================
@@ -26,9 +28,9 @@ MODEL_PATH = "yolo11x.pt"
 # =========================
 model = YOLO(MODEL_PATH)
 
-cap = cv2.VideoCapture(VIDEO_PATH)
-# CRITICAL FOR RTSP: Limits buffer to prevent massive lag over time
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 2) 
+# CRITICAL FOR RTSP: decode on a background thread and always take the newest frame,
+# so slow inference drops stale frames instead of lagging; reconnects with backoff
+cap = FrameGrabber(VIDEO_PATH).start()
 
 # =========================
 # 4. MAIN REAL-TIME LOOP
@@ -38,7 +40,7 @@ print("🎥 Starting live tracking... Press 'q' to quit.")
 while cap.isOpened():
     ret, frame = cap.read()
     if not ret:
-        print("⚠️ Lost connection to RTSP stream.")
+        print("⚠️ RTSP stream ended.")
         break
     
     # Run YOLO using the Mac's GPU
@@ -95,5 +97,6 @@ while cap.isOpened():
 # 5. CLEANUP
 # =========================
 cap.release()
+print(f"📊 Capture: {cap.stats}")
 cv2.destroyAllWindows()
 print("✅ Processing complete")
\ No newline at end of file
@@ -1,5 +1,5 @@
-import pandas as pd
 from models import db, RoomData, Rooms
+from bulk_load import load_csv
 from flask import Flask
 import os
 from dotenv import load_dotenv
@@ -16,25 +16,16 @@ def update_specific_records():
             print("Room C-007 not found.")
             return
 
-        # 2. Load your CSVs
-        df_ac = pd.read_csv('main/static/temp_files/test_energy_waste.csv')
-        # df_occ = pd.read_csv('dilab_counts_fixed.csv')
+        print("Updating records for C-007...")
 
-        print(f"Updating {len(df_ac)} records for C-007...")
-
-        for i in range(len(df_ac)):
-            # Define the unique identifier for this specific data point
-            timestamp = str(df_ac.iloc[i]['timestamp'])
-            print(f"Room C-007 at {timestamp}")
-            
-            # Perform an 'upsert': find by room and time, then update fields
-            RoomData.objects(room=room, time=timestamp).update_one(
-                set__occupancy=int(df_ac.iloc[i]['occupancy']),
-                set__ac=bool(df_ac.iloc[i]['ac']=='On'),
-                set__lights=bool(df_ac.iloc[i]['lights']=='On'),
-                set__temperature=float(df_ac.iloc[i]['temp']),
-                upsert=True
-            )
+        # 2. Stream the CSV and upsert on (room, time) in unordered bulk writes;
+        #    touched rollup days are rebuilt afterwards
+        load_csv(
+            room,
+            'main/static/temp_files/test_energy_waste.csv',
+            mode='upsert',
+            occupancy_column='occupancy'
+        )
 
         print("✅ Update complete. Only C-007 records were affected.")
 